@@ -0,0 +1,259 @@
+# backtest.py
+
+import os
+import time
+from multiprocessing import Pool
+import numpy as np
+import pandas as pd
+from config import (
+    BACKTEST_SEASONS,
+    BACKTEST_ACTUALS_FILE,
+    BACKTEST_COVERAGE_FILES,
+    BACKTEST_OUTPUT_DIR,
+    BACKTEST_FORM_SOURCE,
+    BACKTEST_FORM_SOURCES,
+    BACKTEST_STATS_LAG,
+    DB_ALIGNMENT_FILE,
+    WR_SEASON_FILES,
+    MC_STD_DEV,
+    SIM_SEED,
+    SIM_WORKERS,
+)
+from stat_loader import load_csv
+from schedule_index import ScheduleIndex
+from player_store import PlayerStore, DBStore
+from matchup_simulator import load_wr_stats, load_db_alignment
+from blend_engine import blend_seasons, stack_seasons, sample_column
+from weather_boost_generator import build_weather_boost_map
+from sim_engine import build_def_coverage_map
+from slate_engine import project_row_set, project_wr_range
+from parallel_engine import SharedTables, attach_tables, resolve_workers
+from scenario_sweep import variant_tables, with_variant, resolve
+from monte_carlo import settings as mc_settings, quantile_label
+from identity import PlayerIndex
+from instrumentation import span, tracer
+import console
+
+# Worker-side state, set once per process by _init_worker
+_worker_tables = None
+_worker_blocks = []
+
+
+# --- Inputs known before the season ---
+def season_inputs(season, stats_lag=BACKTEST_STATS_LAG):
+    """
+    Everything the engine needs to replay `season`, built only from stats of seasons <= season - stats_lag
+    (lag 0 lets the season's own aggregates leak into its projections; the summary records the lag).
+    Weather is climatology: past games have no forecast to fetch.
+    """
+    last_year = season - stats_lag
+    wr_files = {year: path for year, path in WR_SEASON_FILES.items() if year <= last_year and os.path.exists(path)}
+    if not wr_files:
+        raise FileNotFoundError(f"No WR season file in WR_SEASON_FILES for {last_year} or earlier (backtest of {season}, lag {stats_lag})")
+    # One PlayerIndex for the whole season: blends, stores and actuals all match players on its ids
+    players = PlayerIndex.from_roster()
+    wr_long = stack_seasons(wr_files)
+    wr_df = blend_seasons(wr_long, id_col="Player", sample_col=sample_column(wr_long, "WR"), players=players)
+
+    db_long = pd.read_csv(DB_ALIGNMENT_FILE)
+    if "Year" in db_long.columns:
+        db_long = db_long[pd.to_numeric(db_long["Year"], errors="coerce") <= last_year]
+        db_df = blend_seasons(db_long, id_col="Player", sample_col=sample_column(db_long, "DB"), players=players)
+    else:
+        console.warning(f"⚠️ {DB_ALIGNMENT_FILE} has no Year column — DB stats are used as-is for the {season} backtest")
+        db_df = db_long
+
+    schedule = ScheduleIndex(load_csv(BACKTEST_SEASONS[season]))
+    coverage_file = BACKTEST_COVERAGE_FILES.get(season)
+    coverage_map = build_def_coverage_map(load_csv(coverage_file)) if coverage_file else {}
+    return {
+        "schedule": schedule,
+        "players": players,
+        "wr_map": load_wr_stats(f"{season} backtest WR blend", store=PlayerStore(wr_df, players=players)),
+        "db_map": load_db_alignment(f"{season} backtest DB blend", store=DBStore(db_df, players=players)),
+        "db_long": db_long,
+        "def_coverage_map": coverage_map,
+        "env_boost_map": build_weather_boost_map(schedule, forecast=False),
+        "forecast": False,
+    }
+
+
+def load_actuals(season, meta, n_weeks, players, path=BACKTEST_ACTUALS_FILE):
+    """(WR row x week) actual fantasy points for one season (NaN = no recorded game), matched on player identity ids."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Backtest needs weekly actuals in {path} (columns Year, Week, Player, Team, FantasyPoints)")
+    df = pd.read_csv(path)
+    df = df[df["Year"] == season]
+    row_of = {pid: i for i, pid in enumerate(meta["player_ids"])}
+    rows = pd.Series(players.ids(df["Player"].to_numpy(), df["Team"].to_numpy() if "Team" in df.columns else None)).map(row_of)
+    weeks = df["Week"].to_numpy(dtype=int)
+    keep = rows.notna().to_numpy() & (weeks < n_weeks)
+    actual = np.full((len(meta["wrs"]), n_weeks), np.nan)
+    actual[rows.to_numpy()[keep].astype(int), weeks[keep]] = df["FantasyPoints"].to_numpy(dtype=float)[keep]
+    return actual
+
+
+# --- Replay ---
+def replay_weeks(tables, weeks, mc, form_source):
+    """
+    Project `weeks` under one variant. With "actual" form every week only reads actual points of earlier
+    weeks (tables["history"]), so weeks are independent; "projected" carries the model's own rolling form
+    forward like a season run, so the weeks are walked in order.
+    """
+    outputs = []
+    if form_source == "actual":
+        rows = np.arange(len(tables["team_codes"]))
+        for week in weeks:
+            outputs.append(project_row_set(tables, week, rows, mc))
+    else:
+        outputs = project_wr_range(tables, weeks, mc=mc)
+    return [(out["week"], out["rows"], out["adj_pts"], None if out["mc"] is None else out["mc"]["quantiles"]) for out in outputs]
+
+
+def _init_worker(specs):
+    global _worker_tables, _worker_blocks
+    tracer.reset()
+    _worker_tables, _worker_blocks = attach_tables(specs)
+
+
+def _init_local(tables):
+    global _worker_tables
+    _worker_tables = tables
+
+
+def _run_task(task):
+    variant, pick, weeks, mc, form_source = task
+    start = time.perf_counter()
+    outputs = replay_weeks(with_variant(_worker_tables, pick), weeks, mc, form_source)
+    return variant, outputs, time.perf_counter() - start
+
+
+def replay_tasks(picks, weeks, mc, form_source, workers):
+    """One task per variant and week ("actual" form) or per variant ("projected" form, weeks in order)."""
+    week_groups = [[w] for w in weeks] if form_source == "actual" and workers > 1 else [list(weeks)]
+    return [(v, pick, group, mc, form_source) for v, pick in enumerate(picks) for group in week_groups]
+
+
+def replay_season(tables, stacks, picks, weeks, mc, form_source, workers):
+    """Run every (variant, week group) task against one shared copy of the season; returns {variant: (outputs, seconds)}."""
+    shared = {k: v for k, v in tables.items() if k not in stacks}
+    shared.update({f"{k}_stack": v for k, v in stacks.items()})
+    tasks = replay_tasks(picks, weeks, mc, form_source, workers)
+    if workers == 1 or len(tasks) == 1:
+        _init_local(shared)
+        results = [_run_task(task) for task in tasks]
+    else:
+        with SharedTables(shared) as block:
+            with Pool(min(workers, len(tasks)), initializer=_init_worker, initargs=(block.specs,)) as pool:
+                results = pool.map(_run_task, tasks)
+
+    by_variant = {v: ([], 0.0) for v in range(len(picks))}
+    for v, outputs, seconds in results:
+        done, total = by_variant[v]
+        by_variant[v] = (done + outputs, total + seconds)
+    return by_variant
+
+
+# --- Scoring ---
+def score_frame(season, variant, outputs, actual, meta, mc):
+    """Long frame of (week, WR) projections that have an actual result to score against."""
+    frames = []
+    for week, rows, adj_pts, quantiles in outputs:
+        truth = actual[rows, week]
+        has = ~np.isnan(truth)
+        frame = pd.DataFrame({
+            "season": season,
+            "variant": variant,
+            "week": week,
+            "wr_name": [meta["wrs"][i].name for i in rows[has]],
+            "adj_pts": np.round(adj_pts[has], 2),
+            "actual": truth[has],
+        })
+        if quantiles is not None:
+            for i, q in enumerate(mc.quantiles):
+                frame[f"adj_pts_p{quantile_label(q)}"] = np.round(quantiles[i, has], 2)
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def metrics(df, mc):
+    """MAE/RMSE/bias of the point projection (and p50), plus calibration of every reported quantile."""
+    if df.empty:
+        return {"n": 0}
+    err = df["adj_pts"] - df["actual"]
+    out = {
+        "n": len(df),
+        "mae": round(float(err.abs().mean()), 4),
+        "rmse": round(float(np.sqrt((err ** 2).mean())), 4),
+        "bias": round(float(err.mean()), 4),
+        "corr": round(float(df["adj_pts"].corr(df["actual"])), 4) if len(df) > 1 else np.nan,
+    }
+    if mc is None:
+        return out
+    labels = [f"adj_pts_p{quantile_label(q)}" for q in mc.quantiles]
+    if "adj_pts_p50" in df.columns:
+        out["p50_mae"] = round(float((df["adj_pts_p50"] - df["actual"]).abs().mean()), 4)
+    for q, label in zip(mc.quantiles, labels):
+        # Share of actuals at or below the band edge; a calibrated p25 gives 0.25
+        out[f"below_p{quantile_label(q)}"] = round(float((df["actual"] <= df[label]).mean()), 4)
+    if len(labels) > 1:
+        inside = (df["actual"] >= df[labels[0]]) & (df["actual"] <= df[labels[-1]])
+        out["band_coverage"] = round(float(inside.mean()), 4)
+        out["band_target"] = round((mc.quantiles[-1] - mc.quantiles[0]) / 100, 4)
+    return out
+
+
+def run_backtest(seasons, variants=None, simulations=100, seed=SIM_SEED, quantiles=None, workers=SIM_WORKERS,
+                 form_source=BACKTEST_FORM_SOURCE, stats_lag=BACKTEST_STATS_LAG, output_dir=BACKTEST_OUTPUT_DIR, save_projections=False):
+    """
+    Replay each season in `seasons` week by week for every variant (scenario_sweep parameter sets; the
+    config.py baseline when none are given), score the projections against actual fantasy points and
+    write summary.csv (season x variant) and weekly.csv (season x variant x week) under output_dir.
+    """
+    if form_source not in BACKTEST_FORM_SOURCES:
+        raise ValueError(f"Unknown form source '{form_source}' (expected one of {', '.join(BACKTEST_FORM_SOURCES)})")
+    variants = variants or [{}]
+    mc = mc_settings(simulations, MC_STD_DEV, quantiles, seed, "independent")
+    workers = resolve_workers(workers)
+    summary_rows, weekly_rows, projections = [], [], []
+
+    for season in seasons:
+        console.info(f"\n🕰️ Backtesting {season}: {len(variants)} variants, form from {form_source} points, stats lag {stats_lag}")
+        with span("backtest.inputs", season=season):
+            inputs = season_inputs(season, stats_lag)
+            weeks = inputs["schedule"].weeks
+            tables, meta, stacks, picks = variant_tables(inputs, variants, weeks)
+            actual = load_actuals(season, meta, tables["opponent"].shape[0], inputs["players"])
+        missing = inputs["schedule"].unscheduled([wr.team for wr in meta["wrs"]])
+        if missing:
+            console.warning(f"⚠️ {len(missing)} WR team label(s) match no team in {BACKTEST_SEASONS[season]}: {', '.join(missing[:8])}")
+        if form_source == "actual":
+            tables["history"] = actual
+        else:
+            tables["history"] = np.full_like(actual, np.nan)
+
+        with span("backtest.replay", season=season, variants=len(variants)):
+            by_variant = replay_season(tables, stacks, picks, weeks, mc, form_source, workers)
+
+        with span("backtest.score", season=season):
+            for v, variant in enumerate(variants):
+                outputs, seconds = by_variant[v]
+                scored = score_frame(season, v, outputs, actual, meta, mc)
+                params = {name.lower(): value for name, value in resolve(variant).items()}
+                summary_rows.append({"season": season, "variant": v, **params, "form_source": form_source,
+                                     "stats_lag": stats_lag, **metrics(scored, mc), "replay_seconds": round(seconds, 4)})
+                for week, week_df in scored.groupby("week"):
+                    weekly_rows.append({"season": season, "variant": v, "week": int(week), **metrics(week_df, mc)})
+                if save_projections:
+                    projections.append(scored)
+        tracer.count("backtest.seasons")
+
+    os.makedirs(output_dir, exist_ok=True)
+    summary = pd.DataFrame(summary_rows)
+    summary.to_csv(os.path.join(output_dir, "summary.csv"), index=False)
+    pd.DataFrame(weekly_rows).to_csv(os.path.join(output_dir, "weekly.csv"), index=False)
+    if projections:
+        pd.concat(projections, ignore_index=True).to_csv(os.path.join(output_dir, "projections.csv"), index=False)
+    console.info(f"\n✅ Backtest saved to {output_dir} (summary.csv, weekly.csv{', projections.csv' if projections else ''})")
+    tracer.report()
+    return summary
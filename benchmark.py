@@ -0,0 +1,403 @@
+# benchmark.py
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import config
+import sim_engine
+import weather_boost_generator
+import console
+from config import (
+    NFL_SCHEDULE_2025_FILE,
+    WR_STATS_2024_FILE,
+    DB_ALIGNMENT_FILE,
+    DEF_COVERAGE_TAGS_FILE,
+    STADIUM_ENV_FILE,
+    SIM_WORKERS,
+    SIM_CHUNK_SIZE,
+    SIM_SEED,
+    BENCHMARK_HISTORY_FILE,
+    BENCHMARK_REGRESSION_TOLERANCE,
+)
+from player_store import DB_COVERAGE_COLUMNS
+from instrumentation import tracer, peak_rss_mb
+from monte_carlo import MC_MODES
+
+LEAGUE_TEAMS = 32
+SEASON_START = datetime.date(2025, 9, 4)
+NOISE_FLOOR_SECONDS = 0.05  # Stages faster than this are never flagged as regressions
+
+# Upstream column layouts, so the loaders see the same schema as the real DATA/ files
+WR_COLUMNS = [
+    "Player", "Year", "Team", "Position", "Height", "Weight", "ArmLength", "ArmLengthRank", "DraftPick", "DraftYear", "College",
+    "Targets", "TargetShare", "RzTargetShare", "TargetRate", "SnapShare", "SlotSnaps", "SlotSnapRate", "RoutesRun",
+    "RouteParticipation", "AirYards", "AirYardsShare", "AvgTargetDistADOT", "DeepTargets", "RzTargets", "RzRec",
+    "TargetQualityRating", "CatchableTargetRate", "CatchableTargets", "TargetAccuracy", "YardsPerRouteRun",
+    "FormationAdjustedYardsPerRouteRun", "YardsPerTarget", "YardsPerRec", "YardsPerTeamPassAtt", "TrueCatchRate",
+    "TargetSeparation", "TargetPrem", "DominatorRating", "JukeRate", "ExplosiveRating", "Drops", "DropRate",
+    "ContestedCatchRate", "ContestedCatchTargets", "ProductionPrem", "ExpectedPointsAddedEPA", "QbRatingPerTarget",
+    "BestBallPointsAdded", "FantasyPointsPerRouteRun", "FantasyPointsPerTarget", "TotalFantasyPoints", "TotalRouteWins",
+    "RouteWinRate", "RoutesVsMan", "RoutesVsZone", "WinRateVsMan", "WinRateVsZone", "TargetRateVsMan", "TargetRateVsZone",
+    "TargetSeparationVsMan", "TargetSeparationVsZone", "FantasyPointsPerTargetVsMan", "FantasyPointsPerTargetVsZone",
+]
+DB_COLUMNS = [
+    "Year", "Team", "Player", "Position", "IsRookie", "Height", "Weight", "ArmLength", "ArmLengthRank", "DraftPick",
+    "DraftYear", "College", "GamesPlayed", "SoloTackles", "AssistedTackles", "Sacks", "QBPressures", "TacklesForLoss",
+    "RunStuffs", "FantasyPointsPerGame", "SnapShare", "ManCoverageRate", "ShadowRate", "TargetsAllowed", "TargetRate",
+    "RoutesDefended", "AverageTargetDistance", "TargetSeparation", "ReceptionsAllowed", "YardsAllowed",
+    "YardsPerReceptionAllowed", "YardsPerTargetAllowed", "PassBreakups", "TDsAllowed", "CoverageRating",
+    "ManCoverageSuccessRate", "CatchRateAllowed", "PasserRatingAllowed", "FantasyPtsAllowedPerCoverSnap",
+    "FantasyPointsAllowedPerTarget", "FantasyPointsAllowedPerGame",
+]
+# DBStore reads the spaced coverage names; they are written alongside, from the same draws
+DB_LOADER_ALIASES = {
+    "Man Coverage Rate": "ManCoverageRate",
+    **{spaced: spaced.replace(" ", "") for spaced in DB_COVERAGE_COLUMNS.values()},
+}
+DB_POSITIONS = ["CB", "CB", "S", "LB", "CB", "S", "LB", "CB"]
+STATES = ["NY", "IL", "FL", "AZ", "WA", "CA", "CO", "TX", "MN", "GA"]
+
+# Benchmark stage -> spans (in the parent process) whose durations it sums
+STAGES = {
+    "load": ["load.schedule", "load.wr_stats", "load.db_alignment", "load.coverage_tags", "load.environment"],
+    "penalty_cache": ["penalty_cache"],
+    "pack_slate": ["pack_slate"],
+    "project": ["form_pass", "project"],
+    "finish_weeks": ["finish_week"],
+    "export": ["export_week", "summaries"],
+}
+
+
+def team_codes(n_teams):
+    width = max(2, len(str(n_teams - 1)))
+    return [f"T{i:0{width}d}" for i in range(n_teams)]
+
+
+def synthetic_schedule(teams, weeks, rng):
+    """Random pairings every week; from week 5 to 14 a few teams take a bye."""
+    rows = []
+    for week in range(1, weeks + 1):
+        order = rng.permutation(len(teams))
+        if 5 <= week <= 14:
+            order = order[:len(order) - 2 * int(rng.integers(1, 3))]
+        date = SEASON_START + datetime.timedelta(days=7 * (week - 1) + 3)
+        for g in range(0, len(order) - 1, 2):
+            rows.append({
+                "Week": week, "Day": "Sun", "Date": f"{date:%B} {date.day}",
+                "Visitor": teams[order[g]], "VisitorPts": "", "Home": teams[order[g + 1]], "HomePts": "",
+                "Time": str(rng.choice(["1:00 PM", "4:05 PM", "4:25 PM", "8:20 PM"])),
+            })
+    return pd.DataFrame(rows)
+
+
+def synthetic_wr_stats(teams, wrs_per_team, rng):
+    n = len(teams) * wrs_per_team
+    df = pd.DataFrame(np.round(rng.uniform(0, 100, (n, len(WR_COLUMNS))), 2), columns=WR_COLUMNS)
+    routes_man, routes_zone = rng.integers(40, 220, n), rng.integers(80, 420, n)
+    df = df.assign(
+        Player=[f"WR {i:05d}" for i in range(n)], Year=2024,
+        Team=np.tile(teams, wrs_per_team), Position=[f"WR{1 + i // len(teams)}" for i in range(n)],
+        College="Synthetic State", DraftYear=rng.integers(2014, 2025, n),
+        SnapShare=np.round(rng.uniform(0.4, 1.0, n), 3), SlotSnapRate=np.round(rng.beta(2, 3, n), 3),
+        RoutesRun=routes_man + routes_zone, RoutesVsMan=routes_man, RoutesVsZone=routes_zone,
+        WinRateVsMan=np.round(rng.uniform(0.05, 0.35, n), 3), WinRateVsZone=np.round(rng.uniform(0.05, 0.35, n), 3),
+        TargetRateVsMan=np.round(rng.uniform(0.08, 0.32, n), 3), TargetRateVsZone=np.round(rng.uniform(0.08, 0.32, n), 3),
+        TargetSeparationVsMan=np.round(rng.uniform(0.4, 2.8, n), 2), TargetSeparationVsZone=np.round(rng.uniform(0.8, 3.2, n), 2),
+        FantasyPointsPerTargetVsMan=np.round(rng.uniform(1.0, 2.8, n), 2), FantasyPointsPerTargetVsZone=np.round(rng.uniform(1.0, 2.8, n), 2),
+    )
+    return df[WR_COLUMNS]
+
+
+def synthetic_db_stats(teams, dbs_per_team, rng):
+    n = len(teams) * dbs_per_team
+    df = pd.DataFrame(np.round(rng.uniform(0, 100, (n, len(DB_COLUMNS))), 2), columns=DB_COLUMNS)
+    df = df.assign(
+        Year=2024, Team=np.tile(teams, dbs_per_team), Player=[f"DB {i:05d}" for i in range(n)],
+        Position=[DB_POSITIONS[(i // len(teams)) % len(DB_POSITIONS)] for i in range(n)],
+        IsRookie=rng.random(n) < 0.15, College="Synthetic State", DraftYear=rng.integers(2014, 2025, n),
+        ManCoverageRate=np.round(rng.uniform(0.1, 0.9, n), 3), TargetsAllowed=rng.integers(10, 90, n),
+        CatchRateAllowed=np.round(rng.uniform(0.4, 0.8, n), 3), PasserRatingAllowed=np.round(rng.uniform(60, 125, n), 1),
+        TargetSeparation=np.round(rng.uniform(0.5, 3.0, n), 2), ManCoverageSuccessRate=np.round(rng.uniform(0.2, 0.8, n), 3),
+        FantasyPointsAllowedPerTarget=np.round(rng.uniform(1.0, 2.5, n), 2), FantasyPointsAllowedPerGame=np.round(rng.uniform(3, 15, n), 1),
+    )
+    df = df[DB_COLUMNS]
+    for spaced, source in DB_LOADER_ALIASES.items():
+        df[spaced] = df[source]
+    return df
+
+
+def synthetic_coverage_tags(teams, weeks, rng):
+    man = np.round(rng.uniform(0.2, 0.8, weeks * len(teams)), 2)
+    return pd.DataFrame({
+        "week": np.repeat(np.arange(1, weeks + 1), len(teams)),
+        "team": np.tile(teams, weeks),
+        "man_coverage_rate": man,
+        "zone_coverage_rate": np.round(1 - man, 2),
+    })
+
+
+def synthetic_stadiums(teams, rng):
+    n = len(teams)
+    return pd.DataFrame({
+        "Team": teams,
+        "Latitude": np.round(rng.uniform(25.5, 47.5, n), 4),
+        "Longitude": np.round(rng.uniform(-122.5, -71.0, n), 4),
+        "Dome": rng.random(n) < 0.3,
+        "ColdProne": rng.random(n) < 0.3,
+        "WindProne": rng.random(n) < 0.25,
+        "HighAltitude": rng.random(n) < 0.05,
+        "TurfType": rng.choice(["Natural Grass", "Artificial Turf", "Hybrid"], n),
+        "HumidityControl": rng.choice(["Yes", "No", "Partial"], n),
+        "State": rng.choice(STATES, n),
+    })
+
+
+def generate_league(root, scale=1.0, wrs_per_team=6, dbs_per_team=8, weeks=18, seed=0):
+    """
+    Write a synthetic league under `root` at the config input paths (schedule, WR stats, DB stats,
+    coverage tags, stadium profiles). `scale` multiplies the 32-team league size. Returns its dimensions.
+    """
+    rng = np.random.default_rng(seed)
+    n_teams = max(2, 2 * round(LEAGUE_TEAMS * scale / 2))
+    teams = team_codes(n_teams)
+    files = {
+        NFL_SCHEDULE_2025_FILE: synthetic_schedule(teams, weeks, rng),
+        WR_STATS_2024_FILE: synthetic_wr_stats(teams, wrs_per_team, rng),
+        DB_ALIGNMENT_FILE: synthetic_db_stats(teams, dbs_per_team, rng),
+        DEF_COVERAGE_TAGS_FILE: synthetic_coverage_tags(teams, weeks, rng),
+        STADIUM_ENV_FILE: synthetic_stadiums(teams, rng),
+    }
+    for path, df in files.items():
+        target = os.path.join(root, path)
+        os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+        df.to_csv(target, index=False)
+    return {"teams": n_teams, "wrs": n_teams * wrs_per_team, "dbs": n_teams * dbs_per_team, "weeks": weeks,
+            "games": len(files[NFL_SCHEDULE_2025_FILE])}
+
+
+@contextlib.contextmanager
+def offline_run(root, verbose=False):
+    """cd into the synthetic league with live NOAA forecasts off (and the pipeline's progress output off unless verbose)."""
+    previous_dir = os.getcwd()
+    flags = [(config, config.USE_FORECAST_WEATHER), (sim_engine, sim_engine.USE_FORECAST_WEATHER),
+             (weather_boost_generator, weather_boost_generator.USE_FORECAST_WEATHER)]
+    for module, _ in flags:
+        module.USE_FORECAST_WEATHER = False
+    previous_level = console.current_level()
+    console.setup(previous_level if verbose else "quiet")
+    os.chdir(root)
+    try:
+        yield
+    finally:
+        os.chdir(previous_dir)
+        console.setup(previous_level)
+        for module, value in flags:
+            module.USE_FORECAST_WEATHER = value
+
+
+def stage_times(events, n_weeks):
+    """Seconds per benchmark stage from the parent's spans, plus per-week projection time from the workers'."""
+    pid = os.getpid()
+    own = [e for e in events if e["pid"] == pid]
+    stages = {stage: round(sum(e["dur"] for e in own if e["name"] in names), 4) for stage, names in STAGES.items()}
+    project_week = [e["dur"] for e in events if e["name"] == "project_week"]
+    # A week is split into WR-range units, so its projection time is summed over them
+    stages["project_week_mean"] = round(sum(project_week) / max(n_weeks, 1), 4)
+    return stages
+
+
+def run_case(dims, root, simulations, mode, workers, chunk_size, seed, verbose=False):
+    tracer.reset()
+    with offline_run(root, verbose):
+        start = time.perf_counter()
+        sim_engine.run_season_simulation(
+            output_file="season_projection_output.csv", simulations=simulations, workers=workers,
+            chunk_size=chunk_size, seed=seed, mode=mode,
+        )
+        season = time.perf_counter() - start
+        events, counters = list(tracer.events), dict(tracer.counters)
+
+        # Second load hits the input cache the season run just filled
+        start = time.perf_counter()
+        sim_engine.load_inputs()
+        load_warm = time.perf_counter() - start
+
+    stages = stage_times(events, dims["weeks"])
+    stages.update(season=round(season, 4), load_warm=round(load_warm, 4))
+    rss = peak_rss_mb()  # process-lifetime peak: in a sweep it is the max over this and earlier cases
+    return {
+        "params": {**dims, "simulations": simulations, "mode": mode, "workers": workers, "chunk_size": chunk_size, "seed": seed},
+        "stages": stages,
+        "counters": {k: v for k, v in counters.items() if k in ("wr_weeks_projected", "samples_drawn")},
+        "peak_rss_mb": None if rss is None else {"main": rss[0], "workers": rss[1]},
+    }
+
+
+def edit_wr_stat(root):
+    """One WR's man-coverage efficiency changes: that row, plus every teammate sharing its defenders, goes dirty."""
+    path = os.path.join(root, WR_STATS_2024_FILE)
+    df = pd.read_csv(path)
+    df.loc[3, "FantasyPointsPerTargetVsMan"] += 0.5
+    df.to_csv(path, index=False)
+
+
+def insert_wr(root):
+    """A WR signs mid-season: a new row in the middle of the stats file shifts every later row."""
+    path = os.path.join(root, WR_STATS_2024_FILE)
+    df = pd.read_csv(path)
+    new = df.iloc[[10]].assign(Player="WR New Signing")
+    pd.concat([df.iloc[:5], new, df.iloc[5:]], ignore_index=True).to_csv(path, index=False)
+
+
+INCREMENTAL_EDITS = {"wr_stat": edit_wr_stat, "wr_insert": insert_wr}
+
+
+def check_incremental(root, simulations, mode, workers, chunk_size, seed):
+    """
+    Regression check: after a season run, apply each edit in INCREMENTAL_EDITS, run the incremental
+    update and compare it with a fresh full run on the edited inputs. Returns the edits that differ.
+    """
+    season_file, fresh_file = "season_projection_output.csv", "fresh_projection_output.csv"
+    failed = []
+    with offline_run(root):
+        sim_engine.run_season_simulation(output_file=season_file, simulations=simulations, workers=workers,
+                                         chunk_size=chunk_size, seed=seed, mode=mode)
+        for name, edit in INCREMENTAL_EDITS.items():
+            edit(root)
+            sim_engine.run_incremental_update(workers=workers, chunk_size=chunk_size)
+            incremental = pd.read_csv(season_file)
+            sim_engine.run_season_simulation(output_file=fresh_file, simulations=simulations, workers=workers,
+                                             chunk_size=chunk_size, seed=seed, mode=mode)
+            fresh = pd.read_csv(fresh_file)
+            # Re-point the saved state at the season file for the next edit
+            sim_engine.run_season_simulation(output_file=season_file, simulations=simulations, workers=workers,
+                                             chunk_size=chunk_size, seed=seed, mode=mode)
+            same = incremental.shape == fresh.shape and incremental.equals(fresh)
+            print(f"   {'✅' if same else '❌'} incremental after {name}: "
+                  f"{'matches' if same else 'differs from'} a fresh full run ({len(fresh)} rows)")
+            if not same:
+                failed.append(name)
+    return failed
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def load_history(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def save_history(history, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(history, f, indent=1)
+
+
+def regressions(result, history, tolerance=BENCHMARK_REGRESSION_TOLERANCE):
+    """Stages slower than the last recorded run with identical params by more than `tolerance`."""
+    previous = next((h for h in reversed(history) if h["params"] == result["params"]), None)
+    if previous is None:
+        return []
+    slower = []
+    for stage, seconds in result["stages"].items():
+        before = previous["stages"].get(stage)
+        if before is not None and seconds > NOISE_FLOOR_SECONDS and seconds > before * (1 + tolerance):
+            slower.append((stage, before, seconds))
+    return slower
+
+
+def print_result(result):
+    p, s = result["params"], result["stages"]
+    print(f"\n🏟️ {p['teams']} teams, {p['wrs']} WRs, {p['weeks']} weeks, {p['simulations']:,} {p['mode']} sims, {p['workers']} workers")
+    print("   " + ", ".join(f"{stage}={seconds:.3f}s" for stage, seconds in s.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the season pipeline on synthetic leagues (offline)")
+    parser.add_argument("--scale", type=float, nargs="+", default=[1.0], help="League size multiples of 32 teams, e.g. 1 4 10")
+    parser.add_argument("--sims", type=int, nargs="+", default=[100], help="Monte Carlo samples per WR-week to sweep, e.g. 1 1000 100000")
+    parser.add_argument("--mc-mode", choices=MC_MODES, default="independent", help="Monte Carlo mode for every case")
+    parser.add_argument("--wrs-per-team", type=int, default=6)
+    parser.add_argument("--dbs-per-team", type=int, default=8)
+    parser.add_argument("--weeks", type=int, default=18)
+    parser.add_argument("--workers", type=int, default=SIM_WORKERS, help="Worker processes (0 = all cores, 1 = in-process)")
+    parser.add_argument("--chunk-size", type=int, default=SIM_CHUNK_SIZE)
+    parser.add_argument("--seed", type=int, default=SIM_SEED)
+    parser.add_argument("--history", type=str, default=BENCHMARK_HISTORY_FILE, help="JSON file results are appended to")
+    parser.add_argument("--no-record", action="store_true", help="Compare against the history without appending to it")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 when any stage regressed")
+    parser.add_argument("--keep-dir", type=str, default=None, help="Generate leagues here (kept) instead of a temp dir")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own output")
+    parser.add_argument("--check-incremental", action="store_true",
+                        help="Also check that incremental updates after input edits match a fresh full run (exit 1 if not)")
+    args = parser.parse_args()
+
+    history_path = os.path.abspath(args.history)
+    history = load_history(history_path)
+    env = environment()
+    workers = args.workers if args.workers >= 1 else os.cpu_count()
+    regressed, mismatched = [], []
+
+    for scale in args.scale:
+        with contextlib.ExitStack() as stack:
+            root = args.keep_dir and os.path.join(os.path.abspath(args.keep_dir), f"scale_{scale:g}")
+            root = root or stack.enter_context(tempfile.TemporaryDirectory(prefix="yac_bench_"))
+            start = time.perf_counter()
+            dims = generate_league(root, scale, args.wrs_per_team, args.dbs_per_team, args.weeks, args.seed)
+            print(f"🧪 Generated {dims['teams']} teams, {dims['wrs']} WRs, {dims['dbs']} DBs, {dims['games']} games "
+                  f"in {time.perf_counter() - start:.2f}s ({root})")
+
+            for sims in args.sims:
+                # Fresh input/penalty caches per case so every first load is cold
+                shutil.rmtree(os.path.join(root, ".cache"), ignore_errors=True)
+                result = run_case(dims, root, sims, args.mc_mode, workers, args.chunk_size, args.seed, args.verbose)
+                result.update(env)
+                print_result(result)
+                for stage, before, after in regressions(result, history):
+                    print(f"⚠️ Regression: {stage} {before:.3f}s -> {after:.3f}s (+{100 * (after / before - 1):.0f}%)")
+                    regressed.append(stage)
+                history.append(result)
+
+            if args.check_incremental:
+                shutil.rmtree(os.path.join(root, ".cache"), ignore_errors=True)
+                print("🔁 Checking incremental updates against full runs")
+                mismatched.extend(check_incremental(root, args.sims[0], args.mc_mode, workers, args.chunk_size, args.seed))
+
+    if not args.no_record:
+        save_history(history, history_path)
+        print(f"\n📝 Results appended to {history_path}")
+    if regressed and args.fail_on_regression:
+        raise SystemExit(1)
+    if mismatched:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
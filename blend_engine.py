@@ -0,0 +1,151 @@
+# blend_engine.py
+
+import numpy as np
+import pandas as pd
+from config import BLEND_RECENCY_WEIGHTS, BLEND_DECAY, BLEND_SAMPLE_WEIGHTING
+from identity import PlayerIndex, roster_file
+from input_cache import InputCache
+import console
+
+YEAR_COL = "Year"
+
+# Sample-size columns by position, first one present wins (rows are weighted by it when enabled)
+SAMPLE_COLUMNS = {
+    "WR": ["RoutesRun", "Targets"],
+    "DB": ["RoutesDefended", "TargetsAllowed", "Targets Allowed"],
+}
+
+
+def recency_weights(years, weights=None, decay=BLEND_DECAY):
+    """
+    Decay weight for each season, by recency rank from the latest season present:
+    the configured weights first (latest season first), then each older season at `decay` x the previous.
+    """
+    weights = list(BLEND_RECENCY_WEIGHTS if weights is None else weights)
+    ranked = sorted({int(y) for y in years}, reverse=True)
+    out = {}
+    for rank, year in enumerate(ranked):
+        if rank < len(weights):
+            out[year] = float(weights[rank])
+        else:
+            out[year] = out[ranked[rank - 1]] * decay
+    return out
+
+
+def stack_seasons(year_files):
+    """{year: csv path} of per-season files -> one long frame with a Year column."""
+    frames = []
+    for year, path in sorted(year_files.items()):
+        df = pd.read_csv(path)
+        df[YEAR_COL] = int(year)
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+def blend_seasons(long_df, id_col="Player", year_col=YEAR_COL, weights=None, decay=BLEND_DECAY, sample_col=None, players=None):
+    """
+    Blend a long (player, season) table into one row per player, where a player is an identity.PlayerIndex
+    id: roster gsis_id when the roster resolves the name (and team, for shared names), normalized name
+    otherwise, so "X Jr." and "X" blend together and the output carries the latest season's spelling.
+    Every numeric column is a weighted mean over the player's rows, weight = season decay x sample size,
+    renormalized per player and per column over the seasons that actually have a value, so missing
+    years shift weight onto the seasons that exist instead of producing NaN. The sample-size column
+    itself is blended with decay weights only. Text columns come from the player's latest season.
+    """
+    df = long_df[long_df[id_col].notna()]
+    years = pd.to_numeric(df[year_col], errors="coerce").to_numpy()
+    df = df[~np.isnan(years)]
+    years = years[~np.isnan(years)].astype(int)
+
+    season_weight = recency_weights(years, weights, decay)
+    row_weight = np.array([season_weight[y] for y in years])
+
+    numeric_cols = [
+        c for c in df.columns
+        if c not in (id_col, year_col) and pd.api.types.is_numeric_dtype(df[c]) and not pd.api.types.is_bool_dtype(df[c])
+    ]
+    text_cols = [c for c in df.columns if c not in numeric_cols and c not in (id_col, year_col)]
+
+    players = PlayerIndex.from_roster() if players is None else players
+    player_ids = players.ids(df[id_col].to_numpy(), df["Team"].to_numpy() if "Team" in df.columns else None)
+
+    # Align all seasons once: sort by player, then every reduction is one reduceat over contiguous rows
+    order = np.lexsort((years, player_ids))
+    player_ids, years, row_weight = player_ids[order], years[order], row_weight[order]
+    starts = np.flatnonzero(np.r_[True, player_ids[1:] != player_ids[:-1]])
+
+    values = df[numeric_cols].to_numpy(dtype=float)[order]
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+    decay_rc = np.where(present, row_weight[:, None], 0.0)
+
+    def weighted_mean(weights_rc):
+        num = np.add.reduceat(filled * weights_rc, starts, axis=0)
+        den = np.add.reduceat(weights_rc, starts, axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(den > 0, num / den, np.nan)
+
+    blended = weighted_mean(decay_rc)
+    if sample_col in numeric_cols:
+        sample = np.nan_to_num(df[sample_col].to_numpy(dtype=float)[order], nan=1.0)
+        others = [i for i, c in enumerate(numeric_cols) if c != sample_col]
+        # A player with no recorded sample in any season keeps the decay-only mean instead of NaN
+        sample_rc = decay_rc.copy()
+        sample_rc[:, others] *= np.maximum(sample, 0.0)[:, None]
+        by_sample = weighted_mean(sample_rc)[:, others]
+        blended[:, others] = np.where(np.isnan(by_sample), blended[:, others], by_sample)
+
+    # Latest season (last row per player after the year sort) supplies team, position and other labels
+    last = np.r_[starts[1:], len(order)] - 1
+    latest = df[text_cols].iloc[order[last]].reset_index(drop=True)
+
+    out = pd.DataFrame({id_col: df[id_col].to_numpy()[order[last]]})
+    out = pd.concat([out, latest, pd.DataFrame(blended, columns=numeric_cols)], axis=1)
+    out["Seasons"] = np.add.reduceat(np.r_[True, (years[1:] != years[:-1]) | (player_ids[1:] != player_ids[:-1])].astype(int), starts)
+    out["LatestYear"] = years[last]
+    return out[[id_col] + [c for c in long_df.columns if c in out.columns and c not in (id_col, year_col)] + ["Seasons", "LatestYear"]]
+
+
+def sample_column(df, position):
+    if not BLEND_SAMPLE_WEIGHTING:
+        return None
+    return next((c for c in SAMPLE_COLUMNS.get(position, []) if c in df.columns), None)
+
+
+def blend_files(sources, output_file, position, id_col="Player", long_format=True, cache=None):
+    """
+    Blend season files for one position and write the result to `output_file` (CSV). The blended frame
+    also goes through the input cache, so unchanged sources reload from its binary format.
+    `sources` is one long-format file (with a Year column) or a {year: path} dict of per-season files.
+    """
+    cache = cache or InputCache()
+    paths = ([sources] if long_format else list(sources.values())) + [p for p in [roster_file()] if p]
+
+    def build():
+        long_df = pd.read_csv(sources) if long_format else stack_seasons(sources)
+        return blend_seasons(long_df, id_col=id_col, sample_col=sample_column(long_df, position))
+
+    params = {"weights": list(BLEND_RECENCY_WEIGHTS), "decay": BLEND_DECAY, "sample": BLEND_SAMPLE_WEIGHTING,
+              "id": id_col, "years": sorted(sources) if not long_format else None}
+    blended = cache.get_or_build(f"blend_{position.lower()}", paths, build, params=params)
+    blended.to_csv(output_file, index=False)
+    console.info(f"✅ Saved blended {position} stats ({len(blended)} players) to {output_file}")
+    return blended
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Blend any number of seasons for one position")
+    parser.add_argument("--position", required=True, help="Position label, e.g. WR, DB, TE, RB")
+    parser.add_argument("--long", type=str, default=None, help="Long-format CSV with a Year column")
+    parser.add_argument("--season", action="append", default=[], metavar="YEAR=PATH", help="Per-season CSV (repeatable)")
+    parser.add_argument("--id-col", type=str, default="Player", help="Player id column")
+    parser.add_argument("--output", type=str, required=True, help="Blended CSV to write")
+    args = parser.parse_args()
+
+    if args.long:
+        blend_files(args.long, args.output, args.position.upper(), args.id_col)
+    else:
+        seasons = {int(year): path for year, path in (s.split("=", 1) for s in args.season)}
+        blend_files(seasons, args.output, args.position.upper(), args.id_col, long_format=False)
@@ -5,6 +5,8 @@
 # -------------------------------
 NFL_SCHEDULE_2025_FILE = "DATA/NFL_SCHEDULE_2025.csv"
 WR_STATS_2024_FILE = "DATA/WR_STATS_2024.csv"
+TE_STATS_2024_FILE = "DATA/TE_STATS_2024.csv"
+RB_STATS_2024_FILE = "DATA/RB_STATS_2024.csv"
 DB_ALIGNMENT_FILE = "DATA/DB_STATS_2022_2023_2024.csv"
 DEF_COVERAGE_TAGS_FILE = "DEF_COVERAGE_TAGS.csv"
 ROSTER_2025_FILE = "roster_2025.csv"
@@ -20,6 +22,15 @@ SLOT_WEIGHT_MULTIPLIER = 1.0
 WIDE_WEIGHT_MULTIPLIER = 1.0
 SAFETY_WEIGHT_MULTIPLIER = 0.2
 LB_WEIGHT_MULTIPLIER = 0.1
+TE_WEIGHT_MULTIPLIERS = {"slot": 1.0, "wide": 1.0, "safety": 1.0, "lb": 1.0}
+RB_WEIGHT_MULTIPLIERS = {"slot": 1.0, "wide": 1.0, "safety": 1.0, "lb": 1.0}
+
+# -------------------------------
+# Positions
+# -------------------------------
+# Pass catchers projected together in one slate; a position whose stats file is missing is skipped (WR is required)
+PROJECT_POSITIONS = ["WR", "TE", "RB"]
+POSITION_STATS_FILES = {"WR": WR_STATS_2024_FILE, "TE": TE_STATS_2024_FILE, "RB": RB_STATS_2024_FILE}
 
 # -------------------------------
 # Coverage Scheme Logic
@@ -32,22 +43,116 @@ DEFAULT_MAN_ZONE_BLEND = True  # Blend man/zone usage if no hard split
 WEIGHT_2024 = 0.5
 WEIGHT_2023 = 0.3
 WEIGHT_2022 = 0.2
+BLEND_RECENCY_WEIGHTS = [WEIGHT_2024, WEIGHT_2023, WEIGHT_2022]  # Latest season first
+BLEND_DECAY = 0.6  # Each season older than the weights above gets this x the next-newer season's weight
+BLEND_SAMPLE_WEIGHTING = True  # Also weight seasons by routes/targets so short seasons count less
+WR_SEASON_FILES = {
+    2024: "ADVANCED_WR_STATS_2024.csv",
+    2023: "ADVANCED_WR_STATS_2023.csv",
+    2022: "ADVANCED_WR_STATS_2022.csv",
+}
+
+# -------------------------------
+# Parallel Execution
+# -------------------------------
+SIM_WORKERS = 0  # 0 = one worker per CPU core, 1 = run in-process
+SIM_CHUNK_SIZE = 32  # WRs per work unit; each unit walks all weeks in order
+SIM_SEED = 2025  # Per-WR RNG streams make results identical for any worker count (None = unseeded)
+
+# -------------------------------
+# Monte Carlo
+# -------------------------------
+MC_SIMULATIONS = 100  # Samples per WR per week (0 = point projections only)
+MC_STD_DEV = 2.0
+MC_QUANTILES = [25, 50, 75]  # Reported as adj_pts_p25, adj_pts_p50, ...
+MC_FLOOR_QUANTILE = 10
+MC_CEILING_QUANTILE = 90
+MC_BOOM_POINTS = 20.0  # boom_prob = P(points >= this)
+MC_BUST_POINTS = 5.0  # bust_prob = P(points <= this)
+MC_MAX_BLOCK_ELEMENTS = 4_000_000  # Samples held in memory at once (~32 MB of float64)
+MC_MODE = "independent"  # "independent" per-WR draws, or "game" for correlated game-level slates
+MC_GAME_STD = 0.15  # Shared game-script/environment shock (fraction of volume), both teams in a game
+MC_TEAM_STD = 0.10  # Per-team passing-volume shock
+MC_SHARE_CONCENTRATION = 20.0  # Dirichlet concentration of per-WR target shares (higher = steadier)
 
 # -------------------------------
 # Output
 # -------------------------------
 EXPORT_FULL_SEASON_FILE = "season_projection_output.csv"
 EXPORT_TEST_WEEK_FILE = "test_week_projection.csv"
+EXPORT_TEAM_STACK_FILE = "output/team_stack_projection.csv"  # Written in "game" Monte Carlo mode
+OUTPUT_FORMAT = "csv"  # "csv" or "parquet" (needs pyarrow; always partitioned by week)
+OUTPUT_PARTITION_BY_WEEK = False  # CSV only: one file per week under <output name>/ instead of one file
+SAMPLE_DUMP_DIR = None  # Directory for raw float32 Monte Carlo samples (None = don't keep samples)
+INCREMENTAL_STATE_FILE = ".cache/season_state.json"  # Input-slice fingerprints of the last season run
+PROFILE_DIR = "output/profile"  # --profile writes profile.prof, profile.txt and trace.json here
+SWEEP_OUTPUT_DIR = "output/sweep"  # --mode sweep writes summary.csv plus one variant_NNN.csv per variant
+SWEEP_PARAMS = [  # Settings a sweep variant (or a service override) may change
+    "SLOT_WEIGHT_MULTIPLIER",
+    "WIDE_WEIGHT_MULTIPLIER",
+    "SAFETY_WEIGHT_MULTIPLIER",
+    "LB_WEIGHT_MULTIPLIER",
+    "USE_SOFT_ALIGNMENT",
+    "CLIMATE_PHASE",
+    "BLEND_RECENCY_WEIGHTS",
+    "BLEND_DECAY",
+]
+BENCHMARK_HISTORY_FILE = "output/benchmark_history.json"  # benchmark.py appends one entry per case
+BENCHMARK_REGRESSION_TOLERANCE = 0.25  # Flag a stage that is >25% slower than the last matching run
+
+# -------------------------------
+# Pipeline (pipeline.py)
+# -------------------------------
+PIPELINE_STATE_FILE = ".cache/pipeline_state.json"  # Input fingerprints of each stage's last successful run
+PIPELINE_WORKERS = 2  # Independent stages run side by side (the season simulation has its own SIM_WORKERS pool)
+PIPELINE_TEST_WEEK = 1  # The export stage writes this week of the season run to EXPORT_TEST_WEEK_FILE
+WEATHER_BOOST_FILE = "output/weather_boosts.csv"  # Per-game environment boosts written by the weather stage
+
+# -------------------------------
+# Backtest
+# -------------------------------
+BACKTEST_SEASONS = {2024: "DATA/NFL_SCHEDULE_2024.csv"}  # Season -> schedule replayed by --mode backtest
+BACKTEST_ACTUALS_FILE = "DATA/WR_WEEKLY_ACTUALS.csv"  # Year, Week, Player, Team, FantasyPoints (one row per WR game)
+BACKTEST_COVERAGE_FILES = {}  # Season -> defensive coverage tags known before that season (none = no scheme tags)
+BACKTEST_OUTPUT_DIR = "output/backtest"
+BACKTEST_FORM_SOURCE = "actual"  # Recent form from "actual" points of earlier weeks, or the model's own "projected" points
+BACKTEST_FORM_SOURCES = ("actual", "projected")
+BACKTEST_STATS_LAG = 1  # Blend only seasons <= season - lag (0 lets the replayed season's own aggregates in)
+
+# -------------------------------
+# Projection Service
+# -------------------------------
+SERVICE_HOST = "127.0.0.1"  # Local only; --mode serve is not meant to face a network
+SERVICE_PORT = 8765
+SERVICE_SOCKET = None  # Path of a Unix socket to listen on instead of host:port
+SERVICE_RELOAD_INTERVAL = 2.0  # Seconds between input-file change checks (0 = no hot reload)
+SERVICE_VARIANT_CACHE_SIZE = 8  # Override slates kept warm (least recently used dropped first)
+SERVICE_MAX_BODY_BYTES = 1 << 20  # Larger request bodies are refused with 413 before they are read
+
+# -------------------------------
+# Input Cache
+# -------------------------------
+USE_INPUT_CACHE = True  # Reuse parsed tables/derived maps while source files are unchanged
+INPUT_CACHE_DIR = ".cache/inputs"
 
 # -------------------------------
 # Logging + Quality Control
 # -------------------------------
-ENABLE_QUALITY_CONTROL = True
+ENABLE_QUALITY_CONTROL = True  # Validate every input file against its schema before simulating (skipped while unchanged)
+QC_FAIL_FAST = True  # Stop before simulating when validation finds errors (False = report them and continue)
+QC_WORKERS = 4  # Input files read and checked concurrently
+QC_SNAPSHOT_FILE = ".cache/validated_inputs.json"  # Fingerprints of the last input set that passed validation
+LOG_LEVEL = "normal"  # "quiet" (warnings only), "normal" (progress), "verbose" (per-step detail)
 
 # -------------------------------
 # Alignment Logic
 # -------------------------------
 USE_SOFT_ALIGNMENT = True  # Enable probabilistic DB role assignment
+MATCHUP_MODE = "defender"  # "defender" (per-DB coverage assignment with shadow draws) or "role" (team-average role penalties)
+MATCHUP_SINKHORN_ITERS = 30  # Balancing passes of the expected coverage assignment
+MATCHUP_AFFINITY_FLOOR = 0.05  # Any defender can end up on any WR (busted coverage, switches)
+PERSIST_PENALTY_CACHE = True  # Reuse defense penalty profiles across runs
+PENALTY_CACHE_FILE = ".cache/defense_penalties.json"
 
 # -------------------------------
 # Environment Settings
@@ -55,3 +160,9 @@ USE_SOFT_ALIGNMENT = True  # Enable probabilistic DB role assignment
 FORCE_DOME_NO_WEATHER_PENALTY = True
 CLIMATE_PHASE = "Neutral"  # Options: "ElNino", "LaNina", "Neutral"
 USE_FORECAST_WEATHER = True
+NOAA_API_BASE = "https://api.weather.gov"  # Point at a local stub server for offline runs
+FORECAST_CACHE_FILE = ".cache/noaa_forecasts.json"
+FORECAST_TTL_SECONDS = 3 * 60 * 60  # Forecast periods refresh a few times a day
+GRIDPOINT_TTL_SECONDS = 30 * 24 * 60 * 60  # lat/lon -> gridpoint mapping rarely changes
+FORECAST_CONCURRENCY = 8
+FORECAST_RETRIES = 3
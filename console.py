@@ -0,0 +1,47 @@
+# console.py
+
+import logging
+from config import LOG_LEVEL
+
+LEVELS = {"quiet": logging.WARNING, "normal": logging.INFO, "verbose": logging.DEBUG}
+
+logger = logging.getLogger("yaculator")
+
+
+class _PrintHandler(logging.Handler):
+    """Emit through print(), so messages follow sys.stdout even when a caller redirects it."""
+
+    def emit(self, record):
+        try:
+            print(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+
+def setup(level=LOG_LEVEL):
+    """Set the verbosity for this process: "quiet", "normal" or "verbose"."""
+    if level not in LEVELS:
+        raise ValueError(f"Unknown log level '{level}' (expected one of {', '.join(LEVELS)})")
+    if not logger.handlers:
+        handler = _PrintHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.propagate = False
+    logger.setLevel(LEVELS[level])
+
+
+def current_level():
+    return next(name for name, value in LEVELS.items() if value == logger.level)
+
+
+def verbose():
+    """True when debug detail is shown; check it before building expensive messages."""
+    return logger.isEnabledFor(logging.DEBUG)
+
+
+setup()
+
+debug = logger.debug
+info = logger.info
+warning = logger.warning
+error = logger.error
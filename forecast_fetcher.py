@@ -0,0 +1,131 @@
+# forecast_fetcher.py
+
+import asyncio
+import json
+import os
+import random
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from config import (
+    NOAA_API_BASE,
+    FORECAST_CACHE_FILE,
+    FORECAST_TTL_SECONDS,
+    GRIDPOINT_TTL_SECONDS,
+    FORECAST_CONCURRENCY,
+    FORECAST_RETRIES,
+)
+import console
+
+USER_AGENT = "YACulator (https://github.com/joshshua989/YACulator)"
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class DiskCache:
+    """JSON key/value store where every entry carries its fetch time and is dropped once older than its TTL."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                console.warning(f"⚠️ Ignoring unreadable forecast cache {path}: {e}")
+
+    def get(self, key, ttl):
+        entry = self.entries.get(key)
+        if entry and time.time() - entry["fetched"] < ttl:
+            return entry["data"]
+        return None
+
+    def put(self, key, data):
+        self.entries[key] = {"fetched": time.time(), "data": data}
+        self._dirty = True
+
+    def save(self):
+        if not self.path or not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        self._dirty = False
+
+
+class ForecastFetcher:
+    """
+    Concurrent NOAA client: a bounded pool of worker threads sharing one keep-alive Session,
+    in-flight deduplication of gridpoint and forecast URLs, retry with exponential backoff,
+    and a persistent TTL cache. `base_url` can point at a local stub server for offline runs.
+    """
+
+    def __init__(self, base_url=NOAA_API_BASE, cache_path=FORECAST_CACHE_FILE, concurrency=FORECAST_CONCURRENCY,
+                 retries=FORECAST_RETRIES, timeout=10, backoff=0.5):
+        self.base_url = base_url.rstrip("/")
+        self.cache = DiskCache(cache_path)
+        self.concurrency = max(int(concurrency), 1)
+        self.retries = retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self.network_calls = 0
+        self.cache_hits = 0
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": USER_AGENT, "Accept": "application/geo+json"})
+        adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    async def _get_json(self, url, semaphore):
+        for attempt in range(self.retries + 1):
+            async with semaphore:
+                try:
+                    self.network_calls += 1
+                    resp = await asyncio.to_thread(self.session.get, url, timeout=self.timeout)
+                    if resp.status_code not in RETRY_STATUS:
+                        resp.raise_for_status()
+                        return resp.json()
+                    error = requests.HTTPError(f"{resp.status_code} for {url}")
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    error = e
+            if attempt < self.retries:
+                await asyncio.sleep(self.backoff * (2 ** attempt) * (1 + random.random()))
+        raise error
+
+    async def _cached(self, key, ttl, url, semaphore, inflight):
+        data = self.cache.get(key, ttl)
+        if data is not None:
+            self.cache_hits += 1
+            return data
+        if key not in inflight:
+            inflight[key] = asyncio.ensure_future(self._get_json(url, semaphore))
+        data = await inflight[key]
+        self.cache.put(key, data)
+        return data
+
+    async def _forecast(self, lat, lon, semaphore, inflight):
+        point = await self._cached(f"point:{lat},{lon}", GRIDPOINT_TTL_SECONDS,
+                                   f"{self.base_url}/points/{lat},{lon}", semaphore, inflight)
+        forecast_url = point["properties"]["forecast"]
+        return await self._cached(f"forecast:{forecast_url}", FORECAST_TTL_SECONDS, forecast_url, semaphore, inflight)
+
+    async def fetch_all_async(self, locations):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        inflight = {}
+        locations = list(dict.fromkeys(locations))
+        outcomes = await asyncio.gather(
+            *(self._forecast(lat, lon, semaphore, inflight) for lat, lon in locations),
+            return_exceptions=True,
+        )
+        self.cache.save()
+        return dict(zip(locations, outcomes))
+
+    def fetch_all(self, locations):
+        """
+        Fetch forecasts for every (lat, lon) concurrently. Returns {(lat, lon): forecast JSON or Exception}.
+        """
+        return asyncio.run(self.fetch_all_async(locations))
+
+    def stats(self):
+        return {"network_calls": self.network_calls, "cache_hits": self.cache_hits}
@@ -0,0 +1,250 @@
+# game_simulator.py
+
+import numpy as np
+from monte_carlo import partition_quantiles, quantile_label, game_stream
+from output_writer import write_sample_part
+
+QUANTILE_BINS = 2048  # Histogram bins per column used to find exact quantiles when a week spans several blocks
+
+
+def game_layout(tables, out):
+    """
+    Index the WRs of one projected week by team and game.
+    A game is keyed by the lower of its two team codes, so both sides share one game shock.
+    """
+    team_codes = tables["team_codes"][out["rows"]]
+    team_keys, team_idx = np.unique(team_codes, return_inverse=True)
+    opp_of_team = tables["opponent"][out["week"]][team_keys]
+    game_keys, game_of_team = np.unique(np.minimum(team_keys, opp_of_team), return_inverse=True)
+    onehot = np.zeros((len(team_codes), len(team_keys)), dtype=np.float32)
+    onehot[np.arange(len(team_codes)), team_idx] = 1.0
+    pos = {code: k for k, code in enumerate(team_keys)}
+    return {
+        "team_keys": team_keys,
+        "team_idx": team_idx,
+        "onehot": onehot,
+        "opp_of_team": opp_of_team,
+        "opp_idx": np.array([pos.get(code, -1) for code in opp_of_team], dtype=int),
+        "game_keys": game_keys,
+        "game_of_team": game_of_team,
+    }
+
+
+def target_shares(adj_pts, team_idx, n_teams):
+    """Each WR's expected share of its team's WR points (teams with no expected points split evenly)."""
+    pts = np.maximum(adj_pts, 0.0)
+    team_total = np.bincount(team_idx, weights=pts, minlength=n_teams)
+    team_size = np.bincount(team_idx, minlength=n_teams)
+    return np.where(team_total[team_idx] > 0, pts / np.where(team_total > 0, team_total, 1.0)[team_idx], 1.0 / team_size[team_idx])
+
+
+def draw_block(rng, means, layout, shares, mc, n):
+    """
+    n correlated slates for one week, as an (n x WR) array:
+    game shock (shared by both teams) -> team passing volume -> Dirichlet target split -> WR noise.
+    """
+    team_idx, game_of_team = layout["team_idx"], layout["game_of_team"]
+    n_teams = len(layout["team_keys"])
+
+    game_shock = rng.normal(0.0, mc.game_std, (n, len(layout["game_keys"])))
+    team_shock = rng.normal(0.0, mc.team_std, (n, n_teams))
+    volume = np.maximum(1.0 + game_shock[:, game_of_team] + team_shock, 0.0)
+
+    # Dirichlet split within each team via normalised gammas; share_rel averages 1 per WR
+    gammas = rng.gamma(np.maximum(shares * mc.share_concentration, 1e-9), 1.0, (n, len(means)))
+    team_sum = gammas @ layout["onehot"]
+    # WRs projected for no points hold no share to split (0 / 0); they keep their mean
+    held = shares > 0
+    share_rel = np.ones_like(gammas)
+    share_rel[:, held] = gammas[:, held] / np.maximum(team_sum[:, team_idx[held]], 1e-12) / shares[held]
+
+    noise = rng.normal(0.0, mc.std_dev, (n, len(means)))
+    return means * volume[:, team_idx] * share_rel + noise
+
+
+def slate_columns(block, layout):
+    """
+    A block of slates (n x WR, float32) extended with each team's summed WR points and the total of its
+    game: (n x (WR + 2 teams)) float32 in [WRs, team stacks, game stacks] column order.
+    """
+    team_pts = block @ layout["onehot"]
+    opp_idx = layout["opp_idx"]
+    opp_pts = np.where(opp_idx >= 0, team_pts[:, np.maximum(opp_idx, 0)], np.float32(0.0))
+    return np.concatenate([block, team_pts, team_pts + opp_pts], axis=1)
+
+
+def slate_blocks(means, layout, shares, mc, seed, week):
+    """
+    Every block of correlated slates for one week, at most mc.max_block WR samples each, as slate_columns.
+    The week's stream is reopened on every call, so a pass over the blocks can be replayed exactly.
+    """
+    rng = game_stream(seed, week)
+    sims_per_block = max(1, mc.max_block // len(means))
+    for start in range(0, mc.simulations, sims_per_block):
+        stop = min(start + sims_per_block, mc.simulations)
+        yield slate_columns(draw_block(rng, means, layout, shares, mc, stop - start).astype(np.float32), layout)
+
+
+def column_stats(replay, n, n_cols, percents, mc, pairs):
+    """
+    Per-column statistics over n simulated slates, holding one block from `replay()` at a time.
+    Pass 1 sums, extremes and boom/bust counts; pass 2 squared deviations, the co-moment of each column
+    pair in `pairs` and a histogram of every column over its range; pass 3 keeps only the values in the
+    bins holding the order statistics the percentiles interpolate, so quantiles match np.percentile.
+    A single block skips the histogram and partitions directly.
+    """
+    total, boom, bust = np.zeros(n_cols), np.zeros(n_cols), np.zeros(n_cols)
+    lo, hi = np.full(n_cols, np.inf), np.full(n_cols, -np.inf)
+    n_blocks = 0
+    for cols in replay():
+        n_blocks += 1
+        total += cols.sum(axis=0, dtype=float)
+        lo, hi = np.minimum(lo, cols.min(axis=0)), np.maximum(hi, cols.max(axis=0))
+        boom += (cols >= mc.boom).sum(axis=0)
+        bust += (cols <= mc.bust).sum(axis=0)
+    mean = total / n
+
+    finite = np.isfinite(lo) & np.isfinite(hi)
+    lo, scale = np.where(finite, lo, 0.0), QUANTILE_BINS / np.where(finite & (hi > lo), hi - lo, 1.0)
+    offsets = np.arange(n_cols) * QUANTILE_BINS
+
+    def bin_keys(cols):
+        bins = np.clip(np.nan_to_num((cols - lo) * scale), 0, QUANTILE_BINS - 1).astype(np.int64)
+        return bins + offsets
+
+    m2, co = np.zeros(n_cols), np.zeros(len(pairs))
+    counts = np.zeros(n_cols * QUANTILE_BINS, dtype=np.int64)
+    for cols in replay():
+        dev = cols - mean
+        m2 += (dev * dev).sum(axis=0)
+        co += (dev[:, pairs[:, 0]] * dev[:, pairs[:, 1]]).sum(axis=0)
+        if n_blocks > 1:
+            counts += np.bincount(bin_keys(cols).ravel(), minlength=len(counts))
+
+    if n_blocks == 1:
+        quantiles = partition_quantiles(np.ascontiguousarray(next(replay()).T), percents)
+    else:
+        virtual = np.asarray(percents, dtype=float) / 100.0 * (n - 1)
+        below = np.floor(virtual).astype(int)
+        above = np.minimum(below + 1, n - 1)
+        ranks = np.unique(np.concatenate([below, above]))
+
+        # Bin holding each wanted rank, and how many values sit in the column's lower bins
+        cum = counts.reshape(n_cols, QUANTILE_BINS).cumsum(axis=1)
+        rank_bin = (cum[:, :, None] <= ranks[None, None, :]).sum(axis=1)
+        before = np.where(rank_bin > 0, np.take_along_axis(cum, np.maximum(rank_bin - 1, 0), axis=1), 0)
+        wanted = np.zeros(n_cols * QUANTILE_BINS, dtype=bool)
+        wanted[(rank_bin + offsets[:, None]).ravel()] = True
+
+        values, keys = [], []
+        for cols in replay():
+            block_keys = bin_keys(cols)
+            keep = wanted[block_keys]
+            values.append(cols[keep])
+            keys.append(block_keys[keep])
+        values, keys = np.concatenate(values), np.concatenate(keys)
+        order = np.lexsort((values, keys))
+        values, keys = values[order], keys[order]
+        starts = np.searchsorted(keys, rank_bin + offsets[:, None])
+        at_rank = values[starts + ranks[None, :] - before]  # (columns x ranks)
+        lo_vals, hi_vals = at_rank[:, np.searchsorted(ranks, below)], at_rank[:, np.searchsorted(ranks, above)]
+        quantiles = (lo_vals + (hi_vals - lo_vals) * (virtual - below)).T
+        quantiles[:, ~finite] = np.nan
+
+    return {
+        "mean": mean,
+        "std": np.sqrt(m2 / n),
+        "quantiles": quantiles,
+        "boom": boom / n,
+        "bust": bust / n,
+        "co": co / n,
+    }
+
+
+def simulate_games(tables, out, mc, keep=False):
+    """
+    Correlated Monte Carlo for one projected week. Draws mc.simulations whole slates in blocks of
+    at most mc.max_block WR samples and reduces each block as it is drawn, so memory stays bounded
+    however many slates are asked for; a week needing several blocks replays its stream (keyed by
+    (seed, week), so results don't depend on how the point projections were split across workers)
+    instead of holding every slate. Returns (stats, layout, samples): stats covers the slate_columns
+    (WRs, team stacks, game stacks); samples is the (simulations x WR) float32 matrix only when `keep`.
+    """
+    means = np.asarray(out["adj_pts"], dtype=float)
+    n, n_rows = mc.simulations, len(means)
+    layout = game_layout(tables, out)
+    n_teams = len(layout["team_keys"])
+    percents = list(mc.quantiles) + [mc.floor_q, mc.ceiling_q]
+    team_cols = n_rows + np.arange(n_teams)
+    has_opp = layout["opp_idx"] >= 0
+    pairs = np.column_stack([team_cols[has_opp], n_rows + layout["opp_idx"][has_opp]]).astype(int).reshape(-1, 2)
+    if n_rows == 0:
+        empty = np.zeros(0)
+        return {"mean": empty, "std": empty, "quantiles": np.zeros((len(percents), 0)), "boom": empty, "bust": empty, "co": empty}, layout, (np.zeros((n, 0), dtype=np.float32) if keep else None)
+
+    shares = target_shares(means, layout["team_idx"], n_teams)
+    # An unseeded run still needs a fixed stream to replay, so it draws its entropy once
+    seed = mc.seed if mc.seed is not None else np.random.SeedSequence().entropy
+    replay = lambda: slate_blocks(means, layout, shares, mc, seed, out["week"])
+    if n <= max(1, mc.max_block // n_rows):
+        blocks = list(replay())  # a single block is kept rather than redrawn for every pass
+        replay = lambda: iter(blocks)
+    stats = column_stats(replay, n, n_rows + 2 * n_teams, percents, mc, pairs)
+    stats["pairs"] = pairs
+    samples = np.concatenate([cols[:, :n_rows] for cols in replay()]) if keep else None
+    return stats, layout, samples
+
+
+def wr_stats(stats, n_rows):
+    """The WR columns of simulate_games stats, in sample_stats form (floor and ceiling split out)."""
+    return {
+        "mean": stats["mean"][:n_rows],
+        "std": stats["std"][:n_rows],
+        "quantiles": stats["quantiles"][:-2, :n_rows],
+        "boom": stats["boom"][:n_rows],
+        "bust": stats["bust"][:n_rows],
+        "floor": stats["quantiles"][-2, :n_rows],
+        "ceiling": stats["quantiles"][-1, :n_rows],
+    }
+
+
+def stack_rows(meta, out, stats, layout, mc):
+    """
+    Per-team stack distribution for one week: the summed WR points of each team, of its whole game,
+    and the correlation between the two sides of the game across simulated slates.
+    """
+    team_idx = layout["team_idx"]
+    n_rows, n_teams = len(team_idx), len(layout["team_keys"])
+    corr = {}
+    for (a, b), co in zip(stats["pairs"], stats["co"]):
+        std_a, std_b = stats["std"][a], stats["std"][b]
+        corr[a - n_rows] = co / (std_a * std_b) if std_a > 0 and std_b > 0 else np.nan
+    rows = []
+    for k, code in enumerate(layout["team_keys"]):
+        team, game = n_rows + k, n_rows + n_teams + k
+        row = {
+            "week": out["week"],
+            "team": meta["teams"][code],
+            "opp_team": meta["teams"][layout["opp_of_team"][k]],
+            "wr_count": int((team_idx == k).sum()),
+            "stack_mean": round(float(stats["mean"][team]), 2),
+        }
+        row.update({f"stack_p{quantile_label(q)}": round(float(stats["quantiles"][i, team]), 2) for i, q in enumerate(mc.quantiles)})
+        row["game_mean"] = round(float(stats["mean"][game]), 2)
+        row.update({f"game_p{quantile_label(q)}": round(float(stats["quantiles"][i, game]), 2) for i, q in enumerate(mc.quantiles)})
+        row["opp_corr"] = round(float(corr[k]), 3) if k in corr and not np.isnan(corr[k]) else np.nan
+        rows.append(row)
+    return rows
+
+
+def simulate_week(tables, meta, out, mc):
+    """
+    Attach correlated per-WR stats (out["mc"]) and team stacks (out["stacks"]). With mc.samples_dir set
+    the week's raw slates are also written there, one WR x sims part per week.
+    """
+    stats, layout, samples = simulate_games(tables, out, mc, keep=bool(mc.samples_dir))
+    out["mc"] = wr_stats(stats, len(out["rows"]))
+    out["stacks"] = stack_rows(meta, out, stats, layout, mc)
+    if samples is not None:
+        write_sample_part(mc.samples_dir, out["week"], 0, out["rows"], samples.T)
+    return out
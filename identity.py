@@ -0,0 +1,184 @@
+# identity.py
+
+import os
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
+from config import ROSTER_2025_FILE, ROSTER_2024_FILE
+
+# Canonical team ids: position in this list (fixed, so an id means the same franchise in every input and season)
+TEAM_REGISTRY = [
+    ("ARI", "Arizona Cardinals"),
+    ("ATL", "Atlanta Falcons"),
+    ("BAL", "Baltimore Ravens"),
+    ("BUF", "Buffalo Bills"),
+    ("CAR", "Carolina Panthers"),
+    ("CHI", "Chicago Bears"),
+    ("CIN", "Cincinnati Bengals"),
+    ("CLE", "Cleveland Browns"),
+    ("DAL", "Dallas Cowboys"),
+    ("DEN", "Denver Broncos"),
+    ("DET", "Detroit Lions"),
+    ("GB", "Green Bay Packers"),
+    ("HOU", "Houston Texans"),
+    ("IND", "Indianapolis Colts"),
+    ("JAX", "Jacksonville Jaguars"),
+    ("KC", "Kansas City Chiefs"),
+    ("LAC", "Los Angeles Chargers"),
+    ("LAR", "Los Angeles Rams"),
+    ("LV", "Las Vegas Raiders"),
+    ("MIA", "Miami Dolphins"),
+    ("MIN", "Minnesota Vikings"),
+    ("NE", "New England Patriots"),
+    ("NO", "New Orleans Saints"),
+    ("NYG", "New York Giants"),
+    ("NYJ", "New York Jets"),
+    ("PHI", "Philadelphia Eagles"),
+    ("PIT", "Pittsburgh Steelers"),
+    ("SEA", "Seattle Seahawks"),
+    ("SF", "San Francisco 49ers"),
+    ("TB", "Tampa Bay Buccaneers"),
+    ("TEN", "Tennessee Titans"),
+    ("WAS", "Washington Commanders"),
+]
+
+# Other spellings used by stat sites, schedules and rosters, plus relocations and renames (franchise keeps its id)
+TEAM_ALIASES = {
+    "ARZ": "ARI", "BLT": "BAL", "CLV": "CLE", "HST": "HOU", "JAC": "JAX", "KAN": "KC", "GNB": "GB",
+    "NWE": "NE", "NOR": "NO", "SFO": "SF", "TAM": "TB", "WSH": "WAS", "LVR": "LV", "LA": "LAR",
+    "OAK": "LV", "Oakland Raiders": "LV",  # moved to Las Vegas in 2020
+    "SD": "LAC", "SDG": "LAC", "San Diego Chargers": "LAC",  # moved to Los Angeles in 2017
+    "STL": "LAR", "St. Louis Rams": "LAR",  # moved to Los Angeles in 2016
+    "Washington Redskins": "WAS", "Washington Football Team": "WAS", "Washington": "WAS",  # renamed 2020, 2022
+    "Tennessee Oilers": "TEN", "Houston Oilers": "TEN",  # franchise moved to Tennessee in 1997
+}
+
+_SUFFIXES = {"jr", "sr", "ii", "iii", "iv", "v"}
+
+
+def _team_key(label):
+    return re.sub(r"[^A-Z0-9]", "", str(label).upper())
+
+
+def _build_team_lookup():
+    lookup = {}
+    for abbr, full in TEAM_REGISTRY:
+        lookup[_team_key(abbr)] = abbr
+        lookup[_team_key(full)] = abbr
+        lookup[_team_key(full.rsplit(" ", 1)[-1])] = abbr  # nickname alone ("Eagles")
+    for alias, abbr in TEAM_ALIASES.items():
+        lookup[_team_key(alias)] = abbr
+    return lookup
+
+
+TEAM_LOOKUP = _build_team_lookup()
+
+
+def canonical_team(label):
+    """Registry abbreviation for any known spelling of a team; unknown labels come back stripped but unchanged."""
+    if label is None or (isinstance(label, float) and np.isnan(label)):
+        return ""
+    return TEAM_LOOKUP.get(_team_key(label), str(label).strip())
+
+
+def canonical_teams(labels):
+    """canonical_team over an array, resolving each distinct label once."""
+    codes, uniques = pd.factorize(pd.Series(labels, dtype=object), use_na_sentinel=False)
+    return np.array([canonical_team(u) for u in uniques], dtype=object)[codes] if len(codes) else np.array([], dtype=object)
+
+
+class TeamIndex:
+    """
+    Team label -> integer id. Registry teams always hold ids 0..31 whatever the input calls them
+    ("PHI", "Philadelphia Eagles", "Eagles"); labels outside the registry (synthetic leagues, typos)
+    are interned after them in sorted order and listed in `unregistered`.
+    """
+
+    def __init__(self, labels=()):
+        canonical = set(canonical_teams(list(labels))) - {""}
+        registry = [abbr for abbr, _ in TEAM_REGISTRY]
+        self.unregistered = sorted(canonical - set(registry))
+        self.labels = registry + self.unregistered
+        self.codes = {label: code for code, label in enumerate(self.labels)}
+
+    def __len__(self):
+        return len(self.labels)
+
+    def id(self, label):
+        return self.codes.get(canonical_team(label), -1)
+
+    def ids(self, labels):
+        """Vectorized id lookup (-1 for labels that resolve to no indexed team)."""
+        return np.array([self.codes.get(c, -1) for c in canonical_teams(labels)], dtype=int)
+
+
+# --- Players ---
+def player_key(name):
+    """Name normalized for joins: accents, punctuation, case and generational suffixes removed."""
+    if name is None or (isinstance(name, float) and np.isnan(name)):
+        return ""
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode("ascii").lower()
+    words = re.sub(r"[^a-z0-9 ]", "", text.replace("-", " ")).split()
+    while len(words) > 1 and words[-1] in _SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+def player_keys(names):
+    codes, uniques = pd.factorize(pd.Series(names, dtype=object), use_na_sentinel=False)
+    return np.array([player_key(u) for u in uniques], dtype=object)[codes] if len(codes) else np.array([], dtype=object)
+
+
+ROSTER_FILES = (ROSTER_2025_FILE, ROSTER_2024_FILE)
+
+
+def roster_file(paths=ROSTER_FILES):
+    """First roster file that exists, or None."""
+    return next((p for p in paths if p and os.path.exists(p)), None)
+
+
+class PlayerIndex:
+    """
+    Player -> integer id, keyed by roster gsis_id where a roster file resolves the player (by normalized
+    name, and team when two rostered players share a name) and by normalized name otherwise.
+    """
+
+    def __init__(self, roster=None):
+        self.uids = []
+        self.codes = {}
+        self.by_name = {}
+        self.by_name_team = {}
+        if roster is not None and {"full_name", "gsis_id"} <= set(roster.columns):
+            roster = roster[roster["gsis_id"].notna()]
+            keys = player_keys(roster["full_name"].to_numpy())
+            teams = canonical_teams(roster["team"].to_numpy()) if "team" in roster.columns else np.full(len(roster), "")
+            for key, team, gsis in zip(keys, teams, roster["gsis_id"].astype(str)):
+                self.by_name.setdefault(key, set()).add(gsis)
+                self.by_name_team[(key, team)] = gsis
+
+    @classmethod
+    def from_roster(cls, paths=ROSTER_FILES):
+        """Index backed by the first roster file that exists (none = name keys only)."""
+        path = roster_file(paths)
+        return cls(pd.read_csv(path) if path else None)
+
+    def uid(self, name, team=None):
+        key = player_key(name)
+        gsis = self.by_name_team.get((key, canonical_team(team))) if team is not None else None
+        if gsis is None and len(self.by_name.get(key, ())) == 1:
+            gsis = next(iter(self.by_name[key]))
+        return f"gsis:{gsis}" if gsis else f"name:{key}"
+
+    def ids(self, names, teams=None):
+        """Intern every (name, team) row and return its integer player id."""
+        teams = [None] * len(names) if teams is None else teams
+        out = np.empty(len(names), dtype=int)
+        for i, (name, team) in enumerate(zip(names, teams)):
+            uid = self.uid(name, team)
+            if uid not in self.codes:
+                self.codes[uid] = len(self.uids)
+                self.uids.append(uid)
+            out[i] = self.codes[uid]
+        return out
+
@@ -0,0 +1,209 @@
+# incremental.py
+
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+from config import INCREMENTAL_STATE_FILE, USE_SOFT_ALIGNMENT, DEFAULT_MAN_ZONE_BLEND, MATCHUP_MODE, PROJECT_POSITIONS
+from penalty_cache import defense_fingerprint
+from monte_carlo import MonteCarloSettings
+from slate_engine import project_row_set, finish_week, result_dicts, apply_results
+from output_writer import read_season, write_week_file
+
+STATE_VERSION = 4  # 2: Monte Carlo streams keyed by player id instead of row index; 3: missing DB stats penalize as 0, not NaN
+# 4: WR slices keyed by PlayerIndex uid instead of display name
+FORM_WEEKS = 3  # slate_engine.form_boost looks back this many weeks
+
+
+def _digest(*parts):
+    return hashlib.sha1(json.dumps(parts, default=float).encode("utf-8")).hexdigest()[:16]
+
+
+def slice_fingerprints(tables, meta, db_map, players):
+    """
+    Content hash of every input slice a projection reads:
+      wr:<uid>               the WR's team and kernel inputs from its stat row (uid: identity.PlayerIndex)
+      db:<team>              the defense's DB pool (with snap shares and shadow rates)
+      roster:<team>          the team's WR slices (defender matchup mode: teammates share the coverage)
+      coverage:<week>:<team> scheme tag of that defense in that week
+      weather:<week>:<team>  environment boost applied against that team in that week
+      schedule:<week>:<team> that team's opponent
+    """
+    teams, opponent = meta["teams"], tables["opponent"]
+    keys = [f"wr:{players.uids[pid]}" for pid in meta["player_ids"]]
+    fingerprints = {}
+    for i, wr in enumerate(meta["wrs"]):
+        fingerprints[keys[i]] = _digest(wr.team, tables["weights"][i].tolist(), tables["fpts"][i].tolist())
+    if "matchup_penalty" in tables:
+        members = {code: [] for code in range(len(teams))}
+        for i, key in enumerate(keys):
+            members.setdefault(int(tables["team_codes"][i]), []).append(fingerprints[key])
+        for code, team in enumerate(teams):
+            fingerprints[f"roster:{team}"] = _digest(sorted(members[code]))
+    for team in teams:
+        pool = db_map.get(team, {})
+        usage = [[float(getattr(db, "snap_share", 0) or 0), float(getattr(db, "shadow_rate", 0) or 0)] for db in sorted(pool.values(), key=lambda db: str(db.name))]
+        fingerprints[f"db:{team}"] = _digest(defense_fingerprint(pool), usage)
+    for week, code in zip(*np.nonzero(opponent >= 0)):
+        team = teams[code]
+        fingerprints[f"schedule:{week}:{team}"] = teams[opponent[week, code]]
+        fingerprints[f"coverage:{week}:{team}"] = meta["scheme_labels"][tables["scheme_code"][week, code]]
+        fingerprints[f"weather:{week}:{team}"] = round(float(tables["env"][week, code]), 6)
+    return fingerprints
+
+
+def run_settings(mc, weeks):
+    """Everything besides the input slices that changes every projection; a mismatch forces a full run."""
+    return {
+        "soft_alignment": USE_SOFT_ALIGNMENT,
+        "man_zone_blend": DEFAULT_MAN_ZONE_BLEND,
+        "matchup_mode": MATCHUP_MODE,
+        "positions": list(PROJECT_POSITIONS),
+        "weeks": [int(w) for w in weeks],
+        "mc": None if mc is None else {**mc._asdict(), "quantiles": list(mc.quantiles), "samples_dir": None},
+    }
+
+
+def load_state(path=INCREMENTAL_STATE_FILE):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state if state.get("version") == STATE_VERSION else None
+
+
+def save_state(fingerprints, settings, output, path=INCREMENTAL_STATE_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"version": STATE_VERSION, "settings": settings, "output": output, "slices": fingerprints}, f)
+
+
+def state_settings(state):
+    """MonteCarloSettings stored with the last season run (None if it had no sampling)."""
+    mc = state["settings"]["mc"]
+    return None if mc is None else MonteCarloSettings(**{**mc, "quantiles": tuple(mc["quantiles"])})
+
+
+def changed_slices(previous, current):
+    return sorted(key for key in set(previous) | set(current) if previous.get(key) != current.get(key))
+
+
+def affected_projections(changed, tables, meta, players):
+    """(WR row x week) mask of projections that read at least one changed slice directly."""
+    team_codes, opponent = tables["team_codes"], tables["opponent"]
+    n_weeks = opponent.shape[0]
+    code_of = {team: code for code, team in enumerate(meta["teams"])}
+    row_of = {players.uids[pid]: i for i, pid in enumerate(meta["player_ids"])}
+    # Opponent code of every WR in every week (-1 = no game)
+    opp_of_row = np.where((team_codes >= 0)[:, None], opponent[:, np.maximum(team_codes, 0)].T, -1)
+
+    dirty = np.zeros((len(team_codes), n_weeks), dtype=bool)
+    for key in changed:
+        kind, _, rest = key.partition(":")
+        if kind == "wr":
+            if rest in row_of:
+                dirty[row_of[rest]] = True
+            continue
+        if kind == "db":
+            if rest in code_of:
+                dirty |= opp_of_row == code_of[rest]
+            continue
+        if kind == "roster":
+            if rest in code_of:
+                dirty |= (team_codes == code_of[rest])[:, None]
+            continue
+        week, _, team = rest.partition(":")
+        week, code = int(week), code_of.get(team)
+        if code is None or week >= n_weeks:
+            continue
+        dirty[:, week] |= opp_of_row[:, week] == code
+        if kind == "schedule":
+            dirty[:, week] |= team_codes == code
+    return dirty
+
+
+def output_rows(df, meta, players):
+    """WR row of every row of a season output, matched on player id (NaN for players no longer loaded)."""
+    row_of = {pid: i for i, pid in enumerate(meta["player_ids"])}
+    return pd.Series(players.ids(df["wr_name"].to_numpy(), df["team"].to_numpy()), index=df.index).map(row_of)
+
+
+def seed_previous(tables, meta, previous_df, players):
+    """Fill the form history with the adj_pts of the saved season output."""
+    rows = output_rows(previous_df, meta, players)
+    known = rows.notna().to_numpy()
+    weeks = previous_df["week"].to_numpy(dtype=int)[known]
+    in_range = weeks < tables["history"].shape[1]
+    tables["history"][rows.to_numpy()[known][in_range].astype(int), weeks[in_range]] = previous_df["adj_pts"].to_numpy()[known][in_range]
+
+
+def reproject(tables, meta, dirty, weeks, mc=None):
+    """
+    Recompute the dirty projections week by week. A WR whose (rounded) adj_pts moves also dirties its
+    next FORM_WEEKS weeks, since recent form reads them; propagation stops as soon as values settle.
+    In "game" mode a touched week is re-simulated whole, because every WR shares its game shocks.
+    Returns {week: (recomputed WR rows, result dicts, team stack rows)}.
+    """
+    pending = dirty.copy()
+    history = tables["history"]
+    updates = {}
+    for week in sorted(int(w) for w in weeks):
+        candidates = np.flatnonzero(pending[:, week])
+        if candidates.size == 0:
+            continue
+        if mc is not None and mc.mode == "game":
+            candidates = np.arange(len(tables["team_codes"]))
+
+        out = finish_week(tables, meta, [project_row_set(tables, week, candidates, mc)], mc)
+        week_results = result_dicts(tables, meta, out, mc)
+
+        previous = history[candidates, week].copy()
+        history[candidates, week] = np.nan
+        apply_results(tables, meta, zip(out["rows"], week_results))
+        moved = candidates[~((previous == history[candidates, week]) | (np.isnan(previous) & np.isnan(history[candidates, week])))]
+        pending[moved, week + 1:week + 1 + FORM_WEEKS] = True
+
+        updates[week] = (candidates, week_results, out.get("stacks", []))
+    return updates
+
+
+def merge_updates(previous_df, updates, meta, players):
+    """Saved output with every recomputed (week, WR) replaced, in (week, WR row) order like a full run."""
+    rows = output_rows(previous_df, meta, players)
+    keep = rows.notna().to_numpy().copy()
+    for week, (candidates, _, _) in updates.items():
+        keep &= ~((previous_df["week"].to_numpy() == week) & rows.isin(candidates).to_numpy())
+
+    fresh = [pd.DataFrame(results) for _, results, _ in updates.values() if results]
+    merged = pd.concat([previous_df[keep]] + fresh, ignore_index=True).reindex(columns=previous_df.columns)
+    order = np.lexsort((output_rows(merged, meta, players).to_numpy(), merged["week"].to_numpy()))
+    return merged.iloc[order].reset_index(drop=True)
+
+
+def write_merged(merged, output, touched_weeks):
+    """Rewrite only the touched week files of a partitioned output; a single CSV is rewritten whole."""
+    if output["partition"]:
+        for week in touched_weeks:
+            week_df = merged[merged["week"] == week]
+            target = write_week_file(output["path"], week, week_df, output["fmt"])
+            if week_df.empty:
+                os.remove(target)
+    else:
+        merged.to_csv(output["path"], index=False)
+
+
+def merge_stacks(path, updates):
+    """Replace the team-stack rows of every re-simulated week (game mode only)."""
+    fresh = [row for _, _, stacks in updates.values() for row in stacks]
+    if not fresh:
+        return
+    stacks = pd.read_csv(path) if os.path.exists(path) else pd.DataFrame(columns=["week"])
+    stacks = stacks[~stacks["week"].isin(list(updates))]
+    merged = pd.concat([stacks, pd.DataFrame(fresh)], ignore_index=True).sort_values(["week", "team"], kind="stable")
+    merged.to_csv(path, index=False)
+
+
+def load_previous(output):
+    return read_season(output["path"], output["fmt"], output["partition"])
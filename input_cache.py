@@ -0,0 +1,132 @@
+# input_cache.py
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import numpy as np
+from config import INPUT_CACHE_DIR, USE_INPUT_CACHE
+import console
+
+CACHE_VERSION = 5  # 5: player and DB stores carry the PlayerIndex they were keyed with
+MMAP_MIN_BYTES = 4096  # smaller arrays stay inline in the pickle
+
+
+def file_fingerprint(path, known=None):
+    """
+    (size, mtime_ns, sha1) of a source file. When size and mtime match a previously recorded
+    fingerprint the stored hash is reused, so warm runs never re-read unchanged inputs.
+    """
+    stat = os.stat(path)
+    if known and known.get("size") == stat.st_size and known.get("mtime_ns") == stat.st_mtime_ns:
+        return dict(known)
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha1": digest.hexdigest()}
+
+
+class _ArrayPickler(pickle.Pickler):
+    """Writes large numeric arrays to side-car .npy files so they can be memory-mapped on load."""
+
+    def __init__(self, f, entry_dir):
+        super().__init__(f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.entry_dir = entry_dir
+        self.count = 0
+
+    def persistent_id(self, obj):
+        if type(obj) is np.ndarray and obj.dtype.kind in "biuf" and obj.nbytes >= MMAP_MIN_BYTES:
+            name = f"array_{self.count:04d}.npy"
+            self.count += 1
+            np.save(os.path.join(self.entry_dir, name), np.ascontiguousarray(obj))
+            return name
+        return None
+
+
+class _ArrayUnpickler(pickle.Unpickler):
+    def __init__(self, f, entry_dir):
+        super().__init__(f)
+        self.entry_dir = entry_dir
+
+    def persistent_load(self, pid):
+        return np.load(os.path.join(self.entry_dir, pid), mmap_mode="r")
+
+
+class InputCache:
+    """
+    On-disk cache of parsed input tables and derived structures.
+    Each entry is keyed by its source files (path, size, mtime, content hash) plus any config values
+    it depends on; large arrays inside cached objects are stored as .npy and memory-mapped on load.
+    """
+
+    def __init__(self, root=INPUT_CACHE_DIR, enabled=USE_INPUT_CACHE):
+        self.root = root
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_dir(self, name):
+        return os.path.join(self.root, name)
+
+    def _read_manifest(self, name):
+        try:
+            with open(os.path.join(self._entry_dir(name), "manifest.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _key(self, sources, params, known):
+        fingerprints = {
+            os.path.normpath(path): file_fingerprint(path, known.get(os.path.normpath(path)))
+            for path in sources
+        }
+        return fingerprints, json.dumps(params or {}, sort_keys=True, default=str)
+
+    def get_or_build(self, name, sources, builder, params=None):
+        """Return the cached value for `name` if its sources and params are unchanged, else build and store it."""
+        if not self.enabled:
+            return builder()
+
+        manifest = self._read_manifest(name) or {}
+        fingerprints, params_key = self._key(sources, params, manifest.get("sources", {}))
+        unchanged = (
+            manifest.get("version") == CACHE_VERSION
+            and manifest.get("params") == params_key
+            and {p: f["sha1"] for p, f in manifest.get("sources", {}).items()} == {p: f["sha1"] for p, f in fingerprints.items()}
+        )
+        if unchanged:
+            try:
+                value = self._load(name)
+                self.hits += 1
+                if manifest["sources"] != fingerprints:
+                    self._write_manifest(name, fingerprints, params_key)  # touched but identical content
+                return value
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+                console.warning(f"⚠️ Rebuilding cache entry '{name}': {e}")
+
+        self.misses += 1
+        value = builder()
+        self._store(name, value)
+        self._write_manifest(name, fingerprints, params_key)
+        return value
+
+    def _load(self, name):
+        entry_dir = self._entry_dir(name)
+        with open(os.path.join(entry_dir, "payload.pkl"), "rb") as f:
+            return _ArrayUnpickler(f, entry_dir).load()
+
+    def _store(self, name, value):
+        entry_dir = self._entry_dir(name)
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.makedirs(entry_dir, exist_ok=True)
+        with open(os.path.join(entry_dir, "payload.pkl"), "wb") as f:
+            _ArrayPickler(f, entry_dir).dump(value)
+
+    def _write_manifest(self, name, fingerprints, params_key):
+        with open(os.path.join(self._entry_dir(name), "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "params": params_key, "sources": fingerprints}, f, indent=2)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,91 @@
+# inspect_inputs.py
+
+import os
+import pandas as pd
+from config import (
+    NFL_SCHEDULE_2025_FILE,
+    WR_STATS_2024_FILE,
+    TE_STATS_2024_FILE,
+    RB_STATS_2024_FILE,
+    DB_ALIGNMENT_FILE,
+    DEF_COVERAGE_TAGS_FILE,
+    STADIUM_ENV_FILE,
+)
+from player_store import PlayerStore, PlayerView, DBStore, DBView
+
+# What `main.py --mode inspect` can show; the loaders themselves never print samples
+INPUTS = {
+    "schedule": NFL_SCHEDULE_2025_FILE,
+    "wr": WR_STATS_2024_FILE,
+    "te": TE_STATS_2024_FILE,
+    "rb": RB_STATS_2024_FILE,
+    "db": DB_ALIGNMENT_FILE,
+    "coverage": DEF_COVERAGE_TAGS_FILE,
+    "stadium": STADIUM_ENV_FILE,
+}
+
+
+def show_csv(filepath, df, rows=1):
+    for i in range(min(rows, len(df))):
+        sample = df.iloc[i]
+        print(f"\n(SAMPLE {i + 1}) {os.path.normpath(filepath)}:")
+        for col in df.columns:
+            print(f"🔹 {col}: {sample[col]}")
+
+
+def show_players(filepath, df, rows=1, position="WR"):
+    store = PlayerStore(df, position)
+    for i in range(min(rows, store.size)):
+        player = PlayerView(store, i)
+        print(f'\n(SAMPLE {i + 1}) {filepath}:')
+        print(f"🔍 {position} Name: {player.name}")
+        print(f"🏈 Team: {player.team}")
+        print(f"📌 Position: {player.position}")
+        print(f"📊 Slot Snap Rate: {player.slot_snap_rate}")
+        print(f"⚖️ Alignment Weights: {', '.join(f'{r} {w:.2f}' for r, w in player.alignment_weights.items())}")
+
+        print("\n🛡️ vs Man Coverage:")
+        for k, v in player.vs_man.items():
+            print(f"  - {k}: {v}")
+
+        print("\n🛡️ vs Zone Coverage:")
+        for k, v in player.vs_zone.items():
+            print(f"  - {k}: {v}")
+
+    print(f"\n🏃 {store.size} {position}s: {', '.join(map(str, store.names[:20]))}{' ...' if store.size > 20 else ''}")
+
+
+def show_db(filepath, df, rows=1):
+    store = DBStore(df)
+    for i in range(min(rows, store.size)):
+        db = DBView(store, i)
+        print(f"\n(SAMPLE {i + 1}) {filepath}:")
+        print(f"🔍 DB Name: {db.name}")
+        print(f"🏈 Team: {db.team}")
+        print(f"📌 Position: {db.position}")
+        print(f"🎯 Role: {db.alignment_role}")
+        print("📊 Coverage Stats:")
+        for k, v in db.coverage_stats.items():
+            print(f"   - {k}: {v}")
+
+    print(f"\n🛡️ {store.size} DBs on {len(set(store.team_ids) - {-1})} teams")
+
+
+SHOW = {
+    "wr": lambda filepath, df, rows: show_players(filepath, df, rows, "WR"),
+    "te": lambda filepath, df, rows: show_players(filepath, df, rows, "TE"),
+    "rb": lambda filepath, df, rows: show_players(filepath, df, rows, "RB"),
+    "db": show_db,
+}
+
+
+def inspect_inputs(targets=None, rows=1):
+    """Print sample records of the chosen inputs (all of them by default)."""
+    for target in targets or list(INPUTS):
+        filepath = INPUTS[target]
+        if not os.path.exists(filepath):
+            print(f"\n⚠️ {target}: {filepath} not found")
+            continue
+        df = pd.read_csv(filepath)
+        print(f"\n📂 {target}: {filepath} ({len(df)} rows x {len(df.columns)} columns)")
+        SHOW.get(target, show_csv)(filepath, df, rows)
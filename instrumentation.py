@@ -0,0 +1,146 @@
+# instrumentation.py
+
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+import console
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, peak RSS is reported as unavailable
+    resource = None
+
+
+class Tracer:
+    """
+    Nested timing spans and counters for one process. Workers hand their spans back with take() and
+    the parent merge()s them, so one trace covers the whole pool; spans export as Chrome trace events
+    (chrome://tracing, Perfetto, speedscope).
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.events = []
+        self.counters = defaultdict(int)
+        self.depth = 0
+        self.origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, name, **args):
+        start = time.perf_counter()
+        self.depth += 1
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            self.events.append({
+                "name": name,
+                "start": start,
+                "dur": time.perf_counter() - start,
+                "depth": self.depth,
+                "pid": os.getpid(),
+                "args": args,
+            })
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def gauge(self, name, value):
+        self.counters[name] = value
+
+    def take(self):
+        """Events and counters recorded so far, cleared from this tracer (worker -> parent hand-off)."""
+        events, counters = self.events, dict(self.counters)
+        self.events, self.counters = [], defaultdict(int)
+        return events, counters
+
+    def merge(self, events, counters):
+        self.events.extend(events)
+        for name, n in counters.items():
+            self.counters[name] += n
+
+    def summary(self):
+        """Spans of this process aggregated by (depth, name), in order of first appearance."""
+        pid = os.getpid()
+        rows = {}
+        for e in sorted(self.events, key=lambda e: e["start"]):
+            key = (e["depth"], e["name"]) if e["pid"] == pid else (e["depth"] + 1, f"{e['name']} [workers]")
+            row = rows.setdefault(key, {"depth": key[0], "name": key[1], "count": 0, "total": 0.0, "max": 0.0})
+            row["count"] += 1
+            row["total"] += e["dur"]
+            row["max"] = max(row["max"], e["dur"])
+        return list(rows.values())
+
+    def report(self, max_depth=None):
+        wall = time.perf_counter() - self.origin
+        console.info(f"\n⏱️ Timing ({wall:.2f}s wall, peak RSS {format_rss(peak_rss_mb())})")
+        for row in self.summary():
+            if max_depth is not None and row["depth"] > max_depth:
+                continue
+            indent = "  " * row["depth"]
+            calls = f" x{row['count']}" if row["count"] > 1 else ""
+            console.info(f"   {indent}{row['name']}{calls}: {row['total']:.3f}s ({100 * row['total'] / max(wall, 1e-9):.1f}%)")
+        if self.counters:
+            console.info("📈 Counters: " + ", ".join(f"{k}={v:,}" if isinstance(v, int) else f"{k}={v}" for k, v in sorted(self.counters.items())))
+
+    def chrome_trace(self, path):
+        """Write spans as Chrome trace 'complete' events (microseconds) plus counters as metadata."""
+        trace = [
+            {"name": e["name"], "ph": "X", "ts": (e["start"] - self.origin) * 1e6, "dur": e["dur"] * 1e6,
+             "pid": e["pid"], "tid": e["pid"], "args": e["args"]}
+            for e in self.events
+        ]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace, "otherData": {"counters": dict(self.counters), "peak_rss_mb": peak_rss_mb()}}, f)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process plus its (finished) worker processes, in MB."""
+    if resource is None:
+        return None
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(own / scale, 1), round(children / scale, 1)
+
+
+def format_rss(rss):
+    if rss is None:
+        return "n/a"
+    own, children = rss
+    return f"{own} MB" + (f", workers {children} MB" if children else "")
+
+
+tracer = Tracer()
+span = tracer.span
+count = tracer.count
+
+
+def profile_call(fn, out_dir, *args, **kwargs):
+    """
+    Run fn under cProfile and write, into out_dir: profile.prof (load with pstats/snakeviz),
+    profile.txt (sorted by cumulative time) and trace.json (the span trace for a flame-graph viewer).
+    """
+    import cProfile
+    import pstats
+
+    os.makedirs(out_dir, exist_ok=True)
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(fn, *args, **kwargs)
+    finally:
+        prof_path = os.path.join(out_dir, "profile.prof")
+        profiler.dump_stats(prof_path)
+        with open(os.path.join(out_dir, "profile.txt"), "w", encoding="utf-8") as f:
+            stats = pstats.Stats(profiler, stream=f)
+            stats.sort_stats("cumulative").print_stats(60)
+            stats.sort_stats("tottime").print_stats(40)
+        tracer.chrome_trace(os.path.join(out_dir, "trace.json"))
+        console.info(f"🔬 Profile saved to {out_dir} (profile.prof, profile.txt, trace.json)")
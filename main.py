@@ -1,22 +1,98 @@
 # main.py
 
 import argparse
-from sim_engine import run_test_week_simulation, run_season_simulation
+from sim_engine import run_test_week_simulation, run_season_simulation, run_incremental_update
+from config import (SIM_WORKERS, SIM_CHUNK_SIZE, SIM_SEED, MC_SIMULATIONS, SAMPLE_DUMP_DIR, PROFILE_DIR, SWEEP_OUTPUT_DIR,
+                    BACKTEST_SEASONS, BACKTEST_OUTPUT_DIR, BACKTEST_FORM_SOURCE, BACKTEST_FORM_SOURCES, BACKTEST_STATS_LAG,
+                    SERVICE_HOST, SERVICE_PORT, SERVICE_SOCKET, SWEEP_PARAMS)
+from instrumentation import profile_call
+from monte_carlo import parse_quantiles, MC_MODES
+from inspect_inputs import inspect_inputs, INPUTS
+from quality_control import run_qc, ValidationError
+import console
 
 def main():
     parser = argparse.ArgumentParser(description="Run WR Fantasy Projection Simulation")
-    parser.add_argument("--mode", choices=["test", "season"], default="season", help="Which mode to run: 'test' or 'season'")
+    parser.add_argument("--mode", choices=["test", "season", "incremental", "inspect", "validate", "sweep", "backtest", "serve"], default="season",
+                        help="Which mode to run: 'test', 'season', 'incremental' (re-project only what changed since the last season run, with its settings) "
+                             "'inspect' (print sample records of the input files), 'validate' (check every input file against its schema), 'sweep' (compare config variants on one load) "
+                             "'backtest' (replay past seasons and score against actual points) or 'serve' (local projection service with warm inputs)")
     parser.add_argument("--week", type=int, default=1, help="Week number to test (only used if mode is 'test')")
     parser.add_argument("--output", type=str, default=None, help="Optional override output file name")
+    parser.add_argument("--workers", type=int, default=SIM_WORKERS, help="Worker processes for season mode (0 = all cores, 1 = in-process)")
+    parser.add_argument("--chunk-size", type=int, default=SIM_CHUNK_SIZE, help="WRs per parallel work unit in season mode (each unit walks all weeks)")
+    parser.add_argument("--sims", type=int, default=MC_SIMULATIONS, help="Monte Carlo samples per WR per week (0 = point projections only)")
+    parser.add_argument("--seed", type=int, default=SIM_SEED, help="Random seed for the Monte Carlo draws")
+    parser.add_argument("--mc-mode", choices=MC_MODES, default=None, help="'independent' per-WR draws or 'game' for correlated game-level slates (default: config MC_MODE)")
+    parser.add_argument("--format", choices=["csv", "parquet"], default=None, help="Output format (parquet is written one file per week)")
+    parser.add_argument("--dump-samples", type=str, default=SAMPLE_DUMP_DIR, help="Directory for raw float32 Monte Carlo samples, one folder per week")
+    parser.add_argument("--quantiles", type=parse_quantiles, default=None, help="Comma-separated percentiles to report, e.g. 10,25,50,75,90")
+    parser.add_argument("--profile", nargs="?", const=PROFILE_DIR, default=None, metavar="DIR",
+                        help=f"Run under cProfile and write a sortable report plus a JSON span trace (default dir: {PROFILE_DIR})")
+    parser.add_argument("--input", choices=list(INPUTS), action="append", default=None, help="Input to show in inspect mode (repeatable; default: all)")
+    parser.add_argument("--rows", type=int, default=1, help="Sample records per input in inspect mode")
+    parser.add_argument("--grid", action="append", default=[], metavar="PARAM=V1,V2",
+                        help=f"Sweep axis (repeatable; variants are the product of all axes). PARAM is one of: {', '.join(SWEEP_PARAMS)}")
+    parser.add_argument("--variants", type=str, default=None, help='Sweep spec JSON: {"grid": {PARAM: [values]}, "variants": [{PARAM: value}, ...]}')
+    parser.add_argument("--season", type=int, action="append", default=None, help=f"Season to backtest (repeatable; default: {', '.join(map(str, BACKTEST_SEASONS))})")
+    parser.add_argument("--form-source", choices=BACKTEST_FORM_SOURCES, default=BACKTEST_FORM_SOURCE, help="Backtest recent form from actual or projected points of earlier weeks")
+    parser.add_argument("--stats-lag", type=int, default=BACKTEST_STATS_LAG, help="Backtest only blends seasons <= season - lag")
+    parser.add_argument("--save-projections", action="store_true", help="Also write every scored backtest projection to projections.csv")
+    parser.add_argument("--host", type=str, default=SERVICE_HOST, help="Serve mode: address to listen on")
+    parser.add_argument("--port", type=int, default=SERVICE_PORT, help="Serve mode: TCP port to listen on")
+    parser.add_argument("--socket", type=str, default=SERVICE_SOCKET, help="Serve mode: listen on this Unix socket instead of host:port")
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument("--quiet", action="store_const", const="quiet", dest="log_level", help="Only print warnings and errors")
+    verbosity.add_argument("--verbose", action="store_const", const="verbose", dest="log_level", help="Also print per-step detail (loaded row counts, cache stats)")
 
     args = parser.parse_args()
+    if args.log_level:
+        console.setup(args.log_level)
+    try:
+        if args.profile:
+            profile_call(run, args.profile, args)
+        else:
+            run(args)
+    except ValidationError as e:
+        # The validation report has already been printed
+        console.error(f"❌ Stopped before simulating: {e.args[0].split(':')[0]} (fix the inputs, or set QC_FAIL_FAST = False)")
+        raise SystemExit(1)
 
-    if args.mode == "test":
-        print(f"🔍 Running test projection for Week {args.week}")
-        run_test_week_simulation(args.week, args.output)
+
+def run(args):
+    # The sweep, backtest and service stacks load only for their own modes
+    if args.mode == "inspect":
+        inspect_inputs(args.input, args.rows)
+    elif args.mode == "validate":
+        if not run_qc():
+            raise SystemExit(1)
+    elif args.mode == "serve":
+        from service import serve
+        serve(args.host, args.port, args.socket)
+    elif args.mode == "backtest":
+        from backtest import run_backtest
+        from scenario_sweep import load_variants
+        variants = load_variants(args.variants, args.grid)
+        run_backtest(args.season or list(BACKTEST_SEASONS), variants, simulations=args.sims, seed=args.seed, quantiles=args.quantiles,
+                     workers=args.workers, form_source=args.form_source, stats_lag=args.stats_lag,
+                     output_dir=args.output or BACKTEST_OUTPUT_DIR, save_projections=args.save_projections)
+    elif args.mode == "sweep":
+        from scenario_sweep import run_sweep, load_variants
+        variants = load_variants(args.variants, args.grid)
+        console.info(f"\n🧭 Running scenario sweep: {len(variants)} variants (variant 0 = config.py baseline)")
+        run_sweep(variants, workers=args.workers, output_dir=args.output or SWEEP_OUTPUT_DIR)
+    elif args.mode == "test":
+        console.info(f"🔍 Running test projection for Week {args.week}")
+        run_test_week_simulation(args.week, args.output, simulations=args.sims, seed=args.seed, quantiles=args.quantiles, mode=args.mc_mode,
+                                 output_format=args.format, samples_dir=args.dump_samples)
+    elif args.mode == "incremental":
+        console.info("\n🔁 Running incremental season re-projection...")
+        run_incremental_update(output_file=args.output, workers=args.workers, chunk_size=args.chunk_size)
     else:
-        print("\n📅 Running full season projection...")
-        run_season_simulation(output_file=args.output)
+        console.info("\n📅 Running full season projection...")
+        run_season_simulation(output_file=args.output, simulations=args.sims, workers=args.workers, chunk_size=args.chunk_size,
+                              seed=args.seed, quantiles=args.quantiles, mode=args.mc_mode,
+                              output_format=args.format, samples_dir=args.dump_samples)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,221 @@
+# monte_carlo.py
+
+from collections import namedtuple
+import hashlib
+import numpy as np
+from config import (
+    MC_SIMULATIONS,
+    MC_STD_DEV,
+    MC_QUANTILES,
+    MC_FLOOR_QUANTILE,
+    MC_CEILING_QUANTILE,
+    MC_BOOM_POINTS,
+    MC_BUST_POINTS,
+    MC_MAX_BLOCK_ELEMENTS,
+    MC_MODE,
+    MC_GAME_STD,
+    MC_TEAM_STD,
+    MC_SHARE_CONCENTRATION,
+    SIM_SEED,
+)
+from identity import player_key
+
+MonteCarloSettings = namedtuple(
+    "MonteCarloSettings",
+    ["simulations", "std_dev", "quantiles", "seed", "floor_q", "ceiling_q", "boom", "bust", "max_block",
+     "mode", "game_std", "team_std", "share_concentration", "samples_dir"],
+)
+
+
+MC_MODES = ("independent", "game")
+
+
+def settings(simulations=MC_SIMULATIONS, std_dev=MC_STD_DEV, quantiles=None, seed=SIM_SEED, mode=None, samples_dir=None):
+    """
+    MonteCarloSettings with config defaults; returns None when simulations <= 0 (no sampling).
+    mode "independent" draws each WR on its own; "game" draws shared game/team shocks (game_simulator.py).
+    `samples_dir` turns on raw float32 sample dumps (output_writer.write_sample_part).
+    """
+    if not simulations or simulations <= 0:
+        return None
+    mode = mode or MC_MODE
+    if mode not in MC_MODES:
+        raise ValueError(f"Unknown Monte Carlo mode '{mode}' (expected one of {', '.join(MC_MODES)})")
+    return MonteCarloSettings(
+        simulations=int(simulations),
+        std_dev=float(std_dev),
+        quantiles=check_quantiles(quantiles if quantiles is not None else MC_QUANTILES),
+        seed=seed,
+        floor_q=check_quantiles([MC_FLOOR_QUANTILE])[0],
+        ceiling_q=check_quantiles([MC_CEILING_QUANTILE])[0],
+        boom=float(MC_BOOM_POINTS),
+        bust=float(MC_BUST_POINTS),
+        max_block=int(MC_MAX_BLOCK_ELEMENTS),
+        mode=mode,
+        game_std=float(MC_GAME_STD),
+        team_std=float(MC_TEAM_STD),
+        share_concentration=float(MC_SHARE_CONCENTRATION),
+        samples_dir=samples_dir,
+    )
+
+
+def check_quantiles(quantiles):
+    """Quantiles as a float tuple; ValueError for any outside 0-100 (np.percentile would fail mid-run)."""
+    quantiles = tuple(float(q) for q in quantiles)
+    bad = [q for q in quantiles if not 0.0 <= q <= 100.0]
+    if bad:
+        raise ValueError(f"Quantiles must be between 0 and 100, got {', '.join(f'{q:g}' for q in bad)}")
+    return quantiles
+
+
+def parse_quantiles(text):
+    """'10,25,50,75,90' -> (10.0, 25.0, 50.0, 75.0, 90.0)"""
+    return check_quantiles(q for q in text.split(",") if q.strip())
+
+
+def quantile_label(q):
+    return f"{q:g}".replace(".", "_")
+
+
+WR_STREAM, GAME_STREAM, SHADOW_STREAM = 0, 1, 2
+
+
+def stream_ids(positions, names, teams):
+    """
+    Stable id per player (position, normalized name, team) for keying RNG streams. Unlike a row index
+    it survives players being added, dropped or reordered in the stats files.
+    """
+    ids = np.empty(len(names), dtype=np.uint64)
+    for i, (position, name, team) in enumerate(zip(positions, names, teams)):
+        digest = hashlib.sha1(f"{position}|{player_key(name)}|{team}".encode("utf-8")).digest()
+        ids[i] = int.from_bytes(digest[:8], "little")
+    return ids
+
+
+def wr_streams(seed, ids, week):
+    """
+    One RNG stream per (player, week), keyed by stream_ids, so draws don't depend on how rows are
+    chunked across workers, on which other rows and weeks were projected in the same run, or on the
+    player's row position.
+    """
+    if seed is None:
+        return [np.random.default_rng() for _ in ids]
+    return [np.random.default_rng([seed, WR_STREAM, int(i), int(week)]) for i in ids]
+
+
+def game_stream(seed, week):
+    """Shared stream for one week's correlated game-level draws (game_simulator.py)."""
+    return np.random.default_rng(None if seed is None else [seed, GAME_STREAM, 0, int(week)])
+
+
+def shadow_flags(seed, week, rates, n):
+    """(team x n) draws of whether each defense's shadow defender travels, shared by every row partition."""
+    rng = np.random.default_rng(None if seed is None else [seed, SHADOW_STREAM, 0, int(week)])
+    return rng.random((len(rates), n)) < np.asarray(rates)[:, None]
+
+
+def partition_quantiles(block, percents):
+    """
+    Row-wise percentiles of `block` (rows x samples) for every entry of `percents` from a single
+    np.partition call; identical to np.percentile(..., method="linear").
+    """
+    n = block.shape[1]
+    virtual = np.asarray(percents, dtype=float) / 100.0 * (n - 1)
+    below = np.floor(virtual).astype(int)
+    above = np.minimum(below + 1, n - 1)
+    part = np.partition(block, np.unique(np.concatenate([below, above])), axis=1)
+    frac = virtual - below
+    lo_vals, hi_vals = part[:, below], part[:, above]
+    return (lo_vals + (hi_vals - lo_vals) * frac).T  # (len(percents) x rows)
+
+
+def _reduce_block(chunk, mc, percents, stats, start, stop):
+    stats["mean"][start:stop] = chunk.mean(axis=1, dtype=float)
+    stats["std"][start:stop] = chunk.std(axis=1, dtype=float)
+    stats["boom"][start:stop] = (chunk >= mc.boom).mean(axis=1)
+    stats["bust"][start:stop] = (chunk <= mc.bust).mean(axis=1)
+    stats["quantiles"][:, start:stop] = partition_quantiles(chunk, percents)
+
+
+def _empty_stats(n_rows, percents):
+    return {
+        "mean": np.empty(n_rows),
+        "std": np.empty(n_rows),
+        "quantiles": np.empty((len(percents), n_rows)),
+        "boom": np.empty(n_rows),
+        "bust": np.empty(n_rows),
+    }
+
+
+def _split_floor_ceiling(stats):
+    stats["floor"], stats["ceiling"] = stats["quantiles"][-2], stats["quantiles"][-1]
+    stats["quantiles"] = stats["quantiles"][:-2]
+    return stats
+
+
+def summarize(means, mc, rngs, keep=False, switch=None):
+    """
+    Draw mc.simulations normal samples around each mean (one RNG stream per row) and reduce them
+    to per-row statistics. Rows are processed in blocks of at most mc.max_block samples, so memory
+    stays bounded for 100k-sample runs over a full slate. `keep` also returns the draws as float32
+    (rows x samples) under stats["samples"]. `switch` = (off_means, on_means, flags, group) centres
+    row k on on_means[k] in the samples where flags[group[k]] is set and on off_means[k] elsewhere.
+    Only the standard-normal fill is per row, since each row must read its own player's stream so
+    results don't depend on chunking or row order; scaling and centring run on the whole block.
+    """
+    means = np.asarray(means, dtype=float)
+    n_rows, n = len(means), mc.simulations
+    percents = list(mc.quantiles) + [mc.floor_q, mc.ceiling_q]
+    stats = _empty_stats(n_rows, percents)
+    rows_per_block = max(1, mc.max_block // n)
+    block = np.empty((min(rows_per_block, max(n_rows, 1)), n))
+    kept = np.empty((n_rows, n), dtype=np.float32) if keep else None
+
+    for start in range(0, n_rows, rows_per_block):
+        stop = min(start + rows_per_block, n_rows)
+        chunk = block[: stop - start]
+        for k in range(start, stop):
+            rngs[k].standard_normal(n, out=chunk[k - start])
+        chunk *= mc.std_dev
+        if switch is None:
+            chunk += means[start:stop, None]
+        else:
+            off, on, flags, group = switch
+            chunk += np.where(flags[group[start:stop]], np.asarray(on)[start:stop, None], np.asarray(off)[start:stop, None])
+        if keep:
+            kept[start:stop] = chunk
+        _reduce_block(chunk, mc, percents, stats, start, stop)
+
+    if keep:
+        stats["samples"] = kept
+
+    return _split_floor_ceiling(stats)
+
+
+def sample_stats(samples, mc):
+    """Same statistics as `summarize` for an existing (simulations x rows) sample matrix."""
+    n, n_rows = samples.shape
+    percents = list(mc.quantiles) + [mc.floor_q, mc.ceiling_q]
+    stats = _empty_stats(n_rows, percents)
+    rows_per_block = max(1, mc.max_block // max(n, 1))
+    for start in range(0, n_rows, rows_per_block):
+        stop = min(start + rows_per_block, n_rows)
+        _reduce_block(np.ascontiguousarray(samples[:, start:stop].T), mc, percents, stats, start, stop)
+    return _split_floor_ceiling(stats)
+
+
+def result_columns(stats, k, mc):
+    """Result-dictionary columns for row k of `summarize` output."""
+    columns = {
+        f"adj_pts_p{quantile_label(q)}": round(float(stats["quantiles"][i, k]), 2)
+        for i, q in enumerate(mc.quantiles)
+    }
+    columns.update({
+        "adj_pts_mean": round(float(stats["mean"][k]), 2),
+        "adj_pts_std": round(float(stats["std"][k]), 2),
+        "adj_pts_floor": round(float(stats["floor"][k]), 2),
+        "adj_pts_ceiling": round(float(stats["ceiling"][k]), 2),
+        "boom_prob": round(float(stats["boom"][k]), 3),
+        "bust_prob": round(float(stats["bust"][k]), 3),
+    })
+    return columns
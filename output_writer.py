@@ -1,6 +1,191 @@
 # YACulator: output_writer.py
+import glob
+import os
+import shutil
+import numpy as np
 import pandas as pd
+from config import OUTPUT_FORMAT, OUTPUT_PARTITION_BY_WEEK
+import console
 
-def write_weekly_results(results, filename="weekly_projection_output.csv"):
-    df = pd.DataFrame(results)
-    df.to_csv(filename, index=False)
+FORMATS = ("csv", "parquet")
+WEEK_FILE = "week_{week:02d}.{ext}"
+SAMPLE_PART = "part-{lo:06d}.npz"
+
+# Columnar schema for the fixed result columns; Monte Carlo columns (adj_pts_p*, boom_prob, ...) stay float64
+RESULT_DTYPES = {
+    "week": "int16",
+    "wr_name": "string",
+    "position": "string",
+    "team": "string",
+    "opp_team": "string",
+    "scheme": "string",
+    "top_defenders": "string",
+}
+
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def resolve_format(fmt):
+    fmt = (fmt or OUTPUT_FORMAT).lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown output format '{fmt}' (expected one of {', '.join(FORMATS)})")
+    if fmt == "parquet" and not parquet_available():
+        console.warning("⚠️ pyarrow not installed — writing CSV instead of Parquet")
+        return "csv"
+    return fmt
+
+
+def partitioned(fmt, partition=OUTPUT_PARTITION_BY_WEEK):
+    """Whether a season in the resolved format `fmt` is written one file per week."""
+    return bool(partition) or fmt == "parquet"
+
+
+def partition_dir(path):
+    """season_projection_output.csv -> season_projection_output/ (one file per week inside)."""
+    return os.path.splitext(path)[0]
+
+
+class SeasonWriter:
+    """
+    Streams projection results to disk one week at a time, so memory stays flat however many weeks,
+    quantiles or samples a run produces. CSV can go to a single file (appended week by week) or be
+    partitioned like Parquet, which is always written as one file per week: read_week() then loads a
+    single week without touching the rest of the season.
+    """
+
+    def __init__(self, path, fmt=None, partition=OUTPUT_PARTITION_BY_WEEK, samples_dir=None):
+        self.fmt = resolve_format(fmt)
+        self.partition = partitioned(self.fmt, partition)
+        self.path = partition_dir(path) if self.partition else path
+        self.samples_dir = samples_dir
+        self.columns = None
+        self.rows_written = 0
+        self.weeks_written = []
+
+        if self.partition:
+            os.makedirs(self.path, exist_ok=True)
+            for old in glob.glob(os.path.join(self.path, "week_*.*")):
+                os.remove(old)
+        else:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        if samples_dir:
+            # Stale parts from a run with a different chunk size would otherwise be read back
+            shutil.rmtree(samples_dir, ignore_errors=True)
+            os.makedirs(samples_dir, exist_ok=True)
+
+    def frame(self, results):
+        df = pd.DataFrame(results)
+        if self.columns is None:
+            self.columns = list(df.columns)
+        return df.reindex(columns=self.columns)
+
+    def write_week(self, week, results):
+        if not results:
+            return
+        df = self.frame(results)
+        if self.partition:
+            write_week_file(self.path, week, df, self.fmt)
+        else:
+            df.to_csv(self.path, mode="a", header=self.rows_written == 0, index=False)
+        self.rows_written += len(df)
+        self.weeks_written.append(int(week))
+
+    def write_players(self, meta):
+        """Row index shared by every sample part: row -> wr_name, team."""
+        if not self.samples_dir:
+            return
+        pd.DataFrame({
+            "row": np.arange(len(meta["wrs"])),
+            "wr_name": [wr.name for wr in meta["wrs"]],
+            "team": [wr.team for wr in meta["wrs"]],
+        }).to_csv(os.path.join(self.samples_dir, "players.csv"), index=False)
+
+    def close(self):
+        console.info(f"💾 Wrote {self.rows_written} rows for {len(self.weeks_written)} weeks to {self.path} ({self.fmt})")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_week_file(directory, week, df, fmt):
+    target = os.path.join(directory, WEEK_FILE.format(week=int(week), ext=fmt))
+    if fmt == "parquet":
+        df.astype({c: t for c, t in RESULT_DTYPES.items() if c in df.columns}).to_parquet(target, index=False)
+    else:
+        df.to_csv(target, index=False)
+    return target
+
+
+def read_season(path, fmt="csv", partition=False):
+    """Whole season written by SeasonWriter; `path` is the writer's resolved path (file or week directory)."""
+    if not partition:
+        return pd.read_csv(path)
+    files = sorted(glob.glob(os.path.join(path, f"week_*.{fmt}")))
+    if not files:
+        raise FileNotFoundError(f"No week files under {path}")
+    frames = [pd.read_parquet(f) if fmt == "parquet" else pd.read_csv(f) for f in files]
+    return pd.concat(frames, ignore_index=True)
+
+
+def write_sample_part(samples_dir, week, lo, rows, samples):
+    """Raw Monte Carlo draws for a block of WR rows in one week, as float32 (WR x sims)."""
+    week_dir = os.path.join(samples_dir, f"week_{int(week):02d}")
+    os.makedirs(week_dir, exist_ok=True)
+    np.savez(os.path.join(week_dir, SAMPLE_PART.format(lo=int(lo))),
+             rows=np.asarray(rows, dtype=np.int32), samples=np.asarray(samples, dtype=np.float32))
+
+
+def read_week_samples(samples_dir, week):
+    """(players DataFrame, WR x sims float32 array) for one week, in WR-row order."""
+    parts = sorted(glob.glob(os.path.join(samples_dir, f"week_{int(week):02d}", "part-*.npz")))
+    if not parts:
+        raise FileNotFoundError(f"No samples for week {week} in {samples_dir}")
+    rows, samples = [], []
+    for part in parts:
+        with np.load(part) as data:
+            rows.append(data["rows"])
+            samples.append(data["samples"])
+    rows, samples = np.concatenate(rows), np.concatenate(samples)
+    order = np.argsort(rows, kind="stable")
+    players = pd.read_csv(os.path.join(samples_dir, "players.csv")).set_index("row").loc[rows[order]].reset_index()
+    return players, samples[order]
+
+
+def read_week(path, week, fmt=None):
+    """
+    Load one week of a season written by SeasonWriter (partitioned or single-file). `fmt` is only the
+    extension tried first: a "parquet" run without pyarrow falls back to CSV, so both are probed.
+    """
+    fmt = (fmt or OUTPUT_FORMAT).lower()
+    for ext in [fmt] + [f for f in FORMATS if f != fmt]:
+        week_file = os.path.join(partition_dir(path), WEEK_FILE.format(week=int(week), ext=ext))
+        if os.path.exists(week_file):
+            return pd.read_parquet(week_file) if ext == "parquet" else pd.read_csv(week_file)
+    if os.path.isfile(path):
+        # Single-file CSV: scan in chunks, keeping only the requested week
+        chunks = [c[c["week"] == int(week)] for c in pd.read_csv(path, chunksize=100_000)]
+        return pd.concat(chunks, ignore_index=True)
+    raise FileNotFoundError(f"No week {week} output under {path}")
+
+
+def write_weekly_results(results, filename="weekly_projection_output.csv", chunk_rows=50_000):
+    """Stream an iterable of result dicts to CSV in bounded chunks instead of one big DataFrame."""
+    chunk, header = [], True
+    for result in results:
+        chunk.append(result)
+        if len(chunk) >= chunk_rows:
+            pd.DataFrame(chunk).to_csv(filename, mode="w" if header else "a", header=header, index=False)
+            chunk, header = [], False
+    if chunk or header:
+        pd.DataFrame(chunk).to_csv(filename, mode="w" if header else "a", header=header, index=False)
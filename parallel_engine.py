@@ -0,0 +1,169 @@
+# parallel_engine.py
+
+import contextlib
+from collections import deque
+import numpy as np
+from multiprocessing import Pool, cpu_count, shared_memory
+from slate_engine import project_rows, season_forms, finish_week, merge_week, result_dicts, apply_results
+from game_simulator import simulate_week
+from instrumentation import span, tracer
+
+# Worker-side state, set once per process by _init_worker
+_worker_tables = None
+_worker_blocks = []
+_worker_meta = None
+
+
+class SharedTables:
+    """
+    Copies each packed slate array into its own SharedMemory block exactly once.
+    Workers attach by block name, so per-task IPC is just a (week, lo, hi) tuple.
+    """
+
+    def __init__(self, tables):
+        self.blocks = []
+        self.specs = {}
+        for name, arr in tables.items():
+            arr = np.ascontiguousarray(arr)
+            shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+            np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+            self.blocks.append(shm)
+            self.specs[name] = (shm.name, arr.shape, arr.dtype.str)
+
+    def close(self):
+        for shm in self.blocks:
+            shm.close()
+            shm.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach_tables(specs):
+    """Map SharedTables specs back to read-only arrays; returns (tables, blocks) — keep blocks alive."""
+    tables, blocks = {}, []
+    for name, (shm_name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        arr = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        arr.flags.writeable = False
+        tables[name] = arr
+        blocks.append(shm)
+    return tables, blocks
+
+
+def _init_worker(specs, teams=None):
+    global _worker_tables, _worker_blocks, _worker_meta
+    tracer.reset()  # forked workers inherit the parent's spans; only report their own
+    _worker_tables, _worker_blocks = attach_tables(specs)
+    _worker_meta = {"teams": teams}
+
+
+def _run_unit(unit):
+    return _project_unit(_worker_tables, unit), tracer.take()
+
+
+def _run_games(task):
+    out, mc = task
+    with span("game_draws", week=int(out["week"])):
+        simulate_week(_worker_tables, _worker_meta, out, mc)
+    return out, tracer.take()
+
+
+def _project_unit(tables, unit):
+    week, lo, hi, mc = unit
+    with span("project_week", week=week, lo=lo, hi=hi):
+        return project_rows(tables, week, lo, hi, mc, form=tables["form"][lo:hi, week])
+
+
+def work_units(n_rows, weeks, chunk_size, mc=None):
+    """
+    Split a slate into week-major (week, lo, hi, mc) units of at most `chunk_size` WR rows, so a week
+    is complete as soon as its own units are. Recent form comes precomputed (season_forms), so no
+    state crosses units.
+    """
+    chunk_size = max(int(chunk_size), 1)
+    return [(week, lo, min(lo + chunk_size, n_rows), mc) for week in sorted(int(w) for w in weeks) for lo in range(0, n_rows, chunk_size)]
+
+
+def resolve_workers(workers):
+    return cpu_count() if not workers or workers < 1 else workers
+
+
+def iter_parallel_slate(tables, meta, weeks, mc=None, workers=None, chunk_size=64):
+    """
+    Project a packed slate across a process pool and yield (out, week_results) one week at a time.
+    Static tables live in shared memory; workers only receive (week, WR range) units and return small
+    arrays. Units are consumed in week order (Pool.imap), so each week is finished and handed to the
+    writer as soon as its own units are back and the full season never sits in memory. Results are
+    applied to the WR objects in the parent so weekly_stats survive the run, and are ordered by
+    (week, WR row) so the output is identical for any worker count or chunk size when `mc` carries a seed.
+    """
+    workers = resolve_workers(workers)
+    n_rows = len(tables["team_codes"])
+    with span("form_pass"):
+        tables = {**tables, "form": season_forms(tables, weeks)}
+    units = work_units(n_rows, weeks, chunk_size, mc)
+    per_week = len(range(0, n_rows, max(int(chunk_size), 1)))
+    if not units:
+        return
+
+    with contextlib.ExitStack() as stack:
+        pool = None
+        if workers == 1 or len(units) == 1:
+            unit_outputs = (_project_unit(tables, unit) for unit in units)
+        else:
+            shared = stack.enter_context(SharedTables(tables))
+            pool = stack.enter_context(Pool(min(workers, len(units)), initializer=_init_worker, initargs=(shared.specs, list(meta["teams"]))))
+            unit_outputs = _merged(pool.imap(_run_unit, units))
+
+        def finished(week, result):
+            with span("finish_week", week=week):
+                out = result()
+                week_results = result_dicts(tables, meta, out, mc)
+                apply_results(tables, meta, zip(out["rows"], week_results))
+            tracer.count("wr_weeks_projected", len(week_results))
+            tracer.count("samples_drawn", len(week_results) * (mc.simulations if mc else 0))
+            return out, week_results
+
+        # "game" mode: each week's correlated slates are drawn in the pool (one task per week, on its own
+        # stream) while later weeks are still projecting; weeks are still yielded in order
+        games = deque()
+        for _ in range(len(units) // per_week):
+            with span("project", workers=workers, units=per_week):
+                week_outputs = [next(unit_outputs) for _ in range(per_week)]
+            week = int(week_outputs[0]["week"])
+            if pool is None or mc is None or mc.mode != "game":
+                yield finished(week, lambda: finish_week(tables, meta, week_outputs, mc))
+                continue
+            games.append((week, pool.apply_async(_run_games, ((merge_week(week_outputs), mc),))))
+            while games and (len(games) > workers or games[0][1].ready()):
+                week, pending = games.popleft()
+                yield finished(week, lambda: _game_result(pending))
+        while games:
+            week, pending = games.popleft()
+            yield finished(week, lambda: _game_result(pending))
+
+
+def _game_result(pending):
+    out, (events, counters) = pending.get()
+    tracer.merge(events, counters)
+    return out
+
+
+def _merged(results):
+    # Worker spans and counters join the parent's trace as each unit arrives
+    for out, (events, counters) in results:
+        tracer.merge(events, counters)
+        yield out
+
+
+def run_parallel_slate(tables, meta, weeks, mc=None, workers=None, chunk_size=64):
+    """All results of iter_parallel_slate as one list."""
+    results = []
+    for _, week_results in iter_parallel_slate(tables, meta, weeks, mc, workers, chunk_size):
+        results.extend(week_results)
+    return results
@@ -0,0 +1,103 @@
+# penalty_cache.py
+
+import hashlib
+import json
+import os
+from config import USE_SOFT_ALIGNMENT
+from matchup_simulator import db_penalty_profile
+import console
+
+ALIGNMENT_MODES = {True: "soft", False: "hard"}
+PROFILE_VERSION = 2  # 2: missing DB stats penalize as 0 (wr_matchup_engine.role_penalty_matrix), not NaN
+
+
+def defense_fingerprint(db_pool):
+    """
+    Content hash of a defense's DB pool; any changed stat or role yields a new fingerprint. DBs are listed
+    by display name, since pool keys are per-load player ids and the hash is stored across runs.
+    """
+    payload = [
+        [
+            str(db.name),
+            db.alignment_role,
+            {k: float(v) for k, v in sorted(db.coverage_stats.items())},
+            {k: float(v) for k, v in sorted(db.alignment_probs.items())},
+        ]
+        for db in sorted(db_pool.values(), key=lambda db: str(db.name))
+    ]
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class DefensePenaltyCache:
+    """
+    (week, opponent team, alignment mode) -> db_penalty_profile cache shared by every WR facing that defense.
+    Penalties are also stored on disk by defense fingerprint, so unchanged defenses are not recomputed across runs.
+    """
+
+    def __init__(self, db_map, coverage_map, path=None):
+        self.db_map = db_map
+        self.coverage_map = coverage_map
+        self.path = path
+        self.profiles = {}
+        self.fingerprints = {}
+        self.disk = {}
+        self.loaded = set()  # disk keys read from `path`, as opposed to computed earlier in this run
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.disk = json.load(f)
+                self.loaded = set(self.disk)
+            except (OSError, ValueError) as e:
+                console.warning(f"⚠️ Ignoring unreadable penalty cache {path}: {e}")
+
+    def _fingerprint(self, team):
+        if team not in self.fingerprints:
+            self.fingerprints[team] = defense_fingerprint(self.db_map.get(team, {}))
+        return self.fingerprints[team]
+
+    def get(self, week, team, soft=USE_SOFT_ALIGNMENT):
+        mode = ALIGNMENT_MODES[bool(soft)]
+        key = (week, team, mode)
+        if key in self.profiles:
+            self.hits += 1
+            return self.profiles[key]
+
+        scheme = self.coverage_map.get(week, {}).get(team, "man")
+        disk_key = f"{self._fingerprint(team)}:{mode}:v{PROFILE_VERSION}"
+        if disk_key in self.disk:
+            if disk_key in self.loaded:
+                self.disk_hits += 1
+            else:
+                self.hits += 1
+            profile = dict(self.disk[disk_key], scheme=scheme)
+        else:
+            self.misses += 1
+            profile = db_penalty_profile(week, team, self.db_map, self.coverage_map, soft)
+            self.disk[disk_key] = {k: float(v) for k, v in profile.items() if k != "scheme"}
+            self._dirty = True
+
+        self.profiles[key] = profile
+        return profile
+
+    def precompute(self, weeks, teams=None):
+        """Populate soft and hard profiles for every (week, defense) pair up front."""
+        teams = list(self.db_map.keys()) if teams is None else teams
+        for week in weeks:
+            for team in teams:
+                for soft in (True, False):
+                    self.get(week, team, soft)
+
+    def save(self):
+        if not self.path or not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.disk, f)
+        self._dirty = False
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "disk_hits": self.disk_hits, "entries": len(self.profiles)}
@@ -0,0 +1,324 @@
+# pipeline.py
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import config
+from config import (
+    NFL_SCHEDULE_2025_FILE,
+    DB_ALIGNMENT_FILE,
+    DEF_COVERAGE_TAGS_FILE,
+    STADIUM_ENV_FILE,
+    BLENDED_WR_FILE,
+    BLENDED_DB_FILE,
+    WR_SEASON_FILES,
+    BLEND_RECENCY_WEIGHTS,
+    BLEND_DECAY,
+    BLEND_SAMPLE_WEIGHTING,
+    ENABLE_QUALITY_CONTROL,
+    CLIMATE_PHASE,
+    USE_FORECAST_WEATHER,
+    FORECAST_TTL_SECONDS,
+    EXPORT_FULL_SEASON_FILE,
+    EXPORT_TEST_WEEK_FILE,
+    OUTPUT_FORMAT,
+    INCREMENTAL_STATE_FILE,
+    MC_SIMULATIONS,
+    MC_MODE,
+    SIM_SEED,
+    SIM_WORKERS,
+    SIM_CHUNK_SIZE,
+    WEATHER_BOOST_FILE,
+    PIPELINE_STATE_FILE,
+    PIPELINE_WORKERS,
+    PIPELINE_TEST_WEEK,
+)
+from input_cache import file_fingerprint
+from output_writer import partition_dir, partitioned, resolve_format
+from monte_carlo import MC_MODES
+import console
+
+STATE_VERSION = 1
+SCRAPER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scrapers", "schedule_scraper_2025.py")
+
+
+class Stage:
+    """
+    One step of the pipeline. `inputs()` lists the files it reads and `params()` the settings its
+    result depends on; both are evaluated once its dependencies have finished, so files written
+    upstream are fingerprinted as they are now. A stage is skipped when they match its last successful
+    run and its outputs still exist; dependencies only order and gate it, so a re-run upstream that
+    leaves this stage's inputs unchanged doesn't cascade.
+    """
+
+    def __init__(self, name, deps, run, inputs=None, params=None, outputs=(), enabled=True, always=False):
+        self.name = name
+        self.deps = deps
+        self.run = run
+        self.inputs = inputs or (lambda: [])
+        self.params = params or (lambda: {})
+        self.outputs = outputs
+        self.enabled = enabled
+        self.always = always
+
+
+# --- Stages ---
+def scrape():
+    subprocess.run([sys.executable, SCRAPER], check=True)
+
+
+def wr_season_files():
+    return {year: path for year, path in WR_SEASON_FILES.items() if os.path.exists(path)}
+
+
+def blend_wr():
+    from multi_year_blend import blend_wr_stats
+
+    files = wr_season_files()
+    if not files:
+        raise FileNotFoundError(f"None of the WR season files exist: {', '.join(WR_SEASON_FILES.values())}")
+    missing = sorted(set(WR_SEASON_FILES) - set(files))
+    if missing:
+        console.warning(f"⚠️ Blending WRs without the {', '.join(map(str, missing))} season file(s)")
+    blend_wr_stats(files)
+
+
+def blend_db():
+    from multi_year_blend_db import blend_db_stats
+
+    blend_db_stats(DB_ALIGNMENT_FILE)
+
+
+def qc_inputs():
+    from quality_control import validation_inputs
+
+    return [path for path, _, _ in validation_inputs().values()]
+
+
+def qc():
+    from quality_control import ensure_valid_inputs
+
+    ensure_valid_inputs(force=True)
+
+
+def weather_params():
+    params = {"climate_phase": CLIMATE_PHASE, "forecast": USE_FORECAST_WEATHER}
+    if USE_FORECAST_WEATHER:
+        # Live forecasts change on their own; rebuild once the fetcher's cached periods may have expired
+        params["forecast_window"] = int(time.time() // FORECAST_TTL_SECONDS)
+    return params
+
+
+def weather():
+    from stat_loader import load_csv
+    from weather_boost_generator import build_weather_boost_table
+
+    table = build_weather_boost_table(load_csv(NFL_SCHEDULE_2025_FILE))
+    os.makedirs(os.path.dirname(WEATHER_BOOST_FILE) or ".", exist_ok=True)
+    table.to_csv(WEATHER_BOOST_FILE, index=False)
+    console.info(f"🌦️ Weather boosts for {len(table)} games saved to {WEATHER_BOOST_FILE}")
+
+
+def simulate_inputs():
+    from sim_engine import position_files
+
+    # config.py stands in for the many constants the kernel reads; stadium profiles reach it only through the boost table
+    return [NFL_SCHEDULE_2025_FILE, *position_files().values(), DB_ALIGNMENT_FILE, DEF_COVERAGE_TAGS_FILE,
+            WEATHER_BOOST_FILE, config.__file__]
+
+
+def build_stages(args):
+    # Resolved like SeasonWriter does, since "parquet" without pyarrow falls back to CSV
+    fmt = resolve_format(OUTPUT_FORMAT)
+    sim = {"sims": args.sims, "seed": args.seed, "mc_mode": args.mc_mode or MC_MODE, "format": fmt}
+
+    def simulate():
+        from sim_engine import run_season_simulation
+
+        run_season_simulation(simulations=args.sims, workers=args.workers, chunk_size=args.chunk_size, seed=args.seed, mode=args.mc_mode,
+                              weather_file=WEATHER_BOOST_FILE)
+
+    def export():
+        from output_writer import read_week
+
+        # The season run already holds this week; slice it instead of simulating it a second time
+        df = read_week(EXPORT_FULL_SEASON_FILE, args.week)
+        df.to_csv(EXPORT_TEST_WEEK_FILE, index=False)
+        console.info(f"✅ Week {args.week} projections ({len(df)} rows) saved to {EXPORT_TEST_WEEK_FILE}")
+
+    # Parquet and partitioned CSV runs write a folder; export then follows the run's saved state file instead
+    season_output = partition_dir(EXPORT_FULL_SEASON_FILE) if partitioned(fmt) else EXPORT_FULL_SEASON_FILE
+    stages = [
+        Stage("scrape", [], scrape, outputs=[NFL_SCHEDULE_2025_FILE], enabled=args.scrape, always=True),
+        Stage("blend_wr", [], blend_wr, inputs=lambda: list(wr_season_files().values()),
+              params=lambda: {"weights": list(BLEND_RECENCY_WEIGHTS), "decay": BLEND_DECAY, "sample": BLEND_SAMPLE_WEIGHTING},
+              outputs=[BLENDED_WR_FILE]),
+        Stage("blend_db", [], blend_db, inputs=lambda: [DB_ALIGNMENT_FILE],
+              params=lambda: {"weights": list(BLEND_RECENCY_WEIGHTS), "decay": BLEND_DECAY, "sample": BLEND_SAMPLE_WEIGHTING},
+              outputs=[BLENDED_DB_FILE]),
+        Stage("qc", ["scrape", "blend_wr", "blend_db"], qc, inputs=qc_inputs, enabled=ENABLE_QUALITY_CONTROL),
+        Stage("weather", ["qc"], weather, inputs=lambda: [NFL_SCHEDULE_2025_FILE, STADIUM_ENV_FILE], params=weather_params,
+              outputs=[WEATHER_BOOST_FILE]),
+        Stage("simulate", ["weather"], simulate, inputs=simulate_inputs, params=lambda: sim, outputs=[season_output]),
+        Stage("export", ["simulate"], export, inputs=lambda: [season_output if os.path.isfile(season_output) else INCREMENTAL_STATE_FILE],
+              params=lambda: {"week": args.week}, outputs=[EXPORT_TEST_WEEK_FILE]),
+    ]
+    return {stage.name: stage for stage in stages}
+
+
+# --- State ---
+def load_state(path=PIPELINE_STATE_FILE):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return state.get("stages", {}) if state.get("version") == STATE_VERSION else {}
+
+
+def save_state(stages, path=PIPELINE_STATE_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": STATE_VERSION, "stages": stages}, f, indent=2)
+    os.replace(tmp, path)
+
+
+def stage_key(stage, previous):
+    """
+    Fingerprints of the stage's inputs and its params. Unchanged files reuse the hash recorded last
+    time (see file_fingerprint), so a warm check reads nothing.
+    """
+    known = previous.get("sources", {})
+    sources = {path: file_fingerprint(path, known.get(path)) if os.path.exists(path) else None for path in stage.inputs()}
+    digest = hashlib.sha1(json.dumps(
+        [sorted((p, f["sha1"] if f else None) for p, f in sources.items()), stage.params()], default=str,
+    ).encode("utf-8")).hexdigest()[:16]
+    return digest, sources
+
+
+# --- Runner ---
+def run_pipeline(stages, force=(), dry_run=False, workers=PIPELINE_WORKERS, state_file=PIPELINE_STATE_FILE):
+    """
+    Run every stage once its dependencies are done, independent stages side by side. Returns
+    {stage: (status, seconds)} with status one of ran, skipped, off, failed, blocked (or stale in a dry run).
+    """
+    state = load_state(state_file)
+    results = {}
+    pending = dict(stages)
+    running = {}
+
+    def ready(stage):
+        return all(dep in results for dep in stage.deps)
+
+    def start(pool, stage):
+        if any(results[dep][0] in ("failed", "blocked") for dep in stage.deps):
+            results[stage.name] = ("blocked", 0.0)
+            console.warning(f"⛔ {stage.name}: blocked by a failed dependency")
+            return
+        if not stage.enabled:
+            results[stage.name] = ("off", 0.0)
+            return
+        previous = state.get(stage.name, {})
+        key, sources = stage_key(stage, previous)
+        outputs_ok = all(os.path.exists(path) for path in stage.outputs)
+        # In a dry run nothing upstream is rebuilt, so whatever follows a stale stage is reported stale too
+        upstream_stale = any(results[dep][0] == "stale" for dep in stage.deps)
+        if (not stage.always and stage.name not in force and "all" not in force
+                and previous.get("key") == key and outputs_ok and not upstream_stale):
+            results[stage.name] = ("skipped", 0.0)
+            console.info(f"⏭️ {stage.name}: unchanged since {previous.get('finished', 'the last run')}")
+            return
+        if dry_run:
+            results[stage.name] = ("stale", 0.0)
+            console.info(f"🔄 {stage.name}: would run")
+            return
+        console.info(f"▶️ {stage.name}: running")
+        running[pool.submit(timed, stage.run)] = (stage, key, sources)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if ready(stage):
+                    del pending[name]
+                    start(pool, stage)
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, key, sources = running.pop(future)
+                seconds, error = future.result()
+                if error is not None:
+                    results[stage.name] = ("failed", seconds)
+                    console.error(f"❌ {stage.name}: failed after {seconds:.2f}s — {type(error).__name__}: {error}")
+                    continue
+                finished = datetime.datetime.now().isoformat(timespec="seconds")
+                results[stage.name] = ("ran", seconds)
+                state[stage.name] = {"key": key, "sources": sources, "finished": finished, "seconds": round(seconds, 3)}
+                save_state(state, state_file)
+                console.info(f"✅ {stage.name}: done in {seconds:.2f}s")
+    return results
+
+
+def timed(fn):
+    # (seconds, exception or None); a stage's error is reported, not raised into the scheduler
+    start = time.perf_counter()
+    try:
+        fn()
+    except (Exception, SystemExit) as e:
+        return time.perf_counter() - start, e
+    return time.perf_counter() - start, None
+
+
+def print_timings(results, total, order):
+    icons = {"ran": "✅", "skipped": "⏭️", "off": "➖", "failed": "❌", "blocked": "⛔", "stale": "🔄"}
+    lines = [f"\n⏱️ Pipeline finished in {total:.2f}s"]
+    for name in order:
+        status, seconds = results[name]
+        lines.append(f"   {icons[status]} {name:<10} {status:<8} {seconds:8.2f}s")
+    if any(status in ("failed", "blocked") for status, _ in results.values()):
+        console.warning("\n".join(lines))
+    else:
+        console.info("\n".join(lines))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the projection pipeline (scrape -> blend WR | blend DB -> QC -> weather -> simulate -> export), "
+                                                 "skipping stages whose inputs haven't changed since their last successful run")
+    parser.add_argument("--scrape", action="store_true", help="Also re-scrape the schedule (needs network access; always runs when given)")
+    parser.add_argument("--force", action="append", default=[], metavar="STAGE", help="Re-run this stage even if unchanged (repeatable; 'all' for every stage)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report which stages are stale")
+    parser.add_argument("--week", type=int, default=PIPELINE_TEST_WEEK, help="Week the export stage writes to the test-week file")
+    parser.add_argument("--sims", type=int, default=MC_SIMULATIONS, help="Monte Carlo samples per WR per week")
+    parser.add_argument("--seed", type=int, default=SIM_SEED)
+    parser.add_argument("--mc-mode", choices=MC_MODES, default=None, help="Monte Carlo mode (default: config MC_MODE)")
+    parser.add_argument("--workers", type=int, default=SIM_WORKERS, help="Worker processes for the season simulation (0 = all cores)")
+    parser.add_argument("--chunk-size", type=int, default=SIM_CHUNK_SIZE)
+    parser.add_argument("--stage-workers", type=int, default=PIPELINE_WORKERS, help="Stages run side by side")
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument("--quiet", action="store_const", const="quiet", dest="log_level", help="Only print warnings, errors and failed runs")
+    verbosity.add_argument("--verbose", action="store_const", const="verbose", dest="log_level", help="Also print per-step detail")
+    args = parser.parse_args()
+    if args.log_level:
+        console.setup(args.log_level)
+
+    stages = build_stages(args)
+    unknown = sorted(set(args.force) - set(stages) - {"all"})
+    if unknown:
+        parser.error(f"unknown stage(s) for --force: {', '.join(unknown)} (expected one of: all, {', '.join(stages)})")
+
+    start = time.perf_counter()
+    results = run_pipeline(stages, force=set(args.force), dry_run=args.dry_run, workers=args.stage_workers)
+    print_timings(results, time.perf_counter() - start, list(stages))
+    if any(status in ("failed", "blocked") for status, _ in results.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
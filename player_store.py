@@ -0,0 +1,203 @@
+# player_store.py
+
+import numpy as np
+import pandas as pd
+from config import (
+    SLOT_WEIGHT_MULTIPLIER,
+    WIDE_WEIGHT_MULTIPLIER,
+    SAFETY_WEIGHT_MULTIPLIER,
+    LB_WEIGHT_MULTIPLIER,
+)
+from identity import PlayerIndex, TeamIndex, canonical_teams
+from positions import DEFENDER_ROLES, POSITIONS, position_spec
+
+DB_ROLES = ["slot", "wide", "safety", "linebacker"]
+
+# store field -> source CSV column (missing columns load as 0, like row.get(col, 0))
+DB_COVERAGE_COLUMNS = {
+    "targets_allowed": "Targets Allowed",
+    "catch_rate": "Catch Rate Allowed",
+    "passer_rating": "Passer Rating Allowed",
+    "fpts_per_target": "Fantasy Points Allowed Per Target",
+    "fpts_per_game": "Fantasy Points Allowed Per Game",
+    "man_success": "Man Coverage Success Rate",
+    "separation": "Target Separation",
+}
+
+
+def _column(df, col, default=0):
+    if col in df.columns:
+        return df[col].to_numpy()
+    return np.full(len(df), default)
+
+
+def _numeric(df, col):
+    return pd.to_numeric(pd.Series(_column(df, col)), errors="coerce").to_numpy(dtype=float)
+
+
+def identity_ids(names, teams, players=None):
+    """
+    The PlayerIndex (roster-backed unless one is passed) with per-row player ids, plus the TeamIndex and
+    team ids for `teams`.
+    """
+    players = PlayerIndex.from_roster() if players is None else players
+    team_index = TeamIndex(teams)
+    return players, players.ids(names, teams), team_index, team_index.ids(teams)
+
+
+class PlayerStore:
+    """
+    Struct-of-arrays pass-catcher table; one row per CSV row, canonical team labels, identity.PlayerIndex
+    player ids and identity.TeamIndex team ids (registry teams keep the same ids as the schedule's).
+    Rows of every position share the arrays; each row's PositionSpec (positions.py) decides which alignment and
+    split columns it reads and how its alignment becomes defender-role weights.
+    """
+
+    def __init__(self, df, position="WR", players=None):
+        self.size = len(df)
+        self.names = _column(df, "Player", "Unknown Player").astype(object)
+        self.teams = canonical_teams(_column(df, "Team", ""))
+        self.positions = np.full(self.size, position_spec(position).name, dtype=object) if isinstance(position, str) else np.asarray(position, dtype=object)
+        self.players, self.player_ids, self.team_index, self.team_ids = identity_ids(self.names, self.teams, players)
+
+        self.snap_share = _numeric(df, "SnapShare")
+        self.routes_run = _numeric(df, "RoutesRun")
+        # Alignment rates by name and (N x 2) man/zone splits per field, each row filled from its position's columns
+        self.rates = {rate: np.zeros(self.size) for spec in POSITIONS.values() for rate in spec.alignment_columns}
+        self.splits = {field: np.zeros((self.size, 2)) for spec in POSITIONS.values() for field in spec.split_columns}
+        for name, rows in self.position_rows():
+            spec = POSITIONS[name]
+            for rate, col in spec.alignment_columns.items():
+                self.rates[rate][rows] = _numeric(df, col)[rows]
+            for field, (man_col, zone_col) in spec.split_columns.items():
+                self.splits[field][rows] = np.column_stack([_numeric(df, man_col)[rows], _numeric(df, zone_col)[rows]])
+        self.slot_snap_rate = self.rates["slot"]
+        self.wide_snap_rate = np.where(self.positions == "WR", 1.0 - self.slot_snap_rate, self.rates["wide"])
+
+        self.alignment_weights = self.weights_for()
+
+    @classmethod
+    def from_frames(cls, frames, players=None):
+        """{position: stats frame} -> one store holding every position's rows, in the given order."""
+        parts, positions = [], []
+        for name, df in frames.items():
+            spec = position_spec(name)
+            # Columns a frame lacks load as 0 for its own rows, not as NaN from the other frames
+            used = list(spec.alignment_columns.values()) + [c for cols in spec.split_columns.values() for c in cols] + ["SnapShare", "RoutesRun"]
+            parts.append(df.assign(**{col: 0 for col in used if col not in df.columns}))
+            positions.append(np.full(len(df), spec.name, dtype=object))
+        if not parts:
+            return cls(pd.DataFrame(), players=players)
+        return cls(pd.concat(parts, ignore_index=True), np.concatenate(positions), players)
+
+    def position_rows(self):
+        return [(name, np.flatnonzero(self.positions == name)) for name in pd.unique(self.positions)]
+
+    def weights_for(self, slot=SLOT_WEIGHT_MULTIPLIER, wide=WIDE_WEIGHT_MULTIPLIER, safety=SAFETY_WEIGHT_MULTIPLIER, lb=LB_WEIGHT_MULTIPLIER):
+        """
+        (N x 4) alignment weights with the WR role multipliers set to the given values (scenario sweeps
+        re-weight without reloading); other positions keep their configured multipliers.
+        """
+        weights = np.zeros((self.size, len(DEFENDER_ROLES)))
+        for name, rows in self.position_rows():
+            multipliers = {"slot": slot, "wide": wide, "safety": safety, "lb": lb} if name == "WR" else None
+            weights[rows] = POSITIONS[name].weights({rate: values[rows] for rate, values in self.rates.items()}, multipliers)
+        return weights
+
+    def views(self):
+        return [PlayerView(self, i) for i in range(self.size)]
+
+
+class PlayerView:
+    """Per-player view over a PlayerStore row exposing the WR attribute interface."""
+    __slots__ = ("_store", "_i", "weekly_stats")
+
+    role = None
+    is_slot = False
+
+    def __init__(self, store, i):
+        self._store = store
+        self._i = i
+        self.weekly_stats = {}
+
+    name = property(lambda self: self._store.names[self._i])
+    player_id = property(lambda self: int(self._store.player_ids[self._i]))
+    team = property(lambda self: self._store.teams[self._i])
+    position = property(lambda self: self._store.positions[self._i])
+    slot_snap_rate = property(lambda self: self._store.slot_snap_rate[self._i])
+    wide_snap_rate = property(lambda self: self._store.wide_snap_rate[self._i])
+    snap_share = property(lambda self: self._store.snap_share[self._i])
+    routes_run = property(lambda self: self._store.routes_run[self._i])
+
+    @property
+    def alignment_weights(self):
+        return dict(zip(DEFENDER_ROLES, self._store.alignment_weights[self._i]))
+
+    def _split(self, side):
+        return {field: values[self._i, side] for field, values in self._store.splits.items()}
+
+    vs_man = property(lambda self: self._split(0))
+    vs_zone = property(lambda self: self._split(1))
+
+
+class DBStore:
+    """Struct-of-arrays DB table with vectorized hard roles and soft alignment probabilities."""
+
+    def __init__(self, df, players=None):
+        self.size = len(df)
+        if "PlayerYear" in df.columns:
+            self.names = df["PlayerYear"].to_numpy(dtype=object)
+        else:
+            self.names = _column(df, "Player", "Unknown Player").astype(object)
+        self.teams = canonical_teams(_column(df, "Team", ""))
+        self.positions = _column(df, "Position", "").astype(object)
+        # PlayerYear labels carry the season, so identity comes from the plain name where there is one
+        self.players, self.player_ids, self.team_index, self.team_ids = identity_ids(_column(df, "Player", "Unknown Player") if "Player" in df.columns else self.names, self.teams, players)
+
+        self.coverage = {field: _numeric(df, col) for field, col in DB_COVERAGE_COLUMNS.items()}
+        self.snap_share = _numeric(df, "SnapShare")
+        self.shadow_rate = _numeric(df, "ShadowRate")
+        man_rate = _numeric(df, "Man Coverage Rate")
+        catch_rate = self.coverage["catch_rate"]
+        is_safety = self.positions == "S"
+        is_lb = self.positions == "LB"
+
+        # Hard role codes into DB_ROLES: safety and LB by position, then man rate > 0.5 wide, catch rate > 0.7 slot, else wide
+        self.role_codes = np.select(
+            [is_safety, is_lb, man_rate > 0.5, catch_rate > 0.7],
+            [2, 3, 1, 0],
+            default=1,
+        ).astype(np.int8)
+
+        raw = np.column_stack([catch_rate, man_rate, is_safety.astype(float), is_lb.astype(float)])
+        total = raw.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.alignment_probs = np.where((total > 0)[:, None], raw / total[:, None], 0.25)
+
+    def views(self):
+        return [DBView(self, i) for i in range(self.size)]
+
+
+class DBView:
+    """Per-player view over a DBStore row exposing the DB attribute interface."""
+    __slots__ = ("_store", "_i")
+
+    def __init__(self, store, i):
+        self._store = store
+        self._i = i
+
+    name = property(lambda self: self._store.names[self._i])
+    player_id = property(lambda self: int(self._store.player_ids[self._i]))
+    team = property(lambda self: self._store.teams[self._i])
+    position = property(lambda self: self._store.positions[self._i])
+    snap_share = property(lambda self: self._store.snap_share[self._i])
+    shadow_rate = property(lambda self: self._store.shadow_rate[self._i])
+    alignment_role = property(lambda self: DB_ROLES[self._store.role_codes[self._i]])
+
+    @property
+    def coverage_stats(self):
+        return {field: values[self._i] for field, values in self._store.coverage.items()}
+
+    @property
+    def alignment_probs(self):
+        return dict(zip(DB_ROLES, self._store.alignment_probs[self._i]))
@@ -0,0 +1,93 @@
+# positions.py
+
+import numpy as np
+from config import (
+    SLOT_WEIGHT_MULTIPLIER,
+    WIDE_WEIGHT_MULTIPLIER,
+    SAFETY_WEIGHT_MULTIPLIER,
+    LB_WEIGHT_MULTIPLIER,
+    TE_WEIGHT_MULTIPLIERS,
+    RB_WEIGHT_MULTIPLIERS,
+)
+
+# Defender roles the kernel weighs a pass catcher against (column order of weights and penalties)
+DEFENDER_ROLES = ["slot", "wide", "safety", "lb"]
+
+# engine field -> (vs man, vs zone) source columns; the same advanced-stat export covers every pass catcher
+SPLIT_COLUMNS = {
+    "routes": ("RoutesVsMan", "RoutesVsZone"),
+    "win_rate": ("WinRateVsMan", "WinRateVsZone"),
+    "target_rate": ("TargetRateVsMan", "TargetRateVsZone"),
+    "separation": ("TargetSeparationVsMan", "TargetSeparationVsZone"),
+    "fpts_per_target": ("FantasyPointsPerTargetVsMan", "FantasyPointsPerTargetVsZone"),
+}
+
+
+class PositionSpec:
+    """
+    What one position plugs into the shared engine: its alignment and split columns, and how its
+    alignment turns into weights over DEFENDER_ROLES. `role_weights(rates, multipliers)` gets the
+    position's alignment rates as {name: array} (missing columns load as 0).
+    """
+
+    def __init__(self, name, alignment_columns, role_weights, multipliers, split_columns=SPLIT_COLUMNS):
+        self.name = name
+        self.alignment_columns = alignment_columns
+        self.role_weights = role_weights
+        self.multipliers = multipliers
+        self.split_columns = split_columns
+
+    def weights(self, rates, multipliers=None):
+        m = self.multipliers if multipliers is None else multipliers
+        return self.role_weights(rates, [m[r] for r in DEFENDER_ROLES])
+
+
+def _wr_weights(rates, m):
+    # wide = 1 - slot; safety and LB weights step up with the slot rate
+    slot = rates["slot"]
+    return np.column_stack([
+        slot * m[0],
+        (1.0 - slot) * m[1],
+        np.where(slot > 0.3, 0.2, 0.05) * m[2],
+        np.where(slot > 0.2, 0.1, 0.0) * m[3],
+    ])
+
+
+def _te_weights(rates, m):
+    # Inline snaps (whatever isn't slot or wide) are covered by linebackers and safeties
+    slot, wide = rates["slot"], rates["wide"]
+    inline = np.clip(1.0 - slot - wide, 0.0, 1.0)
+    return np.column_stack([
+        slot * m[0],
+        wide * m[1],
+        (0.5 * slot + 0.4 * inline) * m[2],
+        0.6 * inline * m[3],
+    ])
+
+
+def _rb_weights(rates, m):
+    # Backfield routes (whatever isn't slot or wide) draw linebackers first, then safeties
+    slot, wide = rates["slot"], rates["wide"]
+    backfield = np.clip(1.0 - slot - wide, 0.0, 1.0)
+    return np.column_stack([
+        slot * m[0],
+        wide * m[1],
+        0.2 * backfield * m[2],
+        0.8 * backfield * m[3],
+    ])
+
+
+WR_MULTIPLIERS = {"slot": SLOT_WEIGHT_MULTIPLIER, "wide": WIDE_WEIGHT_MULTIPLIER, "safety": SAFETY_WEIGHT_MULTIPLIER, "lb": LB_WEIGHT_MULTIPLIER}
+
+POSITIONS = {
+    "WR": PositionSpec("WR", {"slot": "SlotSnapRate"}, _wr_weights, WR_MULTIPLIERS),
+    "TE": PositionSpec("TE", {"slot": "SlotSnapRate", "wide": "WideSnapRate"}, _te_weights, TE_WEIGHT_MULTIPLIERS),
+    "RB": PositionSpec("RB", {"slot": "SlotSnapRate", "wide": "WideSnapRate"}, _rb_weights, RB_WEIGHT_MULTIPLIERS),
+}
+
+
+def position_spec(name):
+    try:
+        return POSITIONS[str(name).upper()]
+    except KeyError:
+        raise ValueError(f"Unknown position '{name}' (expected one of: {', '.join(POSITIONS)})") from None
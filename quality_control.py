@@ -1,23 +1,364 @@
 # YACulator: quality_control.py
+import json
 import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
-from config import *
+from config import (
+    NFL_SCHEDULE_2025_FILE,
+    DB_ALIGNMENT_FILE,
+    DEF_COVERAGE_TAGS_FILE,
+    STADIUM_ENV_FILE,
+    BLENDED_WR_FILE,
+    BLENDED_DB_FILE,
+    ROSTER_2025_FILE,
+    ROSTER_2024_FILE,
+    PROJECT_POSITIONS,
+    POSITION_STATS_FILES,
+    QC_FAIL_FAST,
+    QC_WORKERS,
+    QC_SNAPSHOT_FILE,
+)
+from identity import canonical_teams
+from input_cache import file_fingerprint
+import console
 
-def check_file(file):
-    if not os.path.exists(file):
-        return f"❌ Missing: {file}"
+QC_VERSION = 1
+MAX_EXAMPLES = 3
+
+# names: accepted header(s), first present wins. kind: "int", "float", "rate" (fraction 0-1), "text" or "team".
+Column = namedtuple("Column", ["names", "kind", "low", "high", "required"], defaults=(None, None, True))
+# key: columns that must identify a row (team columns compared by canonical team)
+Schema = namedtuple("Schema", ["columns", "key"], defaults=((),))
+Issue = namedtuple("Issue", ["severity", "input", "check", "message"])
+
+PLAYER_SCHEMA = Schema([
+    Column("Player", "text"),
+    Column("Team", "team"),
+    Column("SlotSnapRate", "rate"),
+    Column("WideSnapRate", "rate", required=False),
+    Column("SnapShare", "float", 0, 100, required=False),
+    Column("RoutesRun", "float", 0, required=False),
+    Column("RoutesVsMan", "float", 0, required=False),
+    Column("RoutesVsZone", "float", 0, required=False),
+    Column("FantasyPointsPerTargetVsMan", "float", 0, 10),
+    Column("FantasyPointsPerTargetVsZone", "float", 0, 10),
+], key=("Player",))
+
+DB_SCHEMA = Schema([
+    Column(("PlayerYear", "Player"), "text"),
+    Column("Team", "team"),
+    Column("Position", "text"),
+    Column("Man Coverage Rate", "rate"),
+    Column("Catch Rate Allowed", "rate"),
+    Column("Passer Rating Allowed", "float", 0, 158.3),
+    Column("Target Separation", "float", 0, 10),
+    Column("Fantasy Points Allowed Per Target", "float", 0, 10),
+    Column("Fantasy Points Allowed Per Game", "float", 0, 50),
+    Column("Targets Allowed", "float", 0, required=False),
+    Column("Man Coverage Success Rate", "rate", required=False),
+    Column("SnapShare", "float", 0, 100, required=False),
+    Column("ShadowRate", "float", 0, 100, required=False),
+], key=(("PlayerYear", "Player"), "Team"))
+
+SCHEMAS = {
+    "schedule": Schema([
+        Column("Week", "int", 1, 25),
+        Column(("Visitor", "Away"), "team"),
+        Column("Home", "team"),
+        Column("ProjectedHomeScore", "float", 0, 100, required=False),
+        Column("ProjectedAwayScore", "float", 0, 100, required=False),
+    ]),
+    "players": PLAYER_SCHEMA,
+    "db": DB_SCHEMA,
+    "coverage": Schema([
+        Column("week", "int", 1, 25),
+        Column("team", "team"),
+        Column("man_coverage_rate", "rate"),
+        Column("zone_coverage_rate", "rate"),
+    ], key=("week", "team")),
+    "stadium": Schema([
+        Column("Team", "team"),
+        Column("Latitude", "float", -90, 90),
+        Column("Longitude", "float", -180, 180),
+    ], key=("Team",)),
+    "roster": Schema([
+        Column("full_name", "text"),
+        Column("gsis_id", "text", required=False),
+        Column("team", "team", required=False),
+    ], key=("gsis_id",)),
+}
+
+
+class ValidationError(ValueError):
+    def __init__(self, issues):
+        self.issues = issues
+        errors = [i for i in issues if i.severity == "error"]
+        super().__init__(f"{len(errors)} input error(s): " + "; ".join(f"{i.input} {i.check}: {i.message}" for i in errors[:5]))
+
+
+def validation_inputs():
+    """{input: (path, schema name, required)} for every file the simulator reads, plus blend outputs and rosters."""
+    inputs = {"schedule": (NFL_SCHEDULE_2025_FILE, "schedule", True)}
+    for position in PROJECT_POSITIONS:
+        inputs[position.lower()] = (POSITION_STATS_FILES[position], "players", position == "WR")
+    inputs.update({
+        "db": (DB_ALIGNMENT_FILE, "db", True),
+        "coverage": (DEF_COVERAGE_TAGS_FILE, "coverage", True),
+        "stadium": (STADIUM_ENV_FILE, "stadium", True),
+        "blended_wr": (BLENDED_WR_FILE, "players", False),
+        "blended_db": (BLENDED_DB_FILE, "db", False),
+        "roster": (next((p for p in (ROSTER_2025_FILE, ROSTER_2024_FILE) if os.path.exists(p)), ROSTER_2025_FILE), "roster", False),
+    })
+    return inputs
+
+
+# --- Per-table checks ---
+def _examples(df, mask, col=None):
+    rows = np.flatnonzero(mask)[:MAX_EXAMPLES]
+    shown = [f"row {r + 2}" + (f" = {df[col].iloc[r]}" if col else "") for r in rows]  # +2: header line, 1-based
+    return ", ".join(shown) + (" ..." if mask.sum() > MAX_EXAMPLES else "")
+
+
+def _resolve(df, names):
+    names = (names,) if isinstance(names, str) else names
+    return next((n for n in names if n in df.columns), None)
+
+
+def check_table(name, df, schema):
+    """Every column rule and the key of one table in one vectorized pass. Returns (issues, canonical team column or None)."""
+    issues = []
+    error = lambda check, message: issues.append(Issue("error", name, check, message))
+    if df.empty:
+        error("rows", "file has no rows")
+        return issues, None
+
+    teams = None
+    for column in schema.columns:
+        col = _resolve(df, column.names)
+        label = col or " / ".join((column.names,) if isinstance(column.names, str) else column.names)
+        if col is None:
+            if column.required:
+                error(label, "missing column")
+            continue
+        raw = df[col]
+        blank = raw.isna().to_numpy() | (raw.astype(str).str.strip() == "").to_numpy()
+        if column.required and blank.any():
+            error(label, f"{blank.sum()} blank value(s) ({_examples(df, blank)})")
+
+        if column.kind in ("text", "team"):
+            if column.kind == "team":
+                teams = canonical_teams(raw.to_numpy()) if teams is None else teams
+            continue
+
+        values = pd.to_numeric(raw, errors="coerce").to_numpy(dtype=float)
+        bad = np.isnan(values) & ~blank
+        if bad.any():
+            error(label, f"{bad.sum()} non-numeric value(s) ({_examples(df, bad, col)})")
+        if column.kind == "int":
+            fractional = ~np.isnan(values) & (values != np.round(values))
+            if fractional.any():
+                error(label, f"{fractional.sum()} non-integer value(s) ({_examples(df, fractional, col)})")
+        low, high = (0.0, 1.0) if column.kind == "rate" else (column.low, column.high)
+        with np.errstate(invalid="ignore"):
+            below = values < low if low is not None else np.zeros(len(values), dtype=bool)
+            above = values > high if high is not None else np.zeros(len(values), dtype=bool)
+        if below.any():
+            error(label, f"{below.sum()} value(s) below {low:g} ({_examples(df, below, col)})")
+        if above.any():
+            hint = " — percentages where a 0-1 fraction is expected?" if column.kind == "rate" and np.nanmax(values[above]) <= 100 else ""
+            error(label, f"{above.sum()} value(s) above {high:g}{hint} ({_examples(df, above, col)})")
+
+    key = [_resolve(df, names) for names in schema.key]
+    if key and all(key):
+        keyed = pd.DataFrame({c: canonical_teams(df[c].to_numpy()) if _is_team(schema, c) else df[c].to_numpy() for c in key})
+        keyed = keyed[df[key].notna().all(axis=1).to_numpy()]
+        duplicated = keyed.duplicated(keep=False).to_numpy()
+        if duplicated.any():
+            shown = keyed[duplicated].drop_duplicates().head(MAX_EXAMPLES).astype(str).agg(" / ".join, axis=1)
+            error(" + ".join(key), f"{duplicated.sum()} rows share a key ({', '.join(shown)}{' ...' if keyed[duplicated].drop_duplicates().shape[0] > MAX_EXAMPLES else ''})")
+    return issues, teams
+
+
+def _is_team(schema, col):
+    return any(c.kind == "team" and col in ((c.names,) if isinstance(c.names, str) else c.names) for c in schema.columns)
+
+
+def read_and_check(name, path, schema_name):
+    """Worker: read one file and run its table checks. Returns (name, frame or None, issues, canonical teams)."""
     try:
-        df = pd.read_csv(file)
-        if df.empty:
-            return f"⚠️ Empty: {file}"
+        df = pd.read_csv(path)
     except Exception as e:
-        return f"❌ Error reading {file}: {e}"
-    return f"✅ OK: {file}"
+        return name, None, [Issue("error", name, "read", f"{path}: {e}")], None
+    issues, teams = check_table(name, df, SCHEMAS[schema_name])
+    return name, df, issues, teams
+
+
+# --- Cross-table checks ---
+def _listed(labels):
+    labels = sorted(map(str, labels))
+    return ", ".join(labels[:8]) + (" ..." if len(labels) > 8 else "")
+
+
+def check_references(frames, teams):
+    """Referential integrity between the schedule and every table that joins on team or week."""
+    issues = []
+    schedule = frames.get("schedule")
+    visitor_col = _resolve(schedule, ("Visitor", "Away")) if schedule is not None else None
+    if schedule is None or visitor_col is None or "Home" not in schedule.columns or "Week" not in schedule.columns:
+        return issues
+
+    weeks = pd.to_numeric(schedule["Week"], errors="coerce").to_numpy(dtype=float)
+    home, visitor = canonical_teams(schedule["Home"].to_numpy()), canonical_teams(schedule[visitor_col].to_numpy())
+    scheduled = set(home) | set(visitor)
+    games = pd.DataFrame({"week": np.concatenate([weeks, weeks]), "team": np.concatenate([home, visitor])})
+    twice = games.duplicated(keep=False).to_numpy()
+    if twice.any():
+        clashes = games[twice].drop_duplicates()
+        shown = [f"{team} week {week:g}" for week, team in clashes.head(MAX_EXAMPLES).itertuples(index=False)]
+        issues.append(Issue("error", "schedule", "games", f"{len(clashes)} team-week(s) with more than one game ({', '.join(shown)}{' ...' if len(clashes) > MAX_EXAMPLES else ''})"))
+    selfplay = home == visitor
+    if selfplay.any():
+        issues.append(Issue("error", "schedule", "games", f"{selfplay.sum()} game(s) with a team playing itself ({_examples(schedule, selfplay, 'Home')})"))
+
+    for name, labels in teams.items():
+        if name == "schedule" or labels is None:
+            continue
+        unknown = set(labels) - scheduled - {""}
+        if not unknown:
+            continue
+        rows = np.isin(labels, list(unknown)).sum()
+        # Pass catchers on unscheduled teams lose every projection; elsewhere the rows are just unused
+        severity = "error" if name in ("wr", "te", "rb") else "warning"
+        issues.append(Issue(severity, name, "teams", f"{rows} row(s) on {len(unknown)} team(s) not on the schedule: {_listed(unknown)}"))
+
+    if teams.get("db") is not None:
+        uncovered = scheduled - set(teams["db"])
+        if uncovered:
+            issues.append(Issue("error", "db", "teams", f"{len(uncovered)} scheduled team(s) with no DB rows (their opponents project to 0): {_listed(uncovered)}"))
+    coverage = frames.get("coverage")
+    if coverage is not None and {"week", "team"} <= set(coverage.columns):
+        tagged = pd.DataFrame({"week": pd.to_numeric(coverage["week"], errors="coerce").astype(float), "team": canonical_teams(coverage["team"].to_numpy())})
+        off_schedule = ~tagged["week"].isin(set(weeks)).to_numpy()
+        if off_schedule.any():
+            issues.append(Issue("warning", "coverage", "week", f"{off_schedule.sum()} tag(s) for weeks with no games ({_examples(coverage, off_schedule, 'week')})"))
+        untagged = len(games.drop_duplicates()) - len(games.drop_duplicates().merge(tagged.drop_duplicates(), on=["week", "team"]))
+        if untagged:
+            issues.append(Issue("warning", "coverage", "teams", f"{untagged} scheduled team-week(s) without a tag use the default scheme"))
+    if teams.get("stadium") is not None:
+        missing = set(home) - set(teams["stadium"])
+        if missing:
+            issues.append(Issue("warning", "stadium", "teams", f"{len(missing)} home team(s) without a stadium profile get no weather boost: {_listed(missing)}"))
+    return issues
+
+
+# --- Engine ---
+def validate(inputs=None, workers=QC_WORKERS):
+    """Check every input file (read concurrently), then the references between them. Returns (issues, {input: rows})."""
+    inputs = validation_inputs() if inputs is None else inputs
+    issues, present = [], {}
+    for name, (path, schema_name, required) in inputs.items():
+        if os.path.exists(path):
+            present[name] = (path, schema_name)
+        elif required:
+            issues.append(Issue("error", name, "file", f"missing: {path}"))
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(present) or 1))) as pool:
+        results = list(pool.map(lambda item: read_and_check(item[0], *item[1]), present.items()))
+
+    frames, teams = {}, {}
+    for name, df, table_issues, table_teams in results:
+        issues += table_issues
+        if df is not None:
+            frames[name], teams[name] = df, table_teams
+    issues += check_references(frames, teams)
+    return issues, {name: len(df) for name, df in frames.items()}
+
+
+def report(issues, rows, inputs=None, seconds=None):
+    """Compact report: one line per input, then its issues."""
+    inputs = validation_inputs() if inputs is None else inputs
+    lines = []
+    for name, (path, _, required) in inputs.items():
+        own = [i for i in issues if i.input == name]
+        if name not in rows and not own:
+            if required:
+                lines.append(f"⚠️ {name}: {path} not checked")
+            continue
+        errors = sum(i.severity == "error" for i in own)
+        mark = "❌" if errors else ("⚠️" if own else "✅")
+        lines.append(f"{mark} {name}: {path} ({rows.get(name, 0)} rows)")
+        lines += [f"   {'❌' if i.severity == 'error' else '⚠️'} {i.check}: {i.message}" for i in own]
+    n_errors = sum(i.severity == "error" for i in issues)
+    took = f" in {seconds:.2f}s" if seconds is not None else ""
+    lines.append(f"🧪 Validation: {n_errors} error(s), {len(issues) - n_errors} warning(s) across {len(rows)} file(s){took}")
+    return "\n".join(lines)
+
+
+def _snapshot_key(inputs, known):
+    sources = {}
+    for name, (path, _, _) in inputs.items():
+        path = os.path.normpath(path)
+        sources[path] = file_fingerprint(path, known.get(path)) if os.path.exists(path) else None
+    return sources
+
+
+def _read_snapshot(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return snapshot if snapshot.get("version") == QC_VERSION else {}
+
+
+def _same_sources(a, b):
+    sha = lambda sources: {p: f and f["sha1"] for p, f in sources.items()}
+    return sha(a) == sha(b)
+
+
+def ensure_valid_inputs(force=False, fail_fast=QC_FAIL_FAST, snapshot_file=QC_SNAPSHOT_FILE, workers=QC_WORKERS):
+    """
+    Validate the inputs unless they match the last snapshot that passed. Errors raise ValidationError
+    (or are only reported when fail_fast is off); a clean pass writes the snapshot. Returns the issues
+    found, or None when validation was skipped.
+    """
+    inputs = validation_inputs()
+    snapshot = _read_snapshot(snapshot_file)
+    sources = _snapshot_key(inputs, {p: f for p, f in snapshot.get("sources", {}).items() if f})
+    if not force and snapshot.get("inputs") == sorted(inputs) and _same_sources(snapshot.get("sources", {}), sources):
+        console.debug("🧪 Inputs unchanged since last validation, skipping checks")
+        return None
+
+    start = time.perf_counter()
+    issues, rows = validate(inputs, workers)
+    text = report(issues, rows, inputs, time.perf_counter() - start)
+    errors = [i for i in issues if i.severity == "error"]
+    if issues:
+        console.warning(text)
+    else:
+        console.info(text.splitlines()[-1])
+    if errors:
+        if fail_fast:
+            raise ValidationError(issues)
+        return issues
+
+    os.makedirs(os.path.dirname(snapshot_file) or ".", exist_ok=True)
+    with open(snapshot_file, "w", encoding="utf-8") as f:
+        json.dump({"version": QC_VERSION, "inputs": sorted(inputs), "sources": sources}, f, indent=2)
+    return issues
+
 
 def run_qc():
-    files = [BLENDED_WR_FILE, BLENDED_DB_FILE, SCHEDULE_FILE, COVERAGE_TAGS_FILE, ROSTER_FILE]
-    for file in files:
-        print(check_file(file))
+    """Full validation with its report, ignoring the snapshot; True when no errors were found."""
+    try:
+        issues = ensure_valid_inputs(force=True, fail_fast=True)
+    except ValidationError:
+        return False
+    return not any(i.severity == "error" for i in issues)
+
 
 if __name__ == "__main__":
-    run_qc()
+    raise SystemExit(0 if run_qc() else 1)
@@ -0,0 +1,312 @@
+# scenario_sweep.py
+
+import itertools
+import json
+import os
+import numpy as np
+import pandas as pd
+import config
+from config import (
+    DB_ALIGNMENT_FILE,
+    PENALTY_CACHE_FILE,
+    PERSIST_PENALTY_CACHE,
+    SIM_WORKERS,
+    SWEEP_OUTPUT_DIR,
+    SWEEP_PARAMS,  # config values a sweep can vary; anything not set in a variant keeps its config.py value
+)
+from multiprocessing import Pool
+from matchup_simulator import load_db_alignment
+from player_store import DBStore
+from penalty_cache import DefensePenaltyCache
+from slate_engine import pack_slate, project_wr_range
+from wr_matchup_engine import matchup_tables, shadow_targets, MATCHUP_KEYS
+from parallel_engine import SharedTables, attach_tables, resolve_workers
+from weather_boost_generator import build_weather_boost_map
+from blend_engine import blend_seasons, sample_column
+from sim_engine import load_inputs
+from instrumentation import span, tracer
+import console
+
+# Setting either of these makes the variant's DB pools come from the multi-season DB file blended with them
+BLEND_PARAMS = ("BLEND_RECENCY_WEIGHTS", "BLEND_DECAY")
+
+# Worker-side state, set once per process by _init_worker
+_worker_tables = None
+_worker_blocks = []
+
+
+# --- Variant specs ---
+def parse_value(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        lowered = text.strip().lower()
+        return {"true": True, "false": False}.get(lowered, text.strip())
+
+
+def split_values(text):
+    """Split "a,b,[c,d]" on top-level commas only, so list values can sit inside a grid axis."""
+    parts, depth, current = [], 0, ""
+    for ch in text:
+        depth += ch in "[{"
+        depth -= ch in "]}"
+        if ch == "," and depth == 0:
+            parts.append(current)
+            current = ""
+        else:
+            current += ch
+    return parts + [current]
+
+
+def parse_grid_arg(arg):
+    """--grid PARAM=v1,v2,... -> (PARAM, [v1, v2, ...])"""
+    name, _, values = arg.partition("=")
+    name = name.strip().upper()
+    if name not in SWEEP_PARAMS:
+        raise ValueError(f"Unknown sweep parameter '{name}' (expected one of {', '.join(SWEEP_PARAMS)})")
+    return name, [parse_value(v) for v in split_values(values)]
+
+
+def expand_grid(grid):
+    """Cartesian product of {param: [values]} as a list of variant dicts."""
+    names = list(grid)
+    return [dict(zip(names, combo)) for combo in itertools.product(*(grid[n] for n in names))]
+
+
+def load_variants(path=None, grid_args=()):
+    """
+    Variants from a JSON file ({"grid": {...}} and/or {"variants": [{...}, ...]}) plus --grid axes.
+    The config.py baseline is always variant 0, so every row of the comparison has a reference.
+    """
+    variants = []
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            spec = json.load(f)
+        if "grid" in spec:
+            variants += expand_grid({k.upper(): v for k, v in spec["grid"].items()})
+        variants += [{k.upper(): v for k, v in v.items()} for v in spec.get("variants", [])]
+    if grid_args:
+        variants += expand_grid(dict(parse_grid_arg(a) for a in grid_args))
+    for variant in variants:
+        unknown = set(variant) - set(SWEEP_PARAMS)
+        if unknown:
+            raise ValueError(f"Unknown sweep parameter(s): {', '.join(sorted(unknown))}")
+    return [{}] + [v for v in variants if v]
+
+
+def resolve(variant):
+    """A variant with every sweep parameter filled in from config.py."""
+    return {name: variant.get(name, getattr(config, name)) for name in SWEEP_PARAMS}
+
+
+# --- Shared tables ---
+def blended_db_map(weights, decay, long_df=None, players=None):
+    long_df = pd.read_csv(DB_ALIGNMENT_FILE) if long_df is None else long_df
+    if not {"Player", "Year"} <= set(long_df.columns):
+        raise ValueError(f"Blend variants need a long-format {DB_ALIGNMENT_FILE} with Player and Year columns")
+    blended = blend_seasons(long_df, id_col="Player", weights=weights, decay=decay, sample_col=sample_column(long_df, "DB"), players=players)
+    return load_db_alignment(DB_ALIGNMENT_FILE, store=DBStore(blended, players=players))
+
+
+WR_MULTIPLIERS = ("SLOT_WEIGHT_MULTIPLIER", "WIDE_WEIGHT_MULTIPLIER", "SAFETY_WEIGHT_MULTIPLIER", "LB_WEIGHT_MULTIPLIER")
+
+
+def variant_weights(wrs, weights, params):
+    """
+    (WR x 4) alignment weights of the packed rows under a variant's WR role multipliers. `weights` is the
+    slate's packed (config multiplier) matrix. Store-backed rows are re-weighted by their own store, one
+    weights_for per store; other WR rows scale by the multiplier ratio (exact for the linear WR formulas; a role
+    whose config multiplier is 0 stays 0).
+    """
+    multipliers = [params[name] for name in WR_MULTIPLIERS]
+    out = weights.copy()
+    by_store, loose = {}, []
+    for i, wr in enumerate(wrs):
+        store = getattr(wr, "_store", None)
+        if store is not None:
+            _, rows, store_rows = by_store.setdefault(id(store), (store, [], []))
+            rows.append(i)
+            store_rows.append(wr._i)
+        elif wr.position == "WR":
+            loose.append(i)
+    for store, rows, store_rows in by_store.values():
+        out[rows] = store.weights_for(*multipliers)[store_rows]
+    if loose:
+        base = np.array([getattr(config, name) for name in WR_MULTIPLIERS], dtype=float)
+        ratio = np.divide(multipliers, base, out=np.ones(len(base)), where=base != 0)
+        out[loose] *= ratio
+    return out
+
+
+def variant_tables(inputs, variants, weeks):
+    """
+    Pack the shared slate once, then only what the variants change: one weight matrix per variant,
+    one penalty table per distinct (alignment mode, DB blend) and one env table per climate phase.
+    In "defender" matchup mode each distinct (weights, penalty key) also gets its own matchup tables.
+    `inputs` is load_inputs() output; "db_long" (DB rows to blend) and "forecast" are optional overrides.
+    Returns (base tables, meta, stacked tables, per-variant (weights, penalties, env, matchup) indices).
+    """
+    schedule, wr_map, db_map, coverage_map = inputs["schedule"], inputs["wr_map"], inputs["db_map"], inputs["def_coverage_map"]
+    base_cache = DefensePenaltyCache(db_map, coverage_map, PENALTY_CACHE_FILE if PERSIST_PENALTY_CACHE else None)
+    tables, meta = pack_slate(wr_map, weeks, schedule, db_map, coverage_map, inputs["env_boost_map"], base_cache)
+
+    wrs = meta["wrs"]
+    penalty_keys, env_keys, weight_stack, picks = [], [], [], []
+    for variant in variants:
+        params = resolve(variant)
+        weight_stack.append(variant_weights(wrs, tables["weights"], params))
+        blend = tuple(json.dumps(params[p]) for p in BLEND_PARAMS) if any(p in variant for p in BLEND_PARAMS) else None
+        penalty_key = (bool(params["USE_SOFT_ALIGNMENT"]), blend)
+        penalty_keys += [penalty_key] if penalty_key not in penalty_keys else []
+        env_keys += [params["CLIMATE_PHASE"]] if params["CLIMATE_PHASE"] not in env_keys else []
+        picks.append((len(weight_stack) - 1, penalty_keys.index(penalty_key), env_keys.index(params["CLIMATE_PHASE"]), None))
+
+    pools = {None: (db_map, base_cache)}
+    penalty_stack = []
+    for soft, blend in penalty_keys:
+        if blend not in pools:
+            pool = blended_db_map(*(json.loads(b) for b in blend), long_df=inputs.get("db_long"), players=inputs.get("players"))
+            pools[blend] = (pool, DefensePenaltyCache(pool, coverage_map))
+        pool, cache = pools[blend]
+        penalty_stack.append(pack_slate(wr_map, weeks, schedule, pool, coverage_map, None, cache, soft=soft, matchup_mode="role")[0]["penalties"])
+
+    env_stack = []
+    for phase in env_keys:
+        env_map = inputs["env_boost_map"] if phase == config.CLIMATE_PHASE else build_weather_boost_map(schedule, phase, forecast=inputs.get("forecast"))
+        env_stack.append(pack_slate(wr_map, weeks, schedule, db_map, coverage_map, env_map, base_cache, matchup_mode="role")[0]["env"])
+    base_cache.save()
+
+    stacks = {"weights": np.stack(weight_stack), "penalties": np.stack(penalty_stack), "env": np.stack(env_stack)}
+    if "matchup_penalty" in tables:
+        # Defender assignment depends on the WR weights and the DB pool, so it is solved per distinct pair
+        matchup_keys, matchup_stack, meta["db_names_stack"] = [], [], []
+        for v, (w, p, e, _) in enumerate(picks):
+            if (w, p) not in matchup_keys:
+                soft, blend = penalty_keys[p]
+                matchups, names = matchup_tables(
+                    weight_stack[w], tables["fpts"], tables["team_codes"], tables["opponent"], schedule.teams, pools[blend][0], soft,
+                    shadow_targets([wr.position for wr in wrs]),
+                )
+                matchup_keys.append((w, p))
+                matchup_stack.append(matchups)
+                meta["db_names_stack"].append(names)
+            picks[v] = (w, p, e, matchup_keys.index((w, p)))
+        stacks.update({k: np.stack([m[k] for m in matchup_stack]) for k in MATCHUP_KEYS})
+        tracer.gauge("sweep.matchup_tables", len(matchup_stack))
+    tracer.gauge("sweep.penalty_tables", len(penalty_stack))
+    tracer.gauge("sweep.env_tables", len(env_stack))
+    return tables, meta, stacks, picks
+
+
+# --- Evaluation ---
+def evaluate(tables, weeks):
+    """Point projections for every WR and week under one variant: (WR x week) rounded adj_pts, NaN = no game."""
+    pts = np.full((len(tables["team_codes"]), tables["opponent"].shape[0]), np.nan)
+    for out in project_wr_range(tables, weeks):
+        pts[out["rows"], out["week"]] = [round(float(x), 2) for x in out["adj_pts"]]  # as result_dicts rounds
+    return pts
+
+
+def with_variant(tables, pick):
+    w, p, e, m = pick
+    variant = {**tables, "weights": tables["weights_stack"][w], "penalties": tables["penalties_stack"][p], "env": tables["env_stack"][e]}
+    if m is not None:
+        variant.update({k: tables[f"{k}_stack"][m] for k in MATCHUP_KEYS})
+    return variant
+
+
+def variant_meta(meta, pick):
+    """meta whose DB names match the variant's top_defender ids."""
+    return meta if pick[3] is None else {**meta, "db_names": meta["db_names_stack"][pick[3]]}
+
+
+def _init_worker(specs):
+    global _worker_tables, _worker_blocks
+    tracer.reset()
+    _worker_tables, _worker_blocks = attach_tables(specs)
+
+
+def _run_variant(task):
+    pick, weeks = task
+    return evaluate(with_variant(_worker_tables, pick), weeks)
+
+
+def run_variants(tables, stacks, picks, weeks, workers=SIM_WORKERS):
+    """Evaluate every variant against one shared copy of the slate; returns a list of (WR x week) matrices."""
+    shared = {k: v for k, v in tables.items() if k not in stacks}
+    shared.update({f"{k}_stack": v for k, v in stacks.items()})
+    workers = resolve_workers(workers)
+    tasks = [(pick, weeks) for pick in picks]
+    if workers == 1 or len(tasks) == 1:
+        return [evaluate(with_variant(shared, pick), weeks) for pick, _ in tasks]
+    with SharedTables(shared) as block:
+        with Pool(min(workers, len(tasks)), initializer=_init_worker, initargs=(block.specs,)) as pool:
+            return pool.map(_run_variant, tasks)
+
+
+# --- Comparison ---
+def season_frame(meta, pts):
+    games = (~np.isnan(pts)).sum(axis=1)
+    season = np.nansum(pts, axis=1)
+    df = pd.DataFrame({
+        "wr_name": [wr.name for wr in meta["wrs"]],
+        "team": [wr.team for wr in meta["wrs"]],
+        "games": games,
+        "season_pts": np.round(season, 2),
+        "avg_pts": np.round(np.where(games > 0, season / np.maximum(games, 1), np.nan), 2),
+    })
+    df["rank"] = df["season_pts"].rank(ascending=False, method="min").astype(int)
+    return df
+
+
+def compare(variant, pts, base_pts, season, base_season):
+    played = ~np.isnan(pts)
+    delta = np.abs(pts - base_pts)[played & ~np.isnan(base_pts)]
+    top = season.sort_values("season_pts", ascending=False).iloc[0] if len(season) else None
+    return {
+        **{name.lower(): json.dumps(value) if isinstance(value, list) else value for name, value in resolve(variant).items()},
+        "db_blend": any(p in variant for p in BLEND_PARAMS),
+        "wr_weeks": int(played.sum()),
+        "total_pts": round(float(np.nansum(pts)), 2),
+        "mean_pts": round(float(np.nanmean(pts)), 4) if played.any() else np.nan,
+        "std_pts": round(float(np.nanstd(pts)), 4) if played.any() else np.nan,
+        "mean_abs_delta": round(float(delta.mean()), 4) if delta.size else 0.0,
+        "max_abs_delta": round(float(delta.max()), 4) if delta.size else 0.0,
+        "rank_corr": round(float(np.corrcoef(season["rank"], base_season["rank"])[0, 1]), 4) if len(season) > 1 else 1.0,
+        "top_wr": None if top is None else top["wr_name"],
+        "top_wr_pts": None if top is None else top["season_pts"],
+    }
+
+
+def run_sweep(variants, workers=SIM_WORKERS, output_dir=SWEEP_OUTPUT_DIR):
+    """
+    Load inputs once, evaluate every variant (point projections, full season) against the shared slate
+    and write summary.csv (one row per variant, compared with the config.py baseline = variant 0) plus
+    variant_NNN.csv (per-WR season totals and rank).
+    """
+    inputs = load_inputs(steps=True)
+    weeks = inputs["schedule"].weeks
+
+    console.info(f"\n6. Packing {len(variants)} scenario variants...")
+    with span("sweep.pack"):
+        tables, meta, stacks, picks = variant_tables(inputs, variants, weeks)
+
+    console.info(f"\n7. Evaluating {len(variants)} variants using {resolve_workers(workers)} workers...")
+    with span("sweep.evaluate", variants=len(variants)):
+        results = run_variants(tables, stacks, picks, weeks, workers)
+    tracer.count("sweep.variants", len(variants))
+
+    with span("sweep.export"):
+        os.makedirs(output_dir, exist_ok=True)
+        base_season = season_frame(meta, results[0])
+        rows = []
+        for i, (variant, pts) in enumerate(zip(variants, results)):
+            season = season_frame(meta, pts)
+            season["delta_vs_base"] = np.round(season["season_pts"] - base_season["season_pts"], 2)
+            season.to_csv(os.path.join(output_dir, f"variant_{i:03d}.csv"), index=False)
+            rows.append({"variant": i, **compare(variant, pts, results[0], season, base_season)})
+        summary = pd.DataFrame(rows)
+        summary.to_csv(os.path.join(output_dir, "summary.csv"), index=False)
+    console.info(f"\n✅ Sweep of {len(variants)} variants saved to {output_dir} (summary.csv + variant_NNN.csv)")
+    tracer.report()
+    return summary
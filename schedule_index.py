@@ -0,0 +1,96 @@
+# schedule_index.py
+
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from identity import TeamIndex
+
+Matchup = namedtuple("Matchup", ["week", "team", "opponent", "is_home", "date", "kickoff", "team_score", "opp_score"])
+
+
+class ScheduleIndex:
+    """
+    (week, team) -> matchup lookup built once from the schedule DataFrame.
+    Teams are interned to canonical identity ids (identity.TeamIndex) so opponents, home/away flags and
+    game rows are plain (week x team) arrays, and any spelling of a team ("PHI", "Philadelphia Eagles")
+    finds the same column; a lookup is two array reads instead of a DataFrame scan.
+    """
+
+    def __init__(self, schedule_df):
+        visitor_col = 'Visitor' if 'Visitor' in schedule_df.columns else 'Away'
+        weeks = schedule_df['Week'].astype(int).to_numpy()
+        visitors = schedule_df[visitor_col].astype(str).to_numpy()
+        homes = schedule_df['Home'].astype(str).to_numpy()
+
+        self.identity = TeamIndex(np.concatenate([visitors, homes]))
+        self.teams = self.identity.labels
+        self.team_codes = self.identity.codes
+        self.weeks = sorted(set(weeks.tolist()))
+
+        # Per-game columns (one entry per schedule row)
+        self.game_week = weeks
+        self.game_home = self.identity.ids(homes)
+        self.game_visitor = self.identity.ids(visitors)
+        self.game_date = self._column(schedule_df, 'Date', "")
+        self.game_kickoff = self._column(schedule_df, 'Time', "")
+        self.game_home_score = pd.to_numeric(self._column(schedule_df, 'ProjectedHomeScore', np.nan), errors='coerce').astype(float)
+        self.game_away_score = pd.to_numeric(self._column(schedule_df, 'ProjectedAwayScore', np.nan), errors='coerce').astype(float)
+
+        # (week x team) lookup arrays; -1 = no game (bye / unknown). First listed game wins.
+        shape = (max(self.weeks, default=0) + 1, len(self.teams))
+        self.opponent = np.full(shape, -1, dtype=int)
+        self.is_home = np.zeros(shape, dtype=bool)
+        self.game_row = np.full(shape, -1, dtype=int)
+        for row in range(len(weeks) - 1, -1, -1):
+            week, home, visitor = weeks[row], self.game_home[row], self.game_visitor[row]
+            self.opponent[week, home], self.is_home[week, home], self.game_row[week, home] = visitor, True, row
+            self.opponent[week, visitor], self.is_home[week, visitor], self.game_row[week, visitor] = home, False, row
+
+    @staticmethod
+    def _column(df, col, default):
+        return df[col].to_numpy() if col in df.columns else np.full(len(df), default, dtype=object)
+
+    def codes(self, teams):
+        """Integer codes for a sequence of team names in any spelling (-1 for teams the index does not know)."""
+        return self.identity.ids(teams)
+
+    def unscheduled(self, teams):
+        """Distinct team labels that resolve to no team with a game on this schedule (their rows drop out of every join)."""
+        teams = pd.Series(teams, dtype=object).dropna().unique()
+        codes = self.codes(teams)
+        scheduled = (self.opponent >= 0).any(axis=0)
+        return sorted(str(t) for t, c in zip(teams, codes) if str(t).strip() and (c < 0 or not scheduled[c]))
+
+    def opponent_codes(self, week, team_codes):
+        """Vectorized opponent lookup for an array of team codes (-1 where there is no game)."""
+        if week < 0 or week >= self.opponent.shape[0]:
+            return np.full(len(team_codes), -1, dtype=int)
+        return np.where(team_codes >= 0, self.opponent[week, team_codes], -1)
+
+    def lookup(self, week, team):
+        code = self.identity.id(team)
+        if code < 0 or week < 0 or week >= self.opponent.shape[0] or self.opponent[week, code] < 0:
+            return None
+        row = self.game_row[week, code]
+        is_home = bool(self.is_home[week, code])
+        home_score, away_score = self.game_home_score[row], self.game_away_score[row]
+        return Matchup(
+            week=week,
+            team=self.teams[code],
+            opponent=self.teams[self.opponent[week, code]],
+            is_home=is_home,
+            date=self.game_date[row],
+            kickoff=self.game_kickoff[row],
+            team_score=home_score if is_home else away_score,
+            opp_score=away_score if is_home else home_score,
+        )
+
+    def games(self):
+        """Iterate (week, home, visitor, date) for every scheduled game, in schedule order."""
+        for row in range(len(self.game_week)):
+            yield int(self.game_week[row]), self.teams[self.game_home[row]], self.teams[self.game_visitor[row]], self.game_date[row]
+
+
+def as_schedule_index(schedule):
+    """Accept either a prebuilt ScheduleIndex or a raw schedule DataFrame."""
+    return schedule if isinstance(schedule, ScheduleIndex) else ScheduleIndex(schedule)
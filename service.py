@@ -0,0 +1,405 @@
+# service.py
+
+import asyncio
+import http.client
+import json
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs, urlencode
+import numpy as np
+from config import (
+    NFL_SCHEDULE_2025_FILE,
+    WR_STATS_2024_FILE,
+    TE_STATS_2024_FILE,
+    RB_STATS_2024_FILE,
+    DB_ALIGNMENT_FILE,
+    DEF_COVERAGE_TAGS_FILE,
+    STADIUM_ENV_FILE,
+    MC_STD_DEV,
+    SIM_SEED,
+    SERVICE_HOST,
+    SERVICE_PORT,
+    SERVICE_SOCKET,
+    SERVICE_RELOAD_INTERVAL,
+    SERVICE_VARIANT_CACHE_SIZE,
+    SERVICE_MAX_BODY_BYTES,
+    SWEEP_PARAMS,
+)
+from sim_engine import load_inputs, build_penalty_cache
+from slate_engine import pack_slate, project_wr_range, project_row_set, finish_week, result_dicts
+from scenario_sweep import variant_tables, with_variant, variant_meta
+from monte_carlo import settings as mc_settings, parse_quantiles
+from input_cache import InputCache
+import console
+
+# Files whose change triggers a hot reload (the same sources load_inputs reads)
+WATCHED_FILES = [NFL_SCHEDULE_2025_FILE, WR_STATS_2024_FILE, TE_STATS_2024_FILE, RB_STATS_2024_FILE, DB_ALIGNMENT_FILE, DEF_COVERAGE_TAGS_FILE, STADIUM_ENV_FILE]
+
+
+def source_stamps(paths=WATCHED_FILES):
+    stamps = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            stamps[path] = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            stamps[path] = None
+    return stamps
+
+
+def season_history(tables, weeks):
+    """
+    Form history of a full season point run: the rounded adj_pts every WR gets in every week.
+    Any single week can then be projected on its own with exactly the form a season run carries into it.
+    """
+    history = tables["history"].copy()
+    for out in project_wr_range(tables, weeks):
+        history[out["rows"], out["week"]] = [round(float(x), 2) for x in out["adj_pts"]]
+    return history
+
+
+# --- Warm state ---
+class ProjectionState:
+    """
+    One loaded snapshot of every input: WR/DB maps, schedule index, penalty cache, weather map and the
+    packed slate with its season form history. Never mutated after construction except for the
+    variant LRU, so a reload builds a new state and swaps it in while queries keep reading the old one.
+    """
+
+    def __init__(self, cache=None, variant_cache_size=SERVICE_VARIANT_CACHE_SIZE):
+        start = time.perf_counter()
+        self.stamps = source_stamps()
+        self.inputs = load_inputs(cache or InputCache())
+        self.weeks = self.inputs["schedule"].weeks
+        penalty_cache = build_penalty_cache(self.inputs["db_map"], self.inputs["def_coverage_map"], self.weeks)
+        tables, meta = pack_slate(self.inputs["wr_map"], self.weeks, self.inputs["schedule"], self.inputs["db_map"],
+                                  self.inputs["def_coverage_map"], self.inputs["env_boost_map"], penalty_cache)
+        tables["history"] = season_history(tables, self.weeks)
+        self.base = (tables, meta)
+        self.row_of = {wr.name: i for i, wr in enumerate(meta["wrs"])}
+        self.variants = OrderedDict()
+        self.variant_cache_size = variant_cache_size
+        self._variant_lock = threading.Lock()
+        self.loaded_at = time.time()
+        self.load_seconds = time.perf_counter() - start
+
+    def changed(self):
+        return source_stamps(self.stamps) != self.stamps
+
+    def slate(self, overrides=None):
+        """(tables, meta) for the config baseline or a scenario_sweep-style override, built once per override."""
+        if not overrides:
+            return self.base
+        unknown = set(overrides) - set(SWEEP_PARAMS)
+        if unknown:
+            raise ValueError(f"Unknown override(s): {', '.join(sorted(unknown))} (expected: {', '.join(SWEEP_PARAMS)})")
+        key = json.dumps(overrides, sort_keys=True)
+        with self._variant_lock:
+            if key not in self.variants:
+                tables, meta, stacks, picks = variant_tables(self.inputs, [overrides], self.weeks)
+                tables = with_variant({**tables, **{f"{k}_stack": v for k, v in stacks.items()}}, picks[0])
+                tables = {k: v for k, v in tables.items() if not k.endswith("_stack")}
+                meta = variant_meta(meta, picks[0])
+                tables["history"] = season_history(tables, self.weeks)
+                self.variants[key] = (tables, meta)
+                while len(self.variants) > self.variant_cache_size:
+                    self.variants.popitem(last=False)
+            self.variants.move_to_end(key)
+            return self.variants[key]
+
+    def project(self, weeks=None, names=None, overrides=None, mc=None):
+        """Result dictionaries (season-output columns) for the given weeks (default: all), optionally only some WRs."""
+        tables, meta = self.slate(overrides)
+        if names:
+            missing = [n for n in names if n not in self.row_of]
+            if missing:
+                raise KeyError(f"Unknown WR(s): {', '.join(missing)}")
+        weeks = self.weeks if weeks is None else weeks
+        results = []
+        for week in weeks:
+            if week not in self.weeks:
+                raise ValueError(f"Week {week} is not on the schedule (weeks {self.weeks[0]}-{self.weeks[-1]})")
+            # The whole week is projected so "game" mode draws the same correlated slates as a season run
+            out = project_row_set(tables, week, np.arange(len(tables["team_codes"])), mc)
+            out = finish_week(tables, meta, [out], mc)
+            week_results = result_dicts(tables, meta, out, mc)
+            results += [r for r in week_results if r["wr_name"] in names] if names else week_results
+        return results
+
+    def health(self):
+        tables, meta = self.base
+        return {
+            "status": "ok",
+            "loaded_at": self.loaded_at,
+            "load_seconds": round(self.load_seconds, 3),
+            "weeks": [int(w) for w in self.weeks],
+            "wrs": len(meta["wrs"]),
+            "teams": len(meta["teams"]),
+            "cached_overrides": len(self.variants),
+        }
+
+
+# --- HTTP ---
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def query_params(query, body):
+    """Merge query-string and JSON-body parameters into (weeks, names, overrides, mc settings)."""
+    params = {k: v if len(v) > 1 else v[0] for k, v in parse_qs(query).items()}
+    params.update(body)
+    listify = lambda v: v if isinstance(v, list) else [v]
+    weeks = [int(w) for w in listify(params["week"])] if "week" in params else None
+    names = listify(params["wr"]) if "wr" in params else None
+    overrides = {k.upper(): v for k, v in params.get("overrides", {}).items()}
+    quantiles = params.get("quantiles")
+    if isinstance(quantiles, str):
+        quantiles = parse_quantiles(quantiles)
+    seed = params.get("seed", SIM_SEED)
+    mc = mc_settings(int(params.get("sims", 0)), float(params.get("std_dev", MC_STD_DEV)), quantiles,
+                     None if seed is None else int(seed), params.get("mc_mode"))
+    return weeks, names, overrides, mc
+
+
+class ProjectionService:
+    """
+    asyncio front end over a ProjectionState. Routes:
+      GET  /health                  load time, weeks, WR count
+      GET  /slate?week=N            every WR in week N (all weeks when omitted)
+      GET  /wr?wr=NAME[&week=N]     one WR (repeat wr= for several)
+      POST /project                 JSON {"week", "wr", "overrides": {PARAM: value}, "sims", "seed", "quantiles", "mc_mode"}
+      POST /reload                  rebuild the state now
+    Every query also takes sims/seed/quantiles/mc_mode; sims=0 (default) returns point projections.
+    """
+
+    def __init__(self, reload_interval=SERVICE_RELOAD_INTERVAL, max_body=SERVICE_MAX_BODY_BYTES):
+        self.state = None
+        self.reload_interval = reload_interval
+        self.max_body = max_body
+        self._reload_lock = None
+
+    async def load(self):
+        self._reload_lock = self._reload_lock or asyncio.Lock()
+        async with self._reload_lock:
+            state = await asyncio.to_thread(ProjectionState)
+            self.state = state
+        console.info(f"📦 Loaded {len(state.row_of)} WRs over {len(state.weeks)} weeks in {state.load_seconds:.2f}s")
+        return state
+
+    async def watch(self):
+        """Poll the input files and hot-swap a freshly built state when one changes; a failed reload keeps the old one."""
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            if not self.state.changed():
+                continue
+            console.info("🔄 Input files changed — reloading")
+            try:
+                await self.load()
+            except Exception as e:
+                console.warning(f"⚠️ Reload failed, still serving the previous inputs: {e}")
+                self.state.stamps = source_stamps()  # don't retry until the files change again
+
+    async def dispatch(self, method, path, query, body):
+        state = self.state
+        if path == "/health":
+            return state.health()
+        if path == "/reload":
+            if method != "POST":
+                raise HTTPError(405, "Use POST /reload")
+            return (await self.load()).health()
+        if path in ("/slate", "/wr", "/project"):
+            if path == "/project" and method != "POST":
+                raise HTTPError(405, "Use POST /project")
+            weeks, names, overrides, mc = query_params(query, body)
+            if path == "/wr" and not names:
+                raise HTTPError(400, "Missing wr=<name>")
+            results = await asyncio.to_thread(state.project, weeks, names, overrides, mc)
+            return {"count": len(results), "results": results}
+        raise HTTPError(404, f"No route {path}")
+
+    async def handle(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until the client closes it (keep-alive by default)."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                    length = int(headers.get("content-length", 0))
+                    if length < 0:
+                        raise ValueError
+                except ValueError:
+                    await self.reply(writer, 400, {"error": "Malformed request line or Content-Length"}, False)
+                    break
+                if length > self.max_body:
+                    # Refused unread, so the connection can't be reused
+                    await self.reply(writer, 413, {"error": f"Request body over {self.max_body} bytes"}, False)
+                    break
+                raw = await reader.readexactly(length)
+                status, payload = await self.respond(method, target, raw)
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                await self.reply(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def reply(writer, status, payload, keep_alive):
+        data = json.dumps(payload, default=_json_default).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data
+        )
+        await writer.drain()
+
+    async def respond(self, method, target, raw):
+        start = time.perf_counter()
+        url = urlsplit(target)
+        try:
+            body = json.loads(raw) if raw else {}
+            result = await self.dispatch(method, url.path, url.query, body)
+            status = 200
+        except HTTPError as e:
+            status, result = e.status, {"error": str(e)}
+        except (ValueError, KeyError, TypeError) as e:
+            status, result = 400, {"error": str(e).strip("'\"")}
+        except Exception as e:
+            console.error(f"❌ {method} {target} failed: {e!r}")
+            status, result = 500, {"error": repr(e)}
+        console.debug(f"{method} {target} -> {status} in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return status, result
+
+    async def serve(self, host=SERVICE_HOST, port=SERVICE_PORT, socket_path=SERVICE_SOCKET):
+        await self.load()
+        if socket_path:
+            server = await asyncio.start_unix_server(self.handle, path=socket_path)
+            where = socket_path
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+            where = "http://{}:{}".format(*server.sockets[0].getsockname()[:2])
+        console.info(f"🛰️ Projection service listening on {where} (Ctrl+C to stop)")
+        watcher = asyncio.create_task(self.watch()) if self.reload_interval else None
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if watcher:
+                watcher.cancel()
+
+
+def serve(host=SERVICE_HOST, port=SERVICE_PORT, socket_path=SERVICE_SOCKET, reload_interval=SERVICE_RELOAD_INTERVAL):
+    try:
+        asyncio.run(ProjectionService(reload_interval).serve(host, port, socket_path))
+    except KeyboardInterrupt:
+        console.info("\n👋 Projection service stopped")
+    finally:
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+# --- Client ---
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class ProjectionClient:
+    """Blocking local client; keeps one connection open so repeat queries skip the TCP/socket setup."""
+
+    def __init__(self, host=SERVICE_HOST, port=SERVICE_PORT, socket_path=SERVICE_SOCKET, timeout=60):
+        if socket_path:
+            self.conn = _UnixHTTPConnection(socket_path, timeout)
+        else:
+            self.conn = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def request(self, method, path, params=None, payload=None):
+        target = f"{path}?{urlencode(params, doseq=True)}" if params else path
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body else {}
+        self.conn.request(method, target, body=body, headers=headers)
+        response = self.conn.getresponse()
+        data = json.loads(response.read() or b"{}")
+        if response.status != 200:
+            raise RuntimeError(f"{method} {path} -> {response.status}: {data.get('error')}")
+        return data
+
+    def health(self):
+        return self.request("GET", "/health")
+
+    def slate(self, week=None, **mc):
+        return self.request("GET", "/slate", {**({"week": week} if week is not None else {}), **mc})["results"]
+
+    def wr(self, name, week=None, **mc):
+        return self.request("GET", "/wr", {"wr": name, **({"week": week} if week is not None else {}), **mc})["results"]
+
+    def project(self, week=None, wr=None, overrides=None, **mc):
+        payload = {k: v for k, v in {"week": week, "wr": wr, "overrides": overrides}.items() if v is not None}
+        return self.request("POST", "/project", payload={**payload, **mc})["results"]
+
+    def reload(self):
+        return self.request("POST", "/reload")
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query a running projection service (start it with main.py --mode serve)")
+    parser.add_argument("route", choices=["health", "slate", "wr", "project", "reload"])
+    parser.add_argument("--week", type=int, default=None)
+    parser.add_argument("--wr", type=str, action="append", default=None, help="WR name (repeatable)")
+    parser.add_argument("--override", action="append", default=[], metavar="PARAM=VALUE", help="Config override for 'project' (repeatable)")
+    parser.add_argument("--sims", type=int, default=0)
+    parser.add_argument("--host", type=str, default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--socket", type=str, default=SERVICE_SOCKET)
+    args = parser.parse_args()
+
+    from scenario_sweep import parse_value
+
+    client = ProjectionClient(args.host, args.port, args.socket)
+    if args.route == "health":
+        result = client.health()
+    elif args.route == "reload":
+        result = client.reload()
+    elif args.route == "slate":
+        result = client.slate(args.week, sims=args.sims)
+    elif args.route == "wr":
+        result = client.wr(args.wr, args.week, sims=args.sims)
+    else:
+        overrides = {k.upper(): parse_value(v) for k, _, v in (o.partition("=") for o in args.override)}
+        result = client.project(args.week, args.wr, overrides, sims=args.sims)
+    print(json.dumps(result, indent=2))
@@ -1,27 +1,72 @@
 
 # sim_engine.py
 
+import os
 import pandas as pd
 from config import (
     NFL_SCHEDULE_2025_FILE,
-    WR_STATS_2024_FILE,
     DB_ALIGNMENT_FILE,
     DEF_COVERAGE_TAGS_FILE,
     EXPORT_FULL_SEASON_FILE,
     EXPORT_TEST_WEEK_FILE,
-    STADIUM_ENV_FILE
+    EXPORT_TEAM_STACK_FILE,
+    STADIUM_ENV_FILE,
+    PERSIST_PENALTY_CACHE,
+    PENALTY_CACHE_FILE,
+    SIM_WORKERS,
+    SIM_CHUNK_SIZE,
+    SIM_SEED,
+    MC_SIMULATIONS,
+    MC_STD_DEV,
+    SLOT_WEIGHT_MULTIPLIER,
+    WIDE_WEIGHT_MULTIPLIER,
+    SAFETY_WEIGHT_MULTIPLIER,
+    LB_WEIGHT_MULTIPLIER,
+    TE_WEIGHT_MULTIPLIERS,
+    RB_WEIGHT_MULTIPLIERS,
+    PROJECT_POSITIONS,
+    POSITION_STATS_FILES,
+    CLIMATE_PHASE,
+    USE_FORECAST_WEATHER,
+    ENABLE_QUALITY_CONTROL,
 )
 from stat_loader import load_csv
-from matchup_simulator import load_db_alignment, load_wr_stats, project_wr_week
-from weather_boost_generator import build_weather_boost_map
-from multiprocessing import Pool, cpu_count
+from matchup_simulator import load_db_alignment, load_wr_stats
+from slate_engine import pack_slate
+from parallel_engine import iter_parallel_slate, resolve_workers
+from schedule_index import ScheduleIndex
+from penalty_cache import DefensePenaltyCache
+from weather_boost_generator import build_weather_boost_map, boost_map_from_table, get_fetcher
+from player_store import PlayerStore, DBStore
+from identity import PlayerIndex, canonical_team, roster_file
+from input_cache import InputCache
+from quality_control import ensure_valid_inputs
+from output_writer import SeasonWriter
+from instrumentation import span, tracer
+from monte_carlo import settings as mc_settings
+from incremental import (
+    slice_fingerprints,
+    run_settings,
+    load_state,
+    save_state,
+    state_settings,
+    changed_slices,
+    affected_projections,
+    seed_previous,
+    reproject,
+    merge_updates,
+    write_merged,
+    merge_stacks,
+    load_previous,
+)
+import console
 
 
 def build_def_coverage_map(coverage_df):
     def_coverage_map = {}
     for _, row in coverage_df.iterrows():
         week = row['week']
-        team = row['team']
+        team = canonical_team(row['team'])
         if week not in def_coverage_map:
             def_coverage_map[week] = {}
         def_coverage_map[week][team] = (
@@ -30,95 +75,271 @@ def build_def_coverage_map(coverage_df):
     return def_coverage_map
 
 
-def run_test_week_simulation(week, output_file=None, simulations=100):
-    schedule_df = load_csv(NFL_SCHEDULE_2025_FILE)
-    wr_map = load_wr_stats(WR_STATS_2024_FILE)
-    db_map = load_db_alignment(DB_ALIGNMENT_FILE)
-    coverage_df = load_csv(DEF_COVERAGE_TAGS_FILE)
-    def_coverage_map = build_def_coverage_map(coverage_df)
-    env_profile_df = load_csv(STADIUM_ENV_FILE)
-    env_boost_map = build_weather_boost_map(schedule_df)
-
-    results = []
-    penalty_cache = {}
-
-    for wr in wr_map.values():
-        key = (week, wr.team)
-        if key not in penalty_cache:
-            penalty_cache[key] = None
-        proj = project_wr_week(
-            wr, week, schedule_df, db_map, def_coverage_map,
-            simulations=simulations,
-            precomputed=penalty_cache[key],
-            env_boost_map=env_boost_map
+def build_penalty_cache(db_map, def_coverage_map, weeks):
+    with span("penalty_cache"):
+        cache = DefensePenaltyCache(db_map, def_coverage_map, PENALTY_CACHE_FILE if PERSIST_PENALTY_CACHE else None)
+        cache.precompute(weeks)
+        cache.save()
+    for name, value in cache.stats().items():
+        tracer.gauge(f"penalty_cache.{name}", value)
+    return cache
+
+
+def warn_unscheduled(schedule, sources):
+    """Name every input team label that matches no scheduled team instead of silently dropping its rows."""
+    for source, teams in sources.items():
+        missing = schedule.unscheduled(teams)
+        if missing:
+            shown = ", ".join(missing[:8]) + (" ..." if len(missing) > 8 else "")
+            console.warning(f"⚠️ {len(missing)} {source} team label(s) match no scheduled team and are left out: {shown}")
+
+
+def position_files(positions=PROJECT_POSITIONS):
+    """{position: stats file} for the projected positions whose file exists (WR is always loaded)."""
+    files = {}
+    for position in positions:
+        path = POSITION_STATS_FILES.get(position)
+        if position == "WR" or (path and os.path.exists(path)):
+            files[position] = path
+        else:
+            console.debug(f"ℹ️ No {position} stats file ({path}), skipping {position}s")
+    return files
+
+
+def load_inputs(cache=None, steps=False, weather_file=None):
+    """
+    Load every simulation input, going through the on-disk input cache: parsed tables and derived
+    structures are rebuilt only when their source files (or the config values they depend on) change.
+    `weather_file` reads the environment boosts from a saved boost table instead of building them.
+    """
+    cache = cache or InputCache()
+    step = console.info if steps else (lambda msg: None)
+    if ENABLE_QUALITY_CONTROL:
+        # Fails fast on bad inputs; skipped while the files match the last snapshot that passed
+        with span("validate"):
+            ensure_valid_inputs()
+    weights = [SLOT_WEIGHT_MULTIPLIER, WIDE_WEIGHT_MULTIPLIER, SAFETY_WEIGHT_MULTIPLIER, LB_WEIGHT_MULTIPLIER]
+
+    step(f'\n1. Loading schedule...')
+    with span("load.schedule"):
+        schedule = cache.get_or_build("schedule_index", [NFL_SCHEDULE_2025_FILE], lambda: ScheduleIndex(load_csv(NFL_SCHEDULE_2025_FILE)))
+
+    step(f'\n2. Loading pass-catcher stats...')
+    with span("load.wr_stats"):
+        files = position_files()
+        roster = [path for path in [roster_file()] if path]
+        wr_store = cache.get_or_build(
+            "wr_store", list(files.values()) + roster,
+            lambda: PlayerStore.from_frames({p: pd.read_csv(f) for p, f in files.items()}, players=PlayerIndex.from_roster()),
+            params={"weights": weights, "positions": list(files), "te": TE_WEIGHT_MULTIPLIERS, "rb": RB_WEIGHT_MULTIPLIERS},
         )
-        if proj:
-            results.append(proj)
+        wr_map = load_wr_stats(", ".join(files.values()), store=wr_store)
 
-    output_df = pd.DataFrame(results)
-    out_file = output_file or EXPORT_TEST_WEEK_FILE
-    output_df.to_csv(out_file, index=False)
-    print(f"✅ Test Week {week} projections saved to {out_file}")
-
-
-def simulate_for_week(args):
-    week, wr_map, schedule_df, db_map, def_coverage_map, env_boost_map, simulations = args
-    penalty_cache = {}
-    results = []
-    for wr in wr_map.values():
-        key = (week, wr.team)
-        if key not in penalty_cache:
-            penalty_cache[key] = None
-        proj = project_wr_week(
-            wr, week, schedule_df, db_map, def_coverage_map,
-            simulations=simulations,
-            precomputed=penalty_cache[key],
-            env_boost_map=env_boost_map
+    step(f'\n3. Loading DB alignment...')
+    with span("load.db_alignment"):
+        # DB ids are interned after the pass catchers', so the DB entry depends on the stat files too
+        db_store = cache.get_or_build(
+            "db_store", [DB_ALIGNMENT_FILE] + list(files.values()) + roster,
+            lambda: DBStore(pd.read_csv(DB_ALIGNMENT_FILE), players=wr_store.players), params={"positions": list(files)},
         )
-        if proj:
-            results.append(proj)
-    return results
+        db_map = load_db_alignment(DB_ALIGNMENT_FILE, store=db_store)
+        # One PlayerIndex per load: the DB store's holds every pass-catcher id plus the DBs'
+        players = wr_store.players = db_store.players
+
+    step(f'\n4. Loading coverage tags...')
+    with span("load.coverage_tags"):
+        def_coverage_map = cache.get_or_build("def_coverage_map", [DEF_COVERAGE_TAGS_FILE], lambda: build_def_coverage_map(load_csv(DEF_COVERAGE_TAGS_FILE)))
+
+    step(f'\n5. Loading environment profile...')
+    with span("load.environment", forecast=USE_FORECAST_WEATHER):
+        if weather_file:
+            # Boosts the pipeline's weather stage already built, so the run uses exactly the table it saved
+            env_boost_map = cache.get_or_build(
+                "env_boost_file", [weather_file],
+                lambda: boost_map_from_table(pd.read_csv(weather_file, dtype={"Home": str, "condition": str}, keep_default_na=False)),
+            )
+        elif USE_FORECAST_WEATHER:
+            # Live forecasts change independently of the input files, so they are never cached here
+            env_boost_map = build_weather_boost_map(schedule)
+            for name, value in get_fetcher().stats().items():
+                tracer.gauge(f"noaa.{name}", value)
+        else:
+            env_boost_map = cache.get_or_build(
+                "env_boost_map", [NFL_SCHEDULE_2025_FILE, STADIUM_ENV_FILE],
+                lambda: build_weather_boost_map(schedule), params={"climate_phase": CLIMATE_PHASE}
+            )
 
+    for name, value in cache.stats().items():
+        tracer.gauge(f"input_cache.{name}", value)
+    warn_unscheduled(schedule, {
+        "pass-catcher stats": wr_store.teams,
+        "DB stats": db_store.teams,
+        "coverage tags": [team for week in def_coverage_map.values() for team in week],
+    })
 
-def run_season_simulation(output_file=None, simulations=100):
-    print(f'\n1. Loading schedule...')
-    schedule_df = load_csv(NFL_SCHEDULE_2025_FILE)
+    return {
+        "schedule": schedule,
+        "players": players,
+        "wr_map": wr_map,
+        "db_map": db_map,
+        "def_coverage_map": def_coverage_map,
+        "env_boost_map": env_boost_map,
+        "cache": cache,
+    }
 
-    print(f'\n2. Loading WR stats...')
-    wr_map = load_wr_stats(WR_STATS_2024_FILE)
 
-    print(f'\n3. Loading DB alignment...')
-    db_map = load_db_alignment(DB_ALIGNMENT_FILE)
+def stream_slate(weekly, writer):
+    """
+    Write iter_parallel_slate output week by week. Returns (team totals, team stack rows); only these
+    small aggregates stay in memory, never the full result table.
+    """
+    team_totals, stacks = [], []
+    for out, week_results in weekly:
+        with span("export_week", week=int(out["week"])):
+            writer.write_week(out["week"], week_results)
+            if week_results:
+                team_totals.append(team_totals_frame(pd.DataFrame(week_results)))
+            stacks.extend(out.get("stacks", []))
+    return team_totals, stacks
 
-    print(f'\n4. Loading coverage tags...')
-    coverage_df = load_csv(DEF_COVERAGE_TAGS_FILE)
-    def_coverage_map = build_def_coverage_map(coverage_df)
 
-    print(f'\n5. Loading environment profile...')
-    env_profile_df = load_csv(STADIUM_ENV_FILE)
-    env_boost_map = build_weather_boost_map(schedule_df)
+def team_totals_frame(df):
+    # Median falls back to the point projection when p50 isn't among the requested quantiles
+    median = df["adj_pts_p50"] if "adj_pts_p50" in df.columns else df["adj_pts"]
+    return df.assign(median_pts=median).groupby("team")[["adj_pts", "median_pts", "base_pts"]].agg(["sum", "count"])
 
-    print(f'\n6. Simulating season in parallel using {cpu_count()} cores...')
-    args = [
-        (week, wr_map, schedule_df, db_map, def_coverage_map, env_boost_map, simulations)
-        for week in sorted(schedule_df['Week'].unique())
-    ]
 
-    with Pool(cpu_count()) as pool:
-        week_results = pool.map(simulate_for_week, args)
+def save_team_summary(team_totals, path="output/team_projection_summary.csv"):
+    if not team_totals:
+        return
+    totals = pd.concat(team_totals).groupby(level=0).sum()
+    team_summary = pd.DataFrame({
+        "Team": totals.index,
+        "Total Adj Pts": totals[("adj_pts", "sum")].to_numpy(),
+        "Avg Adj Pts": (totals[("adj_pts", "sum")] / totals[("adj_pts", "count")]).to_numpy(),
+        "Avg Median Pts": (totals[("median_pts", "sum")] / totals[("median_pts", "count")]).to_numpy(),
+        "Avg Base Pts": (totals[("base_pts", "sum")] / totals[("base_pts", "count")]).to_numpy(),
+    })
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    team_summary.to_csv(path, index=False)
+    console.info(f"📊 Team summary saved to {path}")
 
-    results = [r for week in week_results for r in week if r]
 
-    output_df = pd.DataFrame(results)
+def save_stacks(stacks):
+    if not stacks:
+        return
+    os.makedirs(os.path.dirname(EXPORT_TEAM_STACK_FILE) or ".", exist_ok=True)
+    pd.DataFrame(stacks).to_csv(EXPORT_TEAM_STACK_FILE, index=False)
+    console.info(f"🔗 Correlated team stacks saved to {EXPORT_TEAM_STACK_FILE}")
+
+
+def run_test_week_simulation(week, output_file=None, simulations=MC_SIMULATIONS, seed=SIM_SEED, quantiles=None, mode=None,
+                             output_format=None, samples_dir=None):
+    inputs = load_inputs()
+    schedule, wr_map, db_map = inputs["schedule"], inputs["wr_map"], inputs["db_map"]
+    def_coverage_map, env_boost_map = inputs["def_coverage_map"], inputs["env_boost_map"]
+    console.debug(f"🗃️ Input cache: {inputs['cache'].stats()}")
+    penalty_cache = build_penalty_cache(db_map, def_coverage_map, [week])
+
+    with span("pack_slate"):
+        tables, meta = pack_slate(wr_map, [week], schedule, db_map, def_coverage_map, env_boost_map, penalty_cache)
+    mc = mc_settings(simulations, MC_STD_DEV, quantiles, seed, mode, samples_dir)
+    out_file = output_file or EXPORT_TEST_WEEK_FILE
+    with SeasonWriter(out_file, output_format, samples_dir=samples_dir) as writer:
+        writer.write_players(meta)
+        _, stacks = stream_slate(iter_parallel_slate(tables, meta, [week], mc, workers=1), writer)
+    console.debug(f"🗃️ Penalty cache: {penalty_cache.stats()}")
+    console.info(f"✅ Test Week {week} projections saved to {writer.path}")
+    save_stacks(stacks)
+    tracer.report()
+
+
+def run_season_simulation(output_file=None, simulations=MC_SIMULATIONS, workers=SIM_WORKERS, chunk_size=SIM_CHUNK_SIZE, seed=SIM_SEED, quantiles=None, mode=None,
+                          output_format=None, samples_dir=None, weather_file=None):
+    inputs = load_inputs(steps=True, weather_file=weather_file)
+    schedule, wr_map, db_map = inputs["schedule"], inputs["wr_map"], inputs["db_map"]
+    def_coverage_map, env_boost_map = inputs["def_coverage_map"], inputs["env_boost_map"]
+    console.debug(f"🗃️ Input cache: {inputs['cache'].stats()}")
+
+    console.info(f'\n6. Precomputing defense penalty profiles...')
+    penalty_cache = build_penalty_cache(db_map, def_coverage_map, schedule.weeks)
+    console.debug(f"🗃️ Penalty cache: {penalty_cache.stats()}")
+
+    console.info(f'\n7. Packing slate tables...')
+    with span("pack_slate"):
+        tables, meta = pack_slate(wr_map, schedule.weeks, schedule, db_map, def_coverage_map, env_boost_map, penalty_cache)
+
+    mc = mc_settings(simulations, MC_STD_DEV, quantiles, seed, mode, samples_dir)
+    console.info(f'\n8. Simulating season in parallel using {resolve_workers(workers)} workers (chunk size {chunk_size}, {simulations} {mc.mode if mc else "no"} samples per WR-week)...')
     out_file = output_file or EXPORT_FULL_SEASON_FILE
-    output_df.to_csv(out_file, index=False)
-    print(f"\n✅ Full-season projections saved to {out_file}")
-
-    team_summary = output_df.groupby(['team']).agg({
-        'adj_pts': ['sum', 'mean'],
-        'adj_pts_p50': 'mean' if 'adj_pts_p50' in output_df.columns else 'mean',
-        'base_pts': 'mean'
-    }).reset_index()
-    team_summary.columns = ['Team', 'Total Adj Pts', 'Avg Adj Pts', 'Avg Median Pts', 'Avg Base Pts']
-    team_summary.to_csv("output/team_projection_summary.csv", index=False)
-    print("📊 Team summary saved to output/team_projection_summary.csv")
+    with SeasonWriter(out_file, output_format, samples_dir=samples_dir) as writer:
+        writer.write_players(meta)
+        weekly = iter_parallel_slate(tables, meta, schedule.weeks, mc, workers=workers, chunk_size=chunk_size)
+        team_totals, stacks = stream_slate(weekly, writer)
+    console.info(f"\n✅ Full-season projections saved to {writer.path}")
+    if samples_dir:
+        console.info(f"🎲 Raw float32 samples saved under {samples_dir}")
+
+    with span("summaries"):
+        save_team_summary(team_totals)
+        save_stacks(stacks)
+        output = {"path": writer.path, "fmt": writer.fmt, "partition": writer.partition, "samples_dir": samples_dir}
+        save_state(slice_fingerprints(tables, meta, db_map, inputs["players"]), run_settings(mc, schedule.weeks), output)
+    tracer.report()
+
+
+def run_incremental_update(output_file=None, workers=SIM_WORKERS, chunk_size=SIM_CHUNK_SIZE):
+    """
+    Re-project only the (week, WR) rows whose input slices changed since the last season run and merge
+    them into its saved output. Falls back to a full season run when there is no usable saved state.
+    """
+    state = load_state()
+    inputs = load_inputs(steps=True)
+    schedule, wr_map, db_map = inputs["schedule"], inputs["wr_map"], inputs["db_map"]
+    def_coverage_map, env_boost_map = inputs["def_coverage_map"], inputs["env_boost_map"]
+
+    console.info(f'\n6. Precomputing defense penalty profiles...')
+    penalty_cache = build_penalty_cache(db_map, def_coverage_map, schedule.weeks)
+    console.debug(f"🗃️ Penalty cache: {penalty_cache.stats()}")
+
+    console.info(f'\n7. Packing slate tables...')
+    with span("pack_slate"):
+        tables, meta = pack_slate(wr_map, schedule.weeks, schedule, db_map, def_coverage_map, env_boost_map, penalty_cache)
+
+    if state is None:
+        console.warning("⚠️ No saved season run — running the full season instead")
+        return run_season_simulation(output_file, workers=workers, chunk_size=chunk_size)
+    mc, output = state_settings(state), state["output"]
+    requested = output_file and output["path"] not in (output_file, os.path.splitext(output_file)[0])
+    if state["settings"] != run_settings(mc, schedule.weeks) or requested or not os.path.exists(output["path"]):
+        console.warning("⚠️ Saved season run doesn't match the current settings or output — running the full season instead")
+        return run_season_simulation(
+            output_file or output["path"], mc.simulations if mc else 0, workers, chunk_size,
+            mc.seed if mc else SIM_SEED, list(mc.quantiles) if mc else None, mc.mode if mc else None,
+            output_format=output["fmt"], samples_dir=output.get("samples_dir"),
+        )
+
+    players = inputs["players"]
+    fingerprints = slice_fingerprints(tables, meta, db_map, players)
+    changed = changed_slices(state["slices"], fingerprints)
+    dirty = affected_projections(changed, tables, meta, players)
+    console.info(f'\n8. Re-projecting: {len(changed)} changed input slices, {int(dirty.sum())} WR-weeks directly affected...')
+
+    previous_df = load_previous(output)
+    seed_previous(tables, meta, previous_df, players)
+    with span("reproject"):
+        updates = reproject(tables, meta, dirty, schedule.weeks, mc)
+    tracer.gauge("wr_weeks_dirty", int(dirty.sum()))
+    recomputed = sum(len(results) for _, results, _ in updates.values())
+    console.info(f"🔁 Recomputed {recomputed} projections across {len(updates)} weeks")
+
+    if updates:
+        merged = merge_updates(previous_df, updates, meta, players)
+        write_merged(merged, output, list(updates))
+        console.info(f"✅ Season projections updated in {output['path']}")
+        save_team_summary([team_totals_frame(merged)])
+        merge_stacks(EXPORT_TEAM_STACK_FILE, updates)
+        if output.get("samples_dir"):
+            console.warning(f"⚠️ Raw samples under {output['samples_dir']} were not refreshed; rerun the season to regenerate them")
+    save_state(fingerprints, run_settings(mc, schedule.weeks), output)
+    tracer.report()
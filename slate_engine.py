@@ -0,0 +1,354 @@
+# slate_engine.py
+
+import numpy as np
+from config import DEFAULT_MAN_ZONE_BLEND, USE_SOFT_ALIGNMENT, MC_STD_DEV, MATCHUP_MODE
+from matchup_simulator import defense_penalties
+from wr_matchup_engine import matchup_tables, expected_penalty, top_defenders_label, shadow_targets
+from schedule_index import as_schedule_index
+from monte_carlo import summarize, result_columns, wr_streams, stream_ids, shadow_flags, settings as mc_settings
+from game_simulator import simulate_week
+from output_writer import write_sample_part
+from instrumentation import span
+
+ROLES = ["slot", "wide", "safety", "lb"]
+
+
+# --- Packing ---
+def pack_wrs(wr_map):
+    """Pack a {player id: player} map (WRs and any other pass catchers) into the arrays the slate kernel runs on."""
+    wrs = list(wr_map.values())
+    store = getattr(wrs[0], "_store", None) if wrs else None
+    if store is not None and all(getattr(wr, "_store", None) is store for wr in wrs):
+        # Store-backed views: gather columns straight from the struct-of-arrays
+        idx = np.array([wr._i for wr in wrs], dtype=int)
+        return {
+            "wrs": wrs,
+            "names": list(store.names[idx]),
+            "teams": list(store.teams[idx]),
+            "positions": list(store.positions[idx]),
+            "weights": store.alignment_weights[idx],
+            "fpts": store.splits["fpts_per_target"][idx],
+        }
+    return {
+        "wrs": wrs,
+        "names": [wr.name for wr in wrs],
+        "teams": [wr.team for wr in wrs],
+        "positions": [wr.position for wr in wrs],
+        "weights": np.array([[wr.alignment_weights[r] for r in ROLES] for wr in wrs], dtype=float).reshape(-1, len(ROLES)),
+        "fpts": np.array([[wr.vs_man['fpts_per_target'], wr.vs_zone['fpts_per_target']] for wr in wrs], dtype=float).reshape(-1, 2),
+    }
+
+
+def pack_defenses(week, opp_teams, db_map, coverage_map, env_boost_map=None, penalty_cache=None, soft=USE_SOFT_ALIGNMENT):
+    """Per-defense arrays for one week: role penalties (D x 4), man flag, scheme label and env boost."""
+    default_scheme = "man" if DEFAULT_MAN_ZONE_BLEND else "unknown"
+    week_env = (env_boost_map or {}).get(week, {})
+
+    penalties = np.ones((len(opp_teams), len(ROLES)))
+    schemes = []
+    env = np.ones(len(opp_teams))
+    for i, team in enumerate(opp_teams):
+        if penalty_cache is not None:
+            profile = penalty_cache.get(week, team, soft)
+            penalties[i] = [profile[f"{r}_penalty"] for r in ROLES]
+        else:
+            role_penalties = defense_penalties(db_map.get(team, {}), soft)
+            penalties[i] = [role_penalties[r] for r in ROLES]
+        schemes.append(coverage_map.get(week, {}).get(team, default_scheme))
+
+        env_info = week_env.get(team)
+        if isinstance(env_info, dict):
+            env[i] = env_info.get("boost", 1.0)
+        elif isinstance(env_info, (float, int)):
+            env[i] = env_info
+
+    return {
+        "teams": opp_teams,
+        "penalties": penalties,
+        "schemes": schemes,
+        "is_man": np.array([s == "man" for s in schemes], dtype=bool),
+        "env": env,
+    }
+
+
+def seed_history(wrs, weeks):
+    """(WR x week) adj_pts matrix pre-filled from each WR's existing weekly_stats."""
+    last_week = max([int(w) for w in weeks] + [int(w) for wr in wrs for w in wr.weekly_stats] + [0])
+    history = np.full((len(wrs), last_week + 1), np.nan)
+    for i, wr in enumerate(wrs):
+        for w, stats in wr.weekly_stats.items():
+            history[i, int(w)] = stats['adj_pts']
+    return history
+
+
+def pack_slate(wr_map, weeks, schedule_df, db_map, coverage_map, env_boost_map=None, penalty_cache=None, soft=USE_SOFT_ALIGNMENT,
+               matchup_mode=MATCHUP_MODE):
+    """
+    Pack every static input of a slate into plain NumPy arrays indexed by WR row and schedule team code.
+    Returns (tables, meta): `tables` holds only arrays (safe to place in shared memory), `meta` the
+    Python-side labels needed to turn kernel output back into result dictionaries.
+    In "defender" matchup mode the tables also carry per-(week, WR) defender exposure penalties.
+    """
+    schedule = as_schedule_index(schedule_df)
+    packed = pack_wrs(wr_map)
+    weeks = sorted(int(w) for w in weeks)
+    n_weeks = max(weeks + [schedule.opponent.shape[0] - 1]) + 1
+    n_teams = len(schedule.teams)
+
+    opponent = np.full((n_weeks, n_teams), -1, dtype=int)
+    opponent[:schedule.opponent.shape[0]] = schedule.opponent
+    penalties = np.ones((n_weeks, n_teams, len(ROLES)))
+    scheme_code = np.zeros((n_weeks, n_teams), dtype=np.int8)
+    env = np.ones((n_weeks, n_teams))
+    scheme_labels = ["man", "zone"]
+
+    for week in weeks:
+        defense_codes = np.unique(opponent[week][opponent[week] >= 0])
+        if defense_codes.size == 0:
+            continue
+        opp_teams = [schedule.teams[c] for c in defense_codes]
+        defenses = pack_defenses(week, opp_teams, db_map, coverage_map, env_boost_map, penalty_cache, soft)
+        penalties[week, defense_codes] = defenses["penalties"]
+        env[week, defense_codes] = defenses["env"]
+        for code, scheme in zip(defense_codes, defenses["schemes"]):
+            if scheme not in scheme_labels:
+                scheme_labels.append(scheme)
+            scheme_code[week, code] = scheme_labels.index(scheme)
+
+    tables = {
+        "weights": packed["weights"],
+        "fpts": packed["fpts"],
+        "team_codes": schedule.codes(packed["teams"]),
+        "opponent": opponent,
+        "penalties": penalties,
+        "scheme_code": scheme_code,
+        "env": env,
+        "history": seed_history(packed["wrs"], weeks),
+        "stream_ids": stream_ids(packed["positions"], packed["names"], packed["teams"]),
+    }
+    meta = {"wrs": packed["wrs"], "player_ids": list(wr_map), "teams": schedule.teams, "scheme_labels": scheme_labels}
+    if matchup_mode == "defender":
+        matchups, meta["db_names"] = matchup_tables(
+            tables["weights"], tables["fpts"], tables["team_codes"], opponent, schedule.teams, db_map, soft, shadow_targets(packed["positions"])
+        )
+        tables.update(matchups)
+    elif matchup_mode != "role":
+        raise ValueError(f"Unknown matchup mode '{matchup_mode}' (expected 'defender' or 'role')")
+    return tables, meta
+
+
+# --- Kernel ---
+def slate_kernel(weights, fpts, is_man, penalties, form, env):
+    """
+    Matchup projection for every row of the slate at once: returns (base_pts, adj_pts).
+    `penalties` is (rows x 4) role penalties, or one effective defender-exposure penalty per row.
+    """
+    base_pts = np.where(is_man, fpts[:, 0], fpts[:, 1])
+    if penalties.ndim == 1:
+        return base_pts, base_pts * (1 - penalties) * form * env
+    adj_pts = base_pts * (weights * (1 - penalties)).sum(axis=1) / weights.sum(axis=1)
+    return base_pts, adj_pts * form * env
+
+
+def form_boost(history, week):
+    """Recent-form multiplier, 1 + (mean adj_pts of the last three played weeks - 10) / 30, over a (WR x week) matrix of adj_pts (NaN = no game)."""
+    window = history[:, max(week - 3, 0):week]
+    played = ~np.isnan(window)
+    count = played.sum(axis=1)
+    total = np.where(played, window, 0.0).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, 1 + (total / np.maximum(count, 1) - 10) / 30, 1.0)
+
+
+class FormWindow:
+    """
+    Rolling three-week adj_pts state for a block of WRs, as read by form_boost.
+    A ring buffer keyed by calendar week, so bye weeks simply leave a slot empty; weeks that were
+    not projected in this run are filled from the packed history (prior weekly_stats).
+    """
+
+    def __init__(self, n_rows, history=None):
+        self.pts = np.full((n_rows, 3), np.nan)
+        self.weeks = np.full((n_rows, 3), -1, dtype=int)
+        self.history = history
+        self.pushed = set()
+
+    def push(self, week, local_rows, values):
+        self.pts[local_rows, week % 3] = values
+        self.weeks[local_rows, week % 3] = week
+        self.pushed.add(week)
+
+    def boost(self, week):
+        for w in range(max(week - 3, 0), week):
+            if w not in self.pushed and self.history is not None and w < self.history.shape[1]:
+                rows = np.flatnonzero(~np.isnan(self.history[:, w]))
+                self.push(w, rows, self.history[rows, w])
+        live = (self.weeks >= max(week - 3, 0)) & (self.weeks < week)
+        count = live.sum(axis=1)
+        total = np.where(live, self.pts, 0.0).sum(axis=1)
+        return np.where(count > 0, 1 + (total / np.maximum(count, 1) - 10) / 30, 1.0)
+
+
+def project_rows(tables, week, lo=0, hi=None, mc=None, form=None):
+    """
+    Run the kernel for WR rows [lo, hi) in one week against packed tables.
+    `form` (length hi - lo) overrides the history-based form boost.
+    Returns a dict of arrays (rows, opp_codes, base_pts, adj_pts, mc stats) covering the WRs with a game.
+    """
+    hi = len(tables["team_codes"]) if hi is None else hi
+    return project_row_set(tables, week, np.arange(lo, hi), mc, form, part=lo)
+
+
+def project_row_set(tables, week, rows, mc=None, form=None, part=None):
+    """project_rows for an arbitrary set of WR rows; `part` names the raw-sample dump file, if any."""
+    rows = np.asarray(rows, dtype=int)
+    team_codes = tables["team_codes"][rows]
+    opponent = tables["opponent"][week]
+    opp_codes = np.where(team_codes >= 0, opponent[np.maximum(team_codes, 0)], -1)
+    local = np.flatnonzero(opp_codes >= 0)
+    rows = rows[local]
+    opp_codes = opp_codes[local]
+    form = form_boost(tables["history"][rows], week) if form is None else form[local]
+    defender = "matchup_penalty" in tables
+    if defender:
+        shadow = tables["shadow_rate"][week, opp_codes]
+        penalties = expected_penalty(tables["matchup_penalty"][week, rows], shadow)
+    else:
+        penalties = tables["penalties"][week, opp_codes]
+
+    base_pts, adj_pts = slate_kernel(
+        tables["weights"][rows],
+        tables["fpts"][rows],
+        tables["scheme_code"][week, opp_codes] == 0,
+        penalties,
+        form,
+        tables["env"][week, opp_codes],
+    )
+    stats = None
+    if mc is not None and mc.mode == "independent":
+        dump = bool(mc.samples_dir) and part is not None
+        switch = None
+        if defender and shadow.any():
+            # Shadow coverage uncertainty: each sample draws whether the opposing shadow defender travels
+            shadowed = base_pts * (1 - tables["matchup_penalty"][week, rows, 1]) * form * tables["env"][week, opp_codes]
+            unshadowed = base_pts * (1 - tables["matchup_penalty"][week, rows, 0]) * form * tables["env"][week, opp_codes]
+            switch = (unshadowed, shadowed, shadow_flags(mc.seed, week, tables["shadow_rate"][week], mc.simulations), opp_codes)
+        stats = summarize(adj_pts, mc, wr_streams(mc.seed, tables["stream_ids"][rows], week), keep=dump, switch=switch)
+        if dump:
+            # Written from the worker, so raw draws never travel back through the pool
+            write_sample_part(mc.samples_dir, week, part, rows, stats.pop("samples"))
+    return {"week": week, "rows": rows, "opp_codes": opp_codes, "base_pts": base_pts, "adj_pts": adj_pts, "mc": stats}
+
+
+def project_wr_range(tables, weeks, lo=0, hi=None, mc=None):
+    """
+    Project WR rows [lo, hi) through every week in order, carrying each WR's rolling form window.
+    Each WR's outcome depends only on its own history and RNG streams, so any partition of rows
+    across workers produces identical results.
+    """
+    return [out for _, out in _walk_weeks(tables, weeks, lo, hi, mc)]
+
+
+def season_forms(tables, weeks):
+    """
+    (WR row x week) recent-form boost of every projection, from one point-projection pass. Form only
+    reads rounded point projections, never Monte Carlo draws, so with these precomputed each week's
+    sampling can run on its own (parallel_engine streams the season week by week this way).
+    """
+    forms = np.ones((len(tables["team_codes"]), tables["opponent"].shape[0]))
+    for week, form, _ in _walk_weeks(tables, weeks, with_form=True, label="form_week"):
+        forms[:, week] = form
+    return forms
+
+
+def _walk_weeks(tables, weeks, lo=0, hi=None, mc=None, with_form=False, label="project_week"):
+    hi = len(tables["team_codes"]) if hi is None else hi
+    window = FormWindow(hi - lo, tables["history"][lo:hi])
+    for week in sorted(int(w) for w in weeks):
+        form = window.boost(week)
+        with span(label, week=week):
+            out = project_rows(tables, week, lo, hi, mc, form=form)
+        # Form reads the rounded adj_pts stored in weekly_stats, so round exactly as result_dicts does
+        window.push(week, out["rows"] - lo, [round(float(x), 2) for x in out["adj_pts"]])
+        yield (week, form, out) if with_form else (week, out)
+
+
+def finish_week(tables, meta, week_outputs, mc=None):
+    """
+    Merge one week's project_rows outputs (in WR-row order) into a single output. In "game" mode the
+    week's correlated slates are drawn here, since shared game shocks span every WR range.
+    """
+    out = merge_week(week_outputs)
+    if mc is not None and mc.mode == "game":
+        simulate_week(tables, meta, out, mc)
+    return out
+
+
+def merge_week(week_outputs):
+    """One week's project_rows outputs (in WR-row order) concatenated into a single output."""
+    week_outputs = list(week_outputs)
+    if len(week_outputs) == 1:
+        out = week_outputs[0]
+    else:
+        out = {"week": week_outputs[0]["week"]}
+        for key in ("rows", "opp_codes", "base_pts", "adj_pts"):
+            out[key] = np.concatenate([o[key] for o in week_outputs])
+        stats = [o["mc"] for o in week_outputs]
+        out["mc"] = None if stats[0] is None else {
+            key: np.concatenate([st[key] for st in stats], axis=-1) for key in stats[0]
+        }
+    return out
+
+
+def result_dicts(tables, meta, out, mc=None):
+    """Turn project_rows output into per-WR result dictionaries (one per WR and week)."""
+    week, stats = out["week"], out["mc"]
+    results = []
+    for k, (i, j) in enumerate(zip(out["rows"], out["opp_codes"])):
+        wr = meta["wrs"][i]
+        weights = tables["weights"][i]
+        result = {
+            'week': week,
+            'wr_name': wr.name,
+            'position': wr.position,
+            'team': wr.team,
+            'opp_team': meta["teams"][j],
+            'scheme': meta["scheme_labels"][tables["scheme_code"][week, j]],
+            'base_pts': round(float(out["base_pts"][k]), 2),
+            'adj_pts': round(float(out["adj_pts"][k]), 2),
+            'slot_weight': round(float(weights[0]), 2),
+            'wide_weight': round(float(weights[1]), 2),
+            'safety_weight': round(float(weights[2]), 2),
+            'lb_weight': round(float(weights[3]), 2),
+            'env_boost': round(float(tables["env"][week, j]), 3)
+        }
+        if "top_defender" in tables:
+            result['top_defenders'] = top_defenders_label(meta["db_names"], tables["top_defender"][week, i], tables["top_share"][week, i])
+        if stats is not None:
+            result.update(result_columns(stats, k, mc))
+        results.append(result)
+    return results
+
+
+def apply_results(tables, meta, results_by_row):
+    """Record finished projections on the WR objects and in the form history (parent-side)."""
+    for i, result in results_by_row:
+        meta["wrs"][i].weekly_stats[result['week']] = result
+        tables["history"][i, int(result['week'])] = result['adj_pts']
+
+
+# --- Driver ---
+def project_slate(wr_map, weeks, schedule_df, db_map, coverage_map, simulations=0, std_dev=MC_STD_DEV, env_boost_map=None, penalty_cache=None, seed=None, quantiles=None, mode=None):
+    """
+    Project every WR for every week in `weeks` in one batched pass per week.
+    Returns result_dicts rows, in wr_map order within each week.
+    """
+    tables, meta = pack_slate(wr_map, weeks, schedule_df, db_map, coverage_map, env_boost_map, penalty_cache)
+    mc = mc_settings(simulations, std_dev, quantiles, seed, mode)
+    results = []
+    for out in project_wr_range(tables, weeks, mc=mc):
+        out = finish_week(tables, meta, [out], mc)
+        week_results = result_dicts(tables, meta, out, mc)
+        apply_results(tables, meta, zip(out["rows"], week_results))
+        results.extend(week_results)
+    return results
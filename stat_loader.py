@@ -1,14 +1,9 @@
 # YACulator: stat_loader.py
+import os
 import pandas as pd
+import console
 
 def load_csv(filepath):
-    import os
     df = pd.read_csv(filepath)
-    sample = df.iloc[0]
-
-    print(f"\n(SAMPLE) {os.path.normpath(filepath)}:")
-    for col in df.columns:
-        val = sample[col]
-        print(f"🔹 {col}: {val}")
-
+    console.debug(f"📄 Loaded {os.path.normpath(filepath)} ({len(df)} rows x {len(df.columns)} columns)")
     return df
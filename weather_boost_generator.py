@@ -1,67 +1,82 @@
-
 # weather_boost_generator.py
 
-import requests
 from datetime import datetime
+import numpy as np
+import pandas as pd
 from config import STADIUM_ENV_FILE, CLIMATE_PHASE
 from stat_loader import load_csv
-from weather_estimator import estimate_weather_boost
+from schedule_index import as_schedule_index
+from weather_estimator import estimate_weather_boost, estimate_weather_boost_frame, CLIMATE_PHASE_MODIFIERS
 from config import USE_FORECAST_WEATHER
+import console
 
 forecast_cache = {}
+_fetcher = None
 
-def get_forecast_boost(lat, lon, date):
-    key = (lat, lon, date)
-    if key in forecast_cache:
-        return forecast_cache[key]
 
-    try:
-        point_url = f"https://api.weather.gov/points/{lat},{lon}"
-        point_resp = requests.get(point_url, timeout=10)
-        point_resp.raise_for_status()
-        point_data = point_resp.json()
-        forecast_url = point_data["properties"]["forecast"]
+def get_fetcher():
+    global _fetcher
+    if _fetcher is None:
+        from forecast_fetcher import ForecastFetcher
+        _fetcher = ForecastFetcher()
+    return _fetcher
 
-        forecast_resp = requests.get(forecast_url, timeout=10)
-        forecast_resp.raise_for_status()
-        forecast_data = forecast_resp.json()
 
-        from dateutil import parser  # ← make sure this is imported
+def forecast_boost(forecast_data, date):
+    from dateutil import parser
 
+    try:
+        parsed_date = parser.parse(date)
+        target_day = parsed_date.strftime("%A")
+    except Exception as e:
+        console.warning(f"⚠️ Date parsing failed for value: {date} — using default 'Sunday'")
+        target_day = "Sunday"
+
+    boost = 1.0
+    condition = "Normal"
+
+    for period in forecast_data["properties"]["periods"]:
+        if period["name"] == target_day:
+            temp = period.get("temperature", 60)
+            wind = period.get("windSpeed", "10 mph")
+            wind_speed = int(wind.split(" ")[0]) if wind else 10
+            short_forecast = period.get("shortForecast", "")
+
+            condition = f"{temp}°F, {wind} wind, {short_forecast}"
+
+            if temp < 35 or wind_speed > 20:
+                boost *= 0.9
+            if "Snow" in short_forecast or "Sleet" in short_forecast:
+                boost *= 0.85
+            elif "Rain" in short_forecast or "Showers" in short_forecast:
+                boost *= 0.92
+            break
+
+    return round(boost, 3), condition
+
+
+def prefetch_forecast_boosts(games):
+    """Fetch forecasts for every (lat, lon, date) concurrently and fill forecast_cache in one pass."""
+    pending = [key for key in dict.fromkeys(games) if key not in forecast_cache]
+    if not pending:
+        return
+    forecasts = get_fetcher().fetch_all([(lat, lon) for lat, lon, _ in pending])
+    for lat, lon, date in pending:
+        forecast_data = forecasts[(lat, lon)]
         try:
-            parsed_date = parser.parse(date)
-            target_day = parsed_date.strftime("%A")
+            if isinstance(forecast_data, Exception):
+                raise forecast_data
+            forecast_cache[(lat, lon, date)] = forecast_boost(forecast_data, date)
         except Exception as e:
-            print(f"⚠️ Date parsing failed for value: {date} — using default 'Sunday'")
-            target_day = "Sunday"
-
-        boost = 1.0
-        condition = "Normal"
-
-        for period in forecast_data["properties"]["periods"]:
-            if period["name"] == target_day:
-                temp = period.get("temperature", 60)
-                wind = period.get("windSpeed", "10 mph")
-                wind_speed = int(wind.split(" ")[0]) if wind else 10
-                short_forecast = period.get("shortForecast", "")
-
-                condition = f"{temp}°F, {wind} wind, {short_forecast}"
+            console.warning(f"❌ NOAA fetch error at lat={lat}, lon={lon}, using default boost. Reason: {e}")
+            forecast_cache[(lat, lon, date)] = (1.0, "Unavailable")
 
-                if temp < 35 or wind_speed > 20:
-                    boost *= 0.9
-                if "Snow" in short_forecast or "Sleet" in short_forecast:
-                    boost *= 0.85
-                elif "Rain" in short_forecast or "Showers" in short_forecast:
-                    boost *= 0.92
-                break
 
-        forecast_cache[key] = (round(boost, 3), condition)
-        return forecast_cache[key]
-
-    except Exception as e:
-        print(f"❌ NOAA fetch error at lat={lat}, lon={lon}, using default boost. Reason: {e}")
-        forecast_cache[key] = (1.0, "Unavailable")
-        return forecast_cache[key]
+def get_forecast_boost(lat, lon, date):
+    key = (lat, lon, date)
+    if key not in forecast_cache:
+        prefetch_forecast_boosts([key])
+    return forecast_cache[key]
 
 
 def compute_weather_boost(stadium_profile, week, climate_phase, date):
@@ -79,24 +94,70 @@ def compute_weather_boost(stadium_profile, week, climate_phase, date):
     return estimate_weather_boost(stadium_profile, week, climate_phase), "Climatology"
 
 
-def build_weather_boost_map(schedule_df):
-    env_df = load_csv(STADIUM_ENV_FILE)
+def schedule_stadiums(schedule, env_df):
+    """One row per scheduled game (Week, Home, Date) joined once to the home stadium's profile (on team ids, so spellings may differ)."""
+    games = pd.DataFrame({
+        "Week": schedule.game_week.astype(int),
+        "Home": [schedule.teams[c] for c in schedule.game_home],
+        "Date": schedule.game_date,
+        "TeamId": schedule.game_home,
+    })
+    profiles = env_df.assign(TeamId=schedule.identity.ids(env_df["Team"]))
+    profiles = profiles[profiles["TeamId"] >= 0].drop_duplicates("TeamId", keep="first")
+    merged = games.merge(profiles, how="left", on="TeamId", indicator=True).drop(columns="TeamId")
+    merged["HasProfile"] = merged.pop("_merge").to_numpy() == "both"
+    return merged
+
+
+def build_weather_boost_table(schedule_df, climate_phase=CLIMATE_PHASE, env_df=None, forecast=None):
+    """
+    Whole-schedule (Week, Home) boost table in one pass: domes, climatology and unknown stadiums are
+    column operations; only outdoor games under USE_FORECAST_WEATHER (or forecast=True) go through the
+    NOAA fetcher. Backtests pass forecast=False, since past games have no forecast to fetch.
+    """
+    forecast = USE_FORECAST_WEATHER if forecast is None else forecast
+    schedule = as_schedule_index(schedule_df)
+    env_df = load_csv(STADIUM_ENV_FILE) if env_df is None else env_df
+    games = schedule_stadiums(schedule, env_df)
+
+    known = games["HasProfile"].to_numpy()
+    dome = known & (games["Dome"].to_numpy().astype(bool) if "Dome" in games.columns else False)
+    boost = np.where(known, estimate_weather_boost_frame(games, climate_phase), 1.0)
+    condition = np.where(dome, "Dome", np.where(known, "Climatology", "Unknown")).astype(object)
+
+    if forecast:
+        outdoor = np.flatnonzero(known & ~dome)
+        keys = list(zip(games["Latitude"].to_numpy()[outdoor], games["Longitude"].to_numpy()[outdoor], games["Date"].to_numpy()[outdoor]))
+        prefetch_forecast_boosts(keys)
+        for row, key in zip(outdoor, keys):
+            boost[row], condition[row] = forecast_cache[key]
+
+    games["boost"] = np.round(boost, 3)
+    games["condition"] = condition
+    return games[["Week", "Home", "Date", "boost", "condition"]]
+
+
+def build_weather_boost_map(schedule_df, climate_phase=CLIMATE_PHASE, forecast=None):
+    return boost_map_from_table(build_weather_boost_table(schedule_df, climate_phase, forecast=forecast))
+
+
+def boost_map_from_table(table):
+    """{week: {home team: {"boost", "condition"}}} from a build_weather_boost_table frame or its saved CSV."""
     env_boost_map = {}
-
-    for _, row in schedule_df.iterrows():
-        week = row['Week']
-        home_team = row['Home']
-        date = row['Date']
-
-        match = env_df[env_df['Team'] == home_team]
-        if match.empty:
-            boost, condition = 1.0, "Unknown"
-        else:
-            stadium_profile = match.iloc[0].to_dict()
-            boost, condition = compute_weather_boost(stadium_profile, week, CLIMATE_PHASE, date)
-
+    for week, home_team, boost, condition in zip(table["Week"].tolist(), table["Home"], table["boost"], table["condition"]):
         if week not in env_boost_map:
             env_boost_map[week] = {}
-        env_boost_map[week][home_team] = {"boost": round(boost, 3), "condition": condition}
+        env_boost_map[week][home_team] = {"boost": float(boost), "condition": condition}
 
     return env_boost_map
+
+
+def climate_phase_scenarios(schedule_df, phases=None):
+    """Climatology boost for every game under each climate phase, side by side, for scenario comparison."""
+    schedule = as_schedule_index(schedule_df)
+    games = schedule_stadiums(schedule, load_csv(STADIUM_ENV_FILE))
+    known = games["HasProfile"].to_numpy()
+    table = games[["Week", "Home", "Date"]].copy()
+    for phase in phases or list(CLIMATE_PHASE_MODIFIERS):
+        table[phase] = np.where(known, estimate_weather_boost_frame(games, phase), 1.0)
+    return table
@@ -2,6 +2,8 @@
 # weather_estimator.py
 
 import math
+import numpy as np
+import pandas as pd
 
 CLIMATE_PHASE_MODIFIERS = {
     "ElNino": {
@@ -99,3 +101,56 @@ def classify_climate_region(state: str) -> str:
     if state in northwest:
         return "Northwest"
     return "Neutral"
+
+
+def _flag(df, col):
+    """Column truthiness with the same semantics as `bool(row.get(col, False))`."""
+    return df[col].to_numpy().astype(bool) if col in df.columns else np.zeros(len(df), dtype=bool)
+
+
+def _text(df, col):
+    return df[col].fillna("").astype(str).str.lower() if col in df.columns else pd.Series([""] * len(df), index=df.index)
+
+
+def estimate_weather_boost_frame(games_df: pd.DataFrame, climate_phase: str = "Neutral") -> np.ndarray:
+    """
+    Vectorized estimate_weather_boost: one boost per row of `games_df`, which holds a `Week`
+    column joined to the home stadium's profile columns (Dome, ColdProne, TurfType, State, ...).
+    """
+    week = games_df["Week"].to_numpy()
+    cold = _flag(games_df, "ColdProne")
+    wind = _flag(games_df, "WindProne")
+
+    # 2. Base seasonal penalty
+    boost = np.ones(len(games_df))
+    late, mid = week >= 12, (week >= 8) & (week < 12)
+    boost *= np.where(late & cold, 0.95, 1.0)
+    boost *= np.where(late & wind, 0.97, 1.0)
+    boost *= np.where(mid & cold, 0.98, 1.0)
+
+    # 3. Altitude penalty
+    boost *= np.where(_flag(games_df, "HighAltitude"), 0.98, 1.0)
+
+    # 4. Turf type and humidity modifiers
+    turf = _text(games_df, "TurfType")
+    boost *= np.select(
+        [turf.str.contains("natural").to_numpy(), turf.str.contains("hybrid").to_numpy(), turf.str.contains("artificial").to_numpy()],
+        [0.99, 1.00, 1.02],
+        default=1.0,
+    )
+    humidity = _text(games_df, "HumidityControl")
+    boost *= np.select(
+        [humidity.str.contains("yes").to_numpy(), humidity.str.contains("partial").to_numpy()],
+        [1.01, 1.00],
+        default=0.99,
+    )
+
+    # 5. Climate pattern modifiers
+    states = _text(games_df, "State").str.upper()
+    phase_modifiers = CLIMATE_PHASE_MODIFIERS.get(climate_phase, {})
+    state_modifiers = {state: phase_modifiers.get(classify_climate_region(state), 1.0) for state in states.unique()}
+    boost *= states.map(state_modifiers).to_numpy(dtype=float)
+
+    # 1. Indoor stadiums
+    boost = np.where(_flag(games_df, "Dome"), 1.05, boost)
+    return np.round(boost, 3)
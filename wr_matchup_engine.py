@@ -1,9 +1,236 @@
 # YACulator: wr_matchup_engine.py
-def simulate_wr_matchup(wr, dbs, coverage_scheme):
-    # Placeholder logic
+import numpy as np
+from config import (
+    USE_SOFT_ALIGNMENT,
+    MATCHUP_SINKHORN_ITERS,
+    MATCHUP_AFFINITY_FLOOR,
+)
+
+ROLES = ["slot", "wide", "safety", "lb"]
+DB_ROLE_NAMES = ["slot", "wide", "safety", "linebacker"]  # DB.alignment_role / alignment_probs spelling
+SHADOW_POSITIONS = ("WR",)  # a shadow defender follows the offense's top player among these
+MATCHUP_KEYS = ("matchup_penalty", "shadow_rate", "top_defender", "top_share")  # tables matchup_tables() adds to a slate
+
+
+# --- Defender tables ---
+def role_penalty_matrix(catch_rate, fpts_per_target, separation, passer_rating, fpts_per_game):
+    """Penalty of every DB in every role at once: (N x 4) in ROLES order. The one role-penalty formula."""
+    return np.nan_to_num(np.column_stack([
+        (catch_rate + fpts_per_target) / 2,
+        (separation + passer_rating) / 2 / 100,
+        catch_rate * 0.7 + separation * 0.3,
+        fpts_per_game / 15.0,
+    ]))
+
+
+def _rate(value):
+    value = np.nan_to_num(np.asarray(value, dtype=float))
+    return np.clip(np.where(value > 1.0, value / 100.0, value), 0.0, 1.0)  # percent or fraction
+
+
+def defense_table(db_map, teams, soft=USE_SOFT_ALIGNMENT):
+    """
+    Every DB of the listed teams packed once: role penalties and alignment (N x 4), coverage capacity,
+    shadow rate and team code. Works on any DB view with coverage_stats and alignment attributes.
+    """
+    dbs = [(code, db) for code, team in enumerate(teams) for db in db_map.get(team, {}).values()]
+    stat = lambda key: np.array([float(db.coverage_stats.get(key, 0) or 0) for _, db in dbs])
+    penalties = role_penalty_matrix(stat("catch_rate"), stat("fpts_per_target"), stat("separation"), stat("passer_rating"), stat("fpts_per_game"))
+    if soft:
+        alignment = np.array([[float(db.alignment_probs.get(r, 0) or 0) for r in DB_ROLE_NAMES] for _, db in dbs]).reshape(-1, 4)
+    else:
+        codes = [DB_ROLE_NAMES.index(db.alignment_role) if db.alignment_role in DB_ROLE_NAMES else 1 for _, db in dbs]
+        alignment = np.eye(4)[codes].reshape(-1, 4)
+    return {
+        "team": np.array([code for code, _ in dbs], dtype=int),
+        "names": [db.name for _, db in dbs],
+        "penalties": penalties,
+        "alignment": np.nan_to_num(alignment),
+        "capacity": _rate([getattr(db, "snap_share", 1.0) for _, db in dbs]),
+        "shadow": _rate([getattr(db, "shadow_rate", 0.0) for _, db in dbs]),
+    }
+
+
+def _padded(members, n_groups):
+    """Group member indices by group code into an (n_groups x max size) index matrix, -1 padded; plus each member's slot."""
+    order = np.argsort(members, kind="stable")
+    counts = np.bincount(members, minlength=n_groups)
+    starts = np.r_[0, np.cumsum(counts)[:-1]]
+    slot = np.empty(len(members), dtype=int)
+    slot[order] = np.arange(len(members)) - np.repeat(starts, counts)
+    table = np.full((n_groups, max(counts.max(initial=0), 1)), -1, dtype=int)
+    table[members[order], slot[order]] = order
+    return table, slot
+
+
+# --- Assignment ---
+def assign_coverage(affinity, loads, iters=MATCHUP_SINKHORN_ITERS):
+    """
+    Expected coverage assignment for a batch of games by Sinkhorn balancing: (G x W x D) affinity and
+    (G x D) defender loads (in WRs covered, summing to the game's WR count) -> (G x W x D) exposure shares.
+    Every WR's shares sum to 1 and each defender carries its load, so one defender cannot cover everyone.
+    Padded WRs / defenders carry zero affinity and come out with zero share.
+    """
+    has_wr = affinity.sum(axis=2) > 0
+    v = np.ones_like(loads)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for _ in range(iters):
+            u = np.where(has_wr, 1.0 / (affinity @ v[:, :, None])[:, :, 0], 0.0)
+            v = np.where(loads > 0, loads / (affinity.transpose(0, 2, 1) @ u[:, :, None])[:, :, 0], 0.0)
+        u = np.where(has_wr, 1.0 / (affinity @ v[:, :, None])[:, :, 0], 0.0)
+    return np.nan_to_num(u[:, :, None] * affinity * v[:, None, :], posinf=0.0)
+
+
+def pair_matchups(exposure, top_wr, defense, db_slots, iters=MATCHUP_SINKHORN_ITERS):
+    """
+    Defender-specific penalties for a batch of (offense, defense) pairings.
+    exposure (G x W x 4) is each WR's role mix (padded rows zero), top_wr (G,) the WR a shadow defender
+    follows, db_slots (G x D) the defense's DB indices (-1 padded). Returns the WRs' effective penalty
+    with the defense's top shadow defender off / on (G x W x 2), that defender's shadow rate (G,),
+    and the exposure shares under each case (2 x G x W x D).
+    """
+    valid_db = db_slots >= 0
+    idx = np.maximum(db_slots, 0)
+    alignment = defense["alignment"][idx] * valid_db[:, :, None]
+    penalties = defense["penalties"][idx]
+    has_wr = exposure.sum(axis=2) > 0
+
+    shared = np.einsum("gwr,gdr->gwd", exposure, alignment)
+    # Penalty of defender d on WR w: the roles they meet in, or the WR's own role mix if they never line up together
+    met = np.einsum("gwr,gdr,gdr->gwd", exposure, alignment, penalties)
+    own = np.einsum("gwr,gdr->gwd", exposure, penalties)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pair_penalty = np.where(shared > 1e-12, met / shared, own)
+
+    mask = has_wr[:, :, None] & valid_db[:, None, :]
+    affinity = np.where(mask, shared + MATCHUP_AFFINITY_FLOOR, 0.0)
+    capacity = np.where(valid_db, defense["capacity"][idx], 0.0)
+    capacity = np.where(capacity.sum(axis=1, keepdims=True) > 0, capacity, valid_db.astype(float))
+    n_wr = has_wr.sum(axis=1)[:, None]
+    loads = capacity / np.maximum(capacity.sum(axis=1, keepdims=True), 1e-12) * n_wr
+
+    # Shadow case: the defense's highest-shadow-rate defender follows the top WR and only him
+    shadow = np.where(valid_db, defense["shadow"][idx], 0.0)
+    shadow_db = shadow.argmax(axis=1)
+    g = np.arange(len(shadow))
+    shadow_rate = np.where(n_wr[:, 0] > 0, shadow[g, shadow_db], 0.0)
+    shadowed = affinity.copy()
+    shadowed[g, :, shadow_db] = 0.0
+    shadowed[g, top_wr, shadow_db] = np.where(shadow_rate > 0, 1.0, affinity[g, top_wr, shadow_db])
+    others = capacity.copy()
+    others[g, shadow_db] = 0.0
+    shadow_loads = others / np.maximum(others.sum(axis=1, keepdims=True), 1e-12) * (n_wr - 1)
+    shadow_loads[g, shadow_db] = 1.0
+    shadow_loads = np.where((shadow_rate > 0)[:, None], shadow_loads, loads)
+    shadowed = np.where((shadow_rate > 0)[:, None, None], shadowed, affinity)
+
+    shares = np.stack([assign_coverage(affinity, loads, iters), assign_coverage(shadowed, shadow_loads, iters)])
+    effective = (shares * pair_penalty[None]).sum(axis=3)
+    # A defense with no DBs keeps the role engine's fallback penalty of 1.0
+    effective = np.where(valid_db.any(axis=1)[None, :, None], effective, 1.0)
+    return np.moveaxis(effective, 0, -1), shadow_rate, shares
+
+
+def shadow_targets(positions):
+    return np.isin(np.asarray(positions, dtype=object), SHADOW_POSITIONS)
+
+
+def matchup_tables(weights, fpts, team_codes, opponent, teams, db_map, soft=USE_SOFT_ALIGNMENT, targets=None, iters=MATCHUP_SINKHORN_ITERS):
+    """
+    Season-wide defender matchups in one batched pass: every distinct (offense, defense) pairing on the
+    schedule is solved once and scattered to its weeks. Every pass catcher of the offense shares the
+    coverage; `targets` marks the rows a shadow defender may follow (default: all). Returns tables indexed like the slate:
+      matchup_penalty (week x WR x 2)  effective penalty with the opposing shadow defender off / on
+      shadow_rate     (week x team)     probability the defense's shadow defender travels that week
+      top_defender    (week x WR x 2)   the two DBs with the largest expected exposure (-1 = none)
+      top_share       (week x WR x 2)   their expected exposure shares
+    plus the DB names the top_defender ids index.
+    """
+    n_weeks, n_teams = opponent.shape
+    n_wr = len(team_codes)
+    defense = defense_table(db_map, teams, soft)
+    out = {
+        "matchup_penalty": np.ones((n_weeks, n_wr, 2)),
+        "shadow_rate": np.zeros((n_weeks, n_teams)),
+        "top_defender": np.full((n_weeks, n_wr, 2), -1, dtype=int),
+        "top_share": np.zeros((n_weeks, n_wr, 2)),
+    }
+    weeks_idx, offense = np.nonzero(opponent >= 0)
+    if not len(offense) or not n_wr or not len(defense["team"]):
+        # No DB on any scheduled defense keeps the role engine's fallback penalty of 1.0
+        return out, defense["names"]
+
+    pair_keys, pair_of = np.unique(offense * n_teams + opponent[weeks_idx, offense], return_inverse=True)
+    pair_off, pair_def = pair_keys // n_teams, pair_keys % n_teams
+
+    has_team = team_codes >= 0
+    team_wrs, wr_slot = _padded(np.where(has_team, team_codes, n_teams), n_teams + 1)
+    team_dbs, _ = _padded(defense["team"], n_teams)
+
+    wr_rows = team_wrs[pair_off]  # (G x W)
+    valid_wr = wr_rows >= 0
+    w = weights[np.maximum(wr_rows, 0)]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        exposure = np.nan_to_num(w / w.sum(axis=2, keepdims=True)) * valid_wr[:, :, None]
+    targets = np.ones(n_wr, dtype=bool) if targets is None else np.asarray(targets, dtype=bool)
+    followable = valid_wr & targets[np.maximum(wr_rows, 0)]
+    value = np.where(followable, np.nan_to_num(fpts[np.maximum(wr_rows, 0)].mean(axis=2), nan=-np.inf), -np.inf)
+    top_wr = value.argmax(axis=1)
+
+    effective, shadow_rate, shares = pair_matchups(exposure, top_wr, defense, team_dbs[pair_def], iters)
+    # No player a shadow would follow: the shadow-on case never happens
+    shadow_rate = np.where(followable.any(axis=1), shadow_rate, 0.0)
+    expected = (1 - shadow_rate)[:, None, None] * shares[0] + shadow_rate[:, None, None] * shares[1]
+    db_ids = team_dbs[pair_def]
+    if db_ids.shape[1] < 2:  # always report two slots
+        expected = np.pad(expected, ((0, 0), (0, 0), (0, 2 - db_ids.shape[1])))
+        db_ids = np.pad(db_ids, ((0, 0), (0, 2 - db_ids.shape[1])), constant_values=-1)
+    top = np.argsort(-expected, axis=2, kind="stable")[:, :, :2]
+    top_share = np.take_along_axis(expected, top, axis=2)
+    top_db = np.take_along_axis(np.broadcast_to(db_ids[:, None, :], expected.shape), top, axis=2)
+    top_db = np.where(top_share > 0, top_db, -1)
+
+    # Scatter pairings to (week, WR): a WR's pairing in a week is its team's pairing that week
+    pair_grid = np.full((n_weeks, n_teams), -1, dtype=int)
+    pair_grid[weeks_idx, offense] = pair_of
+    rows = np.flatnonzero(has_team)
+    pid = pair_grid[:, team_codes[rows]]  # (week x rows)
+    live = pid >= 0
+    wk, k = np.nonzero(live)
+    p, r, s = pid[wk, k], rows[k], wr_slot[rows[k]]
+    out["matchup_penalty"][wk, r] = effective[p, s]
+    out["top_defender"][wk, r] = top_db[p, s]
+    out["top_share"][wk, r] = top_share[p, s]
+    out["shadow_rate"][weeks_idx, opponent[weeks_idx, offense]] = shadow_rate[pair_of]
+    return out, defense["names"]
+
+
+def expected_penalty(matchup_penalty, shadow_rate):
+    """Point-projection penalty: the shadow off / on penalties weighted by the shadow rate."""
+    return (1 - shadow_rate) * matchup_penalty[..., 0] + shadow_rate * matchup_penalty[..., 1]
+
+
+def top_defenders_label(names, ids, shares):
+    return "; ".join(f"{names[i]} ({s:.0%})" for i, s in zip(ids, shares) if i >= 0)
+
+
+# --- Single matchup ---
+def simulate_wr_matchup(wr, dbs, coverage_scheme, teammates=(), soft=USE_SOFT_ALIGNMENT):
+    """
+    One WR (with optional teammates sharing the coverage) against a list of DBs: expected exposure shares,
+    the effective penalty and projected points under the given scheme.
+    """
+    group = [wr] + [t for t in teammates if t is not wr]
+    weights = np.array([[g.alignment_weights[r] for r in ROLES] for g in group], dtype=float)
+    fpts = np.array([[g.vs_man["fpts_per_target"], g.vs_zone["fpts_per_target"]] for g in group], dtype=float)
+    tables, names = matchup_tables(weights, fpts, np.zeros(len(group), dtype=int), np.array([[1, 0]]), ["O", "D"], {"D": {db.name: db for db in dbs}}, soft)
+    penalty = float(expected_penalty(tables["matchup_penalty"][0, 0], tables["shadow_rate"][0, 1]))
+    base = fpts[0, 0] if coverage_scheme == "man" else fpts[0, 1]
     return {
         "wr": wr.name,
-        "matchup_dbs": [db.name for db in dbs[:2]],
+        "matchup_dbs": [names[i] for i in tables["top_defender"][0, 0] if i >= 0],
+        "exposure": [round(float(s), 3) for s in tables["top_share"][0, 0]],
         "scheme": coverage_scheme,
-        "projected_points": 12.3  # dummy value
+        "penalty": round(penalty, 4),
+        "projected_points": round(float(base * (1 - penalty)), 2),
     }